@@ -13,7 +13,8 @@ import configparser
 from pathlib import Path
 from datetime import datetime
 from flask import Flask, render_template, request, jsonify
-import requests
+
+import telegram_client
 
 # Importa il modulo telegram_bot
 from telegram_bot import (
@@ -21,7 +22,8 @@ from telegram_bot import (
     load_mount_points, save_mount_points,
     load_monitoring_config, save_monitoring_config, get_default_monitoring_config,
     start_monitoring, stop_monitoring, get_monitoring_status,
-    set_bot_language, get_bot_language
+    set_bot_language, get_bot_language, get_metrics_snapshot, snapshot_to_dict, send_notification,
+    set_update_mode, get_update_mode, process_webhook_update
 )
 
 # Configurazione percorsi
@@ -243,6 +245,7 @@ def update_config(section, key, value):
     config[section][key] = value
     with open(CONFIG_PATH, 'w') as f:
         config.write(f)
+    telegram_client.invalidate_credentials()
 
 def get_monitor_status():
     """Ottiene lo stato del monitoraggio (abilitato/disabilitato)"""
@@ -285,28 +288,27 @@ def send_telegram_message(message, bot_token=None, chat_id=None):
         bool: True se l'invio è riuscito, False altrimenti
     """
     try:
-        config = read_config()
-        
-        if not bot_token:
-            bot_token = config['Telegram']['bot_token']
-        if not chat_id:
-            chat_id = config['Telegram']['chat_id']
+        ensure_config()
+        config_token, config_chat_id = telegram_client.get_credentials()
+        bot_token = bot_token or config_token
+        chat_id = chat_id or config_chat_id
         
         # Controllo token e chat_id
         if not bot_token or bot_token == 'YOUR_BOT_TOKEN' or not chat_id or chat_id == 'YOUR_CHAT_ID':
             logger.error("Token o Chat ID Telegram non configurati")
             return False, "Token o Chat ID Telegram non configurati"
         
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        data = {
-            "chat_id": chat_id,
-            "text": message,
-            "parse_mode": "Markdown"
-        }
-        response = requests.post(url, data=data)
+        result = telegram_client.send_message(message, chat_id=chat_id, bot_token=bot_token)
+        
+        retry_after = telegram_client.get_retry_after(result)
+        if retry_after:
+            # Limite di frequenza: Telegram indica dopo quanti secondi riprovare
+            error_msg = f"Limite di frequenza Telegram raggiunto, riprovare tra {retry_after} secondi"
+            logger.warning(error_msg)
+            return False, error_msg
         
-        if response.status_code != 200:
-            error_msg = f"Errore nell'invio del messaggio Telegram: {response.text}"
+        if not result.get('ok'):
+            error_msg = f"Errore nell'invio del messaggio Telegram: {result.get('description')}"
             logger.error(error_msg)
             return False, error_msg
         
@@ -490,6 +492,13 @@ def parse_fail_log():
         logger.error(f"Errore durante l'analisi dei faillog: {str(e)}")
         return []
 
+def send_ssh_notification(message):
+    """Accoda la notifica al bot se attivo, altrimenti la invia direttamente"""
+    if send_notification(message):
+        return True
+    success, _ = send_telegram_message(message)
+    return success
+
 def monitor_ssh_loop():
     """Funzione principale di monitoraggio"""
     logger.info("Avvio monitoraggio connessioni SSH e SFTP...")
@@ -532,7 +541,7 @@ def monitor_ssh_loop():
                     if connection:
                         message = format_notification(connection, config)
                         logger.info(f"Rilevata connessione {connection['type']} da {connection['ip']} come {connection['username']}")
-                        send_telegram_message(message)
+                        send_ssh_notification(message)
             else:
                 logger.warning(f"File di log {auth_log_path} non trovato.")
             
@@ -544,7 +553,7 @@ def monitor_ssh_loop():
                 if len(fail_logs) > 5:
                     message += f"\n... and {len(fail_logs) - 5} more"
                 
-                send_telegram_message(message)
+                send_ssh_notification(message)
             
             # Salva le posizioni correnti
             save_last_position(last_positions)
@@ -683,6 +692,61 @@ def update_telegram_config():
         'message': "Credenziali Telegram aggiornate con successo"
     })
 
+@app.route('/api/telegram-delivery', methods=['GET'])
+def get_telegram_delivery():
+    """API per ottenere la modalità di ricezione degli aggiornamenti del bot"""
+    config = read_config()
+    status = get_update_mode()
+    return jsonify({
+        'success': True,
+        'mode': status['mode'],
+        'configured_mode': config['Telegram'].get('update_mode', 'polling'),
+        'webhook_url': config['Telegram'].get('webhook_url', '')
+    })
+
+@app.route('/api/telegram-delivery', methods=['POST'])
+def update_telegram_delivery():
+    """API per passare tra polling e webhook senza riavviare il bot"""
+    data = request.get_json(silent=True) or {}
+    mode = data.get('mode', 'polling')
+    webhook_url = (data.get('webhook_url') or '').strip()
+    
+    if mode not in ('polling', 'webhook'):
+        return jsonify({
+            'success': False,
+            'message': f"Modalità non valida: {mode}"
+        })
+    
+    if mode == 'webhook':
+        if not webhook_url.startswith(('https://', 'http://')):
+            return jsonify({
+                'success': False,
+                'message': "Il webhook richiede l'URL pubblico dell'interfaccia web (Telegram accetta solo HTTPS)"
+            })
+        # L'URL va salvato prima: la registrazione del webhook lo legge dalla configurazione
+        update_config('Telegram', 'webhook_url', webhook_url)
+    
+    success, message = set_update_mode(mode)
+    if success:
+        # La modalità viene salvata per il prossimo avvio solo se è stata applicata
+        update_config('Telegram', 'update_mode', mode)
+    
+    return jsonify({
+        'success': success,
+        'mode': get_update_mode()['mode'],
+        'message': message
+    })
+
+@app.route('/telegram/webhook/<path_token>', methods=['POST'])
+def telegram_webhook(path_token):
+    """Endpoint del webhook Telegram: accoda l'aggiornamento e risponde subito"""
+    status, message = process_webhook_update(
+        path_token,
+        request.headers.get('X-Telegram-Bot-Api-Secret-Token'),
+        request.get_json(silent=True) or {}
+    )
+    return message, status
+
 @app.route('/api/test-telegram', methods=['POST'])
 def test_telegram():
     """API per testare la connessione Telegram"""
@@ -1021,53 +1085,24 @@ def test_monitoring():
 
 @app.route('/api/current-metrics', methods=['GET'])
 def get_current_metrics():
-    """API per ottenere i valori correnti dei parametri monitorati"""
+    """API per ottenere i valori correnti dei parametri monitorati (dall'ultimo snapshot)"""
     try:
-        import psutil
-        
-        # CPU Usage
-        cpu_usage = psutil.cpu_percent(interval=1)
-        
-        # RAM Usage
-        ram = psutil.virtual_memory()
-        ram_usage = ram.percent
-        
-        # CPU Temperature
-        cpu_temp = None
-        try:
-            temps = psutil.sensors_temperatures()
-            if 'coretemp' in temps:
-                cpu_temp = temps['coretemp'][0].current
-            elif 'cpu_thermal' in temps:
-                cpu_temp = temps['cpu_thermal'][0].current
-            elif temps:
-                for _, sensors in temps.items():
-                    if sensors:
-                        cpu_temp = sensors[0].current
-                        break
-        except:
-            pass
-        
-        # Disk Usage per mount points configurati
-        mount_points = load_mount_points()
-        disk_usage = {}
-        for mount in mount_points:
-            if 'path' in mount:
-                path = mount['path']
-                try:
-                    if os.path.exists(path):
-                        usage = psutil.disk_usage(path)
-                        disk_usage[path] = usage.percent
-                except:
-                    disk_usage[path] = None
+        snapshot = get_metrics_snapshot("web")
+        if not snapshot:
+            return jsonify({
+                'success': False,
+                'message': 'Metriche non ancora disponibili'
+            }), 503
         
         return jsonify({
             'success': True,
+            'timestamp': snapshot['timestamp'],
             'metrics': {
-                'cpu_usage': cpu_usage,
-                'ram_usage': ram_usage,
-                'cpu_temperature': cpu_temp,
-                'disk_usage': disk_usage
+                'cpu_usage': snapshot['cpu']['percent'],
+                'ram_usage': snapshot['ram']['percent'],
+                'cpu_temperature': snapshot['cpu']['temperature'],
+                'disk_usage': {path: usage.get('percent') for path, usage in snapshot['disk_usage'].items()},
+                'pressure': snapshot_to_dict(snapshot['pressure'])
             }
         })
         
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Grafici a linee in PNG senza dipendenze esterne (usati dal comando /graph del bot)
+
+Il disegno avviene su un buffer di byte con una palette indicizzata: le linee
+verticali e i rettangoli sono assegnazioni di slice, quindi anche serie di
+decine di migliaia di punti vengono disegnate in pochi millisecondi.
+"""
+
+import math
+import zlib
+import struct
+from bisect import bisect_left
+from datetime import datetime
+
+# Dimensioni del grafico (pixel)
+WIDTH = 800
+HEIGHT = 400
+MARGIN_LEFT = 72
+MARGIN_RIGHT = 16
+MARGIN_TOP = 16
+MARGIN_BOTTOM = 36
+PLOT_WIDTH = WIDTH - MARGIN_LEFT - MARGIN_RIGHT  # Una colonna di pixel per bucket
+PLOT_HEIGHT = HEIGHT - MARGIN_TOP - MARGIN_BOTTOM
+
+# Palette indicizzata (RGB)
+BACKGROUND, AXIS, GRID, LINE, BAND, TEXT = range(6)
+PALETTE = bytes([
+    255, 255, 255,  # Sfondo
+    90, 90, 90,     # Assi
+    228, 228, 228,  # Griglia
+    13, 110, 253,   # Linea dei valori medi
+    182, 212, 254,  # Banda minimo/massimo
+    33, 37, 41      # Testo
+])
+
+# Font bitmap 5x7 (ogni riga è una maschera di 5 bit) per etichette numeriche e date
+FONT = {
+    "0": (0x0E, 0x11, 0x13, 0x15, 0x19, 0x11, 0x0E),
+    "1": (0x04, 0x0C, 0x04, 0x04, 0x04, 0x04, 0x0E),
+    "2": (0x0E, 0x11, 0x01, 0x02, 0x04, 0x08, 0x1F),
+    "3": (0x1F, 0x02, 0x04, 0x02, 0x01, 0x11, 0x0E),
+    "4": (0x02, 0x06, 0x0A, 0x12, 0x1F, 0x02, 0x02),
+    "5": (0x1F, 0x10, 0x1E, 0x01, 0x01, 0x11, 0x0E),
+    "6": (0x06, 0x08, 0x10, 0x1E, 0x11, 0x11, 0x0E),
+    "7": (0x1F, 0x01, 0x02, 0x04, 0x08, 0x08, 0x08),
+    "8": (0x0E, 0x11, 0x11, 0x0E, 0x11, 0x11, 0x0E),
+    "9": (0x0E, 0x11, 0x11, 0x0F, 0x01, 0x02, 0x0C),
+    ".": (0x00, 0x00, 0x00, 0x00, 0x00, 0x0C, 0x0C),
+    ":": (0x00, 0x0C, 0x0C, 0x00, 0x0C, 0x0C, 0x00),
+    "/": (0x01, 0x01, 0x02, 0x04, 0x08, 0x10, 0x10),
+    "-": (0x00, 0x00, 0x00, 0x1F, 0x00, 0x00, 0x00),
+    "%": (0x18, 0x19, 0x02, 0x04, 0x08, 0x13, 0x03),
+    "C": (0x0E, 0x11, 0x10, 0x10, 0x10, 0x11, 0x0E),
+    " ": (0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00)
+}
+FONT_SCALE = 2
+GLYPH_WIDTH = 6 * FONT_SCALE  # 5 pixel più uno di spaziatura
+GLYPH_HEIGHT = 7 * FONT_SCALE
+
+def downsample(timestamps, values, start, end, columns=PLOT_WIDTH):
+    """Riduce una serie ordinata per tempo a (minimo, massimo, media) per colonna
+
+    Returns:
+        list: una tupla (min, max, avg) per colonna, None dove non ci sono campioni
+    """
+    buckets = []
+    span = (end - start) / columns
+    lower = bisect_left(timestamps, start)
+    for column in range(columns):
+        upper = bisect_left(timestamps, start + (column + 1) * span, lower)
+        if upper > lower:
+            chunk = values[lower:upper]
+            buckets.append((min(chunk), max(chunk), sum(chunk) / len(chunk)))
+        else:
+            buckets.append(None)
+        lower = upper
+    return buckets
+
+def nice_range(low, high):
+    """Arrotonda l'intervallo dell'asse Y a multipli leggibili
+
+    Returns:
+        tuple: (minimo, massimo, passo della griglia)
+    """
+    if high - low < 1e-9:
+        low, high = low - 1, high + 1
+    raw_step = (high - low) / 4
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    for multiplier in (1, 2, 2.5, 5, 10):
+        step = magnitude * multiplier
+        if step >= raw_step:
+            break
+    return math.floor(low / step) * step, math.ceil(high / step) * step, step
+
+def fill_rect(pixels, x0, y0, x1, y1, color):
+    """Riempie il rettangolo [x0, x1] x [y0, y1] (estremi inclusi)"""
+    row = bytes([color]) * (x1 - x0 + 1)
+    for y in range(y0, y1 + 1):
+        pixels[y * WIDTH + x0:y * WIDTH + x1 + 1] = row
+
+def vline(pixels, x, y0, y1, color):
+    """Linea verticale tra y0 e y1 (inclusi) tramite slice con passo WIDTH"""
+    if y0 > y1:
+        y0, y1 = y1, y0
+    pixels[y0 * WIDTH + x:y1 * WIDTH + x + 1:WIDTH] = bytes([color]) * (y1 - y0 + 1)
+
+def draw_text(pixels, x, y, text, color=TEXT):
+    """Scrive un'etichetta con il font bitmap (caratteri non previsti vengono saltati)"""
+    for char in text:
+        glyph = FONT.get(char)
+        if glyph is None:
+            continue
+        for row, mask in enumerate(glyph):
+            for bit in range(5):
+                if mask & (0x10 >> bit):
+                    px = x + bit * FONT_SCALE
+                    py = y + row * FONT_SCALE
+                    fill_rect(pixels, px, py, px + FONT_SCALE - 1, py + FONT_SCALE - 1, color)
+        x += GLYPH_WIDTH
+
+def format_label(value):
+    """Etichetta dell'asse Y senza decimali superflui"""
+    return f"{value:.0f}" if abs(value - round(value)) < 1e-9 or abs(value) >= 100 else f"{value:.1f}"
+
+def encode_png(pixels, width=WIDTH, height=HEIGHT, palette=PALETTE):
+    """Codifica un buffer di indici di palette come PNG (tipo colore 3, 8 bit)"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    # Filtro 0 (nessuno) per ogni riga: con pochi colori la compressione è già efficace
+    raw = b"".join(b"\x00" + bytes(pixels[y * width:(y + 1) * width]) for y in range(height))
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0))
+            + chunk(b"PLTE", palette)
+            + chunk(b"IDAT", zlib.compress(raw, 6))
+            + chunk(b"IEND", b""))
+
+def render_line_chart(buckets, start, end, unit="", y_min=None, y_max=None, max_gap=None):
+    """Disegna la serie già ridotta per colonne (vedi downsample) e restituisce il PNG
+
+    La linea segue la media di ogni colonna, la banda chiara l'intervallo
+    minimo-massimo. Due colonne con campioni vengono unite se distano al più
+    max_gap secondi (None: sempre), altrimenti la linea si interrompe.
+    """
+    pixels = bytearray(WIDTH * HEIGHT)
+    present = [bucket for bucket in buckets if bucket]
+    low = min(bucket[0] for bucket in present) if present else 0
+    high = max(bucket[1] for bucket in present) if present else 1
+    low, high, step = nice_range(low if y_min is None else min(y_min, low), high if y_max is None else max(y_max, high))
+
+    plot_bottom = MARGIN_TOP + PLOT_HEIGHT - 1
+
+    def to_y(value):
+        return plot_bottom - int(round((value - low) / (high - low) * (PLOT_HEIGHT - 1)))
+
+    # Griglia orizzontale ed etichette dell'asse Y
+    for tick in range(int(round((high - low) / step)) + 1):
+        value = low + step * tick
+        y = to_y(value)
+        fill_rect(pixels, MARGIN_LEFT, y, MARGIN_LEFT + PLOT_WIDTH - 1, y, GRID)
+        label = format_label(value) + unit
+        draw_text(pixels, max(0, MARGIN_LEFT - 6 - len(label) * GLYPH_WIDTH), y - GLYPH_HEIGHT // 2, label)
+
+    # Etichette dell'asse X: ora per intervalli fino a un giorno, altrimenti giorno/mese
+    time_format = "%H:%M" if end - start <= 86400 else "%d/%m"
+    for tick in range(5):
+        x = MARGIN_LEFT + (PLOT_WIDTH - 1) * tick // 4
+        vline(pixels, x, MARGIN_TOP, plot_bottom, GRID)
+        label = datetime.fromtimestamp(start + (end - start) * tick / 4).strftime(time_format)
+        label_x = min(max(0, x - len(label) * GLYPH_WIDTH // 2), WIDTH - len(label) * GLYPH_WIDTH)
+        draw_text(pixels, label_x, plot_bottom + 10, label)
+
+    # Banda minimo/massimo, poi la linea delle medie sopra
+    for column, bucket in enumerate(buckets):
+        if bucket:
+            vline(pixels, MARGIN_LEFT + column, to_y(bucket[1]), to_y(bucket[0]), BAND)
+    column_span = (end - start) / len(buckets)
+    previous = None  # (colonna, y) dell'ultima colonna con campioni
+    for column, bucket in enumerate(buckets):
+        if not bucket:
+            continue
+        y = to_y(bucket[2])
+        if previous and (max_gap is None or (column - previous[0]) * column_span <= max_gap):
+            # Segmento dalla colonna precedente: una linea verticale per ogni colonna attraversata
+            previous_column, previous_y = previous
+            steps = column - previous_column
+            for offset in range(1, steps + 1):
+                segment_start = previous_y + (y - previous_y) * (offset - 1) // steps
+                segment_end = previous_y + (y - previous_y) * offset // steps
+                vline(pixels, MARGIN_LEFT + previous_column + offset, segment_start, segment_end, LINE)
+        x = MARGIN_LEFT + column
+        vline(pixels, x, max(MARGIN_TOP, y - 1), y, LINE)  # Spessore di 2 pixel
+        previous = (column, y)
+
+    # Assi
+    vline(pixels, MARGIN_LEFT - 1, MARGIN_TOP, plot_bottom + 1, AXIS)
+    fill_rect(pixels, MARGIN_LEFT - 1, plot_bottom + 1, MARGIN_LEFT + PLOT_WIDTH - 1, plot_bottom + 1, AXIS)
+
+    return encode_png(pixels)
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Client minimale per la Docker Engine API tramite il socket Unix (usato da telegram_bot.py)
+
+Sostituisce le chiamate alla CLI (`docker ps`, `docker inspect`, `docker stats`,
+`docker <azione>`): ogni comando della CLI avvia un processo e apre una nuova
+connessione al demone, mentre qui le connessioni HTTP/1.1 keep-alive vengono
+riutilizzate e le risposte JSON lette una sola volta.
+
+Il percorso del socket può essere cambiato con la variabile DOCKER_SOCKET
+(es. verso fake_docker_server.py per i test).
+"""
+
+import os
+import json
+import socket
+import threading
+import http.client
+from urllib.parse import quote, urlencode
+import logging
+
+# Configurazione logging
+logger = logging.getLogger("SSH Monitor - Docker API")
+
+DOCKER_SOCKET = os.environ.get("DOCKER_SOCKET", "/var/run/docker.sock")
+# Versione dell'API (es. "v1.41"); vuota per usare quella più recente del demone
+DOCKER_API_VERSION = os.environ.get("DOCKER_API_VERSION", "")
+DEFAULT_TIMEOUT = 10  # Secondi di attesa della risposta
+ACTION_TIMEOUT = 60  # stop e restart attendono l'arresto del container (10s di default)
+POOL_MAXSIZE = 4  # Connessioni keep-alive tenute aperte verso il demone
+LOGS_TIMEOUT = 30  # Secondi di attesa tra due blocchi del flusso dei log
+LOGS_READ_SIZE = 64 * 1024
+MAX_LOG_LINE = 4096  # Byte tenuti di una riga di log (il resto viene scartato)
+LOG_STREAMS = {0: "stdin", 1: "stdout", 2: "stderr"}
+
+CONTAINER_ACTIONS = ("start", "stop", "restart", "pause", "unpause", "kill")
+
+# Connessioni libere (le connessioni chiuse vengono riaperte da http.client al primo utilizzo)
+POOL = []
+POOL_LOCK = threading.Lock()
+
+
+class DockerAPIError(Exception):
+    """Errore restituito dal demone (status HTTP) o socket non raggiungibile (status 0)"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """Connessione HTTP verso un socket Unix"""
+
+    def __init__(self, socket_path, timeout=DEFAULT_TIMEOUT):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+def acquire_connection():
+    """Restituisce (connessione, riutilizzata) prendendola dal pool se possibile"""
+    with POOL_LOCK:
+        if POOL:
+            return POOL.pop(), True
+    return UnixHTTPConnection(DOCKER_SOCKET), False
+
+def release_connection(conn):
+    """Rimette la connessione nel pool (o la chiude se il pool è pieno)"""
+    with POOL_LOCK:
+        if len(POOL) < POOL_MAXSIZE:
+            POOL.append(conn)
+            return
+    conn.close()
+
+def request(method, path, params=None, timeout=DEFAULT_TIMEOUT):
+    """Esegue una richiesta all'API e restituisce la risposta JSON già decodificata
+
+    Una connessione riutilizzata che il demone ha chiuso nel frattempo viene
+    sostituita e la richiesta ripetuta una volta.
+
+    Returns:
+        Oggetto JSON della risposta, oppure None se il corpo è vuoto (es. 204, 304)
+
+    Raises:
+        DockerAPIError: risposta 4xx/5xx o socket non raggiungibile
+    """
+    url = (f"/{DOCKER_API_VERSION}" if DOCKER_API_VERSION else "") + path
+    if params:
+        url += "?" + urlencode(params)
+
+    for attempt in range(2):
+        conn, reused = acquire_connection()
+        conn.timeout = timeout
+        if conn.sock:
+            conn.sock.settimeout(timeout)
+        try:
+            conn.request(method, url, headers={"Host": "docker"})
+            response = conn.getresponse()
+            data = response.read()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+            conn.close()
+            if reused and attempt == 0:
+                continue
+            raise DockerAPIError(0, f"connessione al demone Docker interrotta: {e}")
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise DockerAPIError(0, f"socket Docker non raggiungibile ({DOCKER_SOCKET}): {e}")
+        if response.will_close:
+            conn.close()
+        release_connection(conn)
+        break
+
+    if response.status >= 400:
+        try:
+            message = json.loads(data).get("message", "")
+        except ValueError:
+            message = data.decode(errors="replace").strip()
+        raise DockerAPIError(response.status, message or response.reason)
+    return json.loads(data) if data else None
+
+def stream_events(since=None, filters=None):
+    """Segue il flusso /events del demone e restituisce un evento (dict) alla volta
+
+    Usa una connessione dedicata senza timeout di lettura: il demone invia un
+    oggetto JSON per riga solo quando succede qualcosa. Il generatore termina
+    sollevando DockerAPIError quando la connessione cade.
+
+    Args:
+        since: timestamp da cui riprendere (il demone ripete gli eventi successivi)
+        filters: filtri dell'API, es. {"type": ["container"]}
+    """
+    params = {}
+    if since is not None:
+        params["since"] = f"{since:.3f}"
+    if filters:
+        params["filters"] = json.dumps(filters)
+    url = (f"/{DOCKER_API_VERSION}" if DOCKER_API_VERSION else "") + "/events"
+    if params:
+        url += "?" + urlencode(params)
+
+    conn = UnixHTTPConnection(DOCKER_SOCKET, timeout=None)
+    try:
+        try:
+            conn.request("GET", url, headers={"Host": "docker"})
+            response = conn.getresponse()
+        except (OSError, http.client.HTTPException) as e:
+            raise DockerAPIError(0, f"socket Docker non raggiungibile ({DOCKER_SOCKET}): {e}")
+        if response.status >= 400:
+            raise DockerAPIError(response.status, response.read().decode(errors="replace").strip())
+        while True:
+            try:
+                line = response.readline()
+            except (OSError, http.client.HTTPException) as e:
+                raise DockerAPIError(0, f"flusso degli eventi interrotto: {e}")
+            if not line:
+                raise DockerAPIError(0, "il demone Docker ha chiuso il flusso degli eventi")
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        conn.close()
+
+def open_stream(path, params=None):
+    """Apre una richiesta GET in streaming e restituisce (socket non bloccante, stato del parser)
+
+    Pensata per seguire molti flussi con un solo thread (selectors): i byte
+    ricevuti vanno passati a feed_stream, che restituisce gli oggetti JSON
+    completi.
+    """
+    url = (f"/{DOCKER_API_VERSION}" if DOCKER_API_VERSION else "") + path
+    if params:
+        url += "?" + urlencode(params)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(DEFAULT_TIMEOUT)
+        sock.connect(DOCKER_SOCKET)
+        sock.sendall(f"GET {url} HTTP/1.1\r\nHost: docker\r\n\r\n".encode())
+        sock.setblocking(False)
+    except OSError as e:
+        sock.close()
+        raise DockerAPIError(0, f"socket Docker non raggiungibile ({DOCKER_SOCKET}): {e}")
+    return sock, {"raw": b"", "body": b"", "headers": False, "chunked": False}
+
+def feed_stream(state, data):
+    """Aggiunge i byte ricevuti da un flusso aperto con open_stream
+
+    Returns:
+        list: oggetti JSON completi (uno per riga) ricevuti finora
+
+    Raises:
+        DockerAPIError: risposta di errore o flusso terminato (data vuoto o chunk finale)
+    """
+    if not data:
+        raise DockerAPIError(0, "il demone Docker ha chiuso il flusso")
+    state["raw"] += data
+    if not state["headers"]:
+        end = state["raw"].find(b"\r\n\r\n")
+        if end < 0:
+            return []
+        head, state["raw"] = state["raw"][:end].decode(errors="replace"), state["raw"][end + 4:]
+        status_line, _, header_lines = head.partition("\r\n")
+        status = int(status_line.split()[1])
+        if status >= 400:
+            raise DockerAPIError(status, state["raw"].decode(errors="replace").strip() or status_line)
+        state["headers"] = True
+        state["chunked"] = "transfer-encoding: chunked" in header_lines.lower()
+
+    if state["chunked"]:
+        raw = state["raw"]
+        while True:
+            line_end = raw.find(b"\r\n")
+            if line_end < 0:
+                break
+            size = int(raw[:line_end].split(b";")[0], 16)
+            if size == 0:
+                raise DockerAPIError(0, "il demone Docker ha chiuso il flusso")
+            if len(raw) < line_end + 2 + size + 2:
+                break
+            state["body"] += raw[line_end + 2:line_end + 2 + size]
+            raw = raw[line_end + 2 + size + 2:]
+        state["raw"] = raw
+    else:
+        state["body"] += state["raw"]
+        state["raw"] = b""
+
+    *lines, state["body"] = state["body"].split(b"\n")
+    return [json.loads(line) for line in lines if line.strip()]
+
+def container_logs(name, tail=None, since=None, tty=False):
+    """Legge i log di un container e restituisce una riga alla volta come (stream, testo)
+
+    Il flusso viene letto a blocchi e diviso in righe man mano, quindi la
+    memoria usata non dipende dalla quantità di log: le righe più lunghe di
+    MAX_LOG_LINE byte vengono troncate. Senza TTY il demone multiplexa stdout e
+    stderr in frame con un'intestazione di 8 byte (tipo di stream, 3 byte a
+    zero, lunghezza big endian); con TTY invia il testo così com'è (stream
+    "stdout"). Chiudere il generatore chiude la connessione.
+
+    Args:
+        tail: numero di righe finali (None per tutte)
+        since: timestamp da cui leggere
+        tty: Config.Tty del container, per i demoni che non indicano il formato nel Content-Type
+    """
+    params = {"stdout": 1, "stderr": 1, "tail": tail if tail is not None else "all"}
+    if since is not None:
+        params["since"] = int(since)
+    url = (f"/{DOCKER_API_VERSION}" if DOCKER_API_VERSION else "") + container_path(name, "logs") + "?" + urlencode(params)
+
+    conn = UnixHTTPConnection(DOCKER_SOCKET, timeout=LOGS_TIMEOUT)
+    try:
+        try:
+            conn.request("GET", url, headers={"Host": "docker"})
+            response = conn.getresponse()
+        except (OSError, http.client.HTTPException) as e:
+            raise DockerAPIError(0, f"socket Docker non raggiungibile ({DOCKER_SOCKET}): {e}")
+        if response.status >= 400:
+            data = response.read()
+            try:
+                message = json.loads(data).get("message", "")
+            except ValueError:
+                message = data.decode(errors="replace").strip()
+            raise DockerAPIError(response.status, message or response.reason)
+        # Dalla versione 1.42 il demone dichiara il formato; prima dipende solo da Tty
+        content_type = response.getheader("Content-Type", "")
+        multiplexed = "multiplexed-stream" in content_type or not tty
+
+        buffer = b""
+        partial = {}  # stream -> riga incompleta (al massimo MAX_LOG_LINE byte)
+        while True:
+            try:
+                data = response.read1(LOGS_READ_SIZE)
+            except (OSError, http.client.HTTPException) as e:
+                raise DockerAPIError(0, f"lettura dei log interrotta: {e}")
+            if not data:
+                break
+            buffer += data
+            while buffer:
+                if multiplexed:
+                    if len(buffer) < 8:
+                        break
+                    size = int.from_bytes(buffer[4:8], "big")
+                    if len(buffer) < 8 + size:
+                        break
+                    stream, payload, buffer = LOG_STREAMS.get(buffer[0], "stdout"), buffer[8:8 + size], buffer[8 + size:]
+                else:
+                    stream, payload, buffer = "stdout", buffer, b""
+                *lines, rest = (partial.pop(stream, b"") + payload).split(b"\n")
+                for line in lines:
+                    yield stream, line[:MAX_LOG_LINE].rstrip(b"\r").decode(errors="replace")
+                partial[stream] = rest[:MAX_LOG_LINE]
+        for stream, rest in partial.items():
+            if rest:
+                yield stream, rest.rstrip(b"\r").decode(errors="replace")
+    finally:
+        conn.close()
+
+def container_path(name, *parts):
+    """Percorso di un container nell'API (il nome viene codificato)"""
+    return "/containers/" + "/".join([quote(name, safe="")] + list(parts))
+
+def list_containers(all=True):
+    """Elenco dei container (equivalente di `docker ps -a`)"""
+    return request("GET", "/containers/json", {"all": 1} if all else None)
+
+def inspect_container(name):
+    """Dettagli di un container (equivalente di `docker inspect`)"""
+    return request("GET", container_path(name, "json"))
+
+def container_stats(name):
+    """Un singolo campione delle statistiche, senza l'attesa di un secondo di `docker stats --no-stream`
+
+    Con one-shot il demone non compila precpu_stats: la CPU va calcolata
+    rispetto a un campione precedente (vedi calculate_cpu_percent).
+    """
+    return request("GET", container_path(name, "stats"), {"stream": 0, "one-shot": 1})
+
+def open_stats_stream(name):
+    """Flusso delle statistiche di un container (un campione al secondo, con precpu_stats)"""
+    return open_stream(container_path(name, "stats"), {"stream": 1})
+
+def container_action(name, action):
+    """Esegue un'azione (start, stop, restart, pause, ...) su un container"""
+    if action not in CONTAINER_ACTIONS:
+        raise ValueError(f"azione non supportata: {action}")
+    return request("POST", container_path(name, action), timeout=ACTION_TIMEOUT)
+
+def container_name(container):
+    """Nome di un container dell'elenco (senza la barra iniziale)"""
+    names = container.get("Names") or [container.get("Id", "")[:12]]
+    return names[0].lstrip("/")
+
+def calculate_cpu_percent(stats, previous=None):
+    """Percentuale di CPU come la calcola `docker stats`
+
+    Args:
+        stats: campione corrente
+        previous: campione precedente; se None si usa precpu_stats del campione corrente
+
+    Returns:
+        float, oppure None se i due campioni non permettono il calcolo
+    """
+    cpu = stats.get("cpu_stats") or {}
+    precpu = (previous.get("cpu_stats") if previous else stats.get("precpu_stats")) or {}
+    cpu_delta = cpu.get("cpu_usage", {}).get("total_usage", 0) - precpu.get("cpu_usage", {}).get("total_usage", 0)
+    system_delta = cpu.get("system_cpu_usage", 0) - precpu.get("system_cpu_usage", 0)
+    if not precpu.get("system_cpu_usage") or system_delta <= 0 or cpu_delta < 0:
+        return None
+    online_cpus = cpu.get("online_cpus") or len(cpu.get("cpu_usage", {}).get("percpu_usage") or []) or 1
+    return cpu_delta / system_delta * online_cpus * 100
+
+def network_bytes(stats):
+    """Byte ricevuti e inviati sommando tutte le interfacce del container
+
+    Returns:
+        tuple: (ricevuti, inviati), oppure None se il container non ha rete propria
+    """
+    networks = stats.get("networks")
+    if not networks:
+        return None
+    return (sum(item.get("rx_bytes", 0) for item in networks.values()),
+            sum(item.get("tx_bytes", 0) for item in networks.values()))
+
+def block_io_bytes(stats):
+    """Byte letti e scritti sui dispositivi a blocchi (cgroup v1 e v2)
+
+    Returns:
+        tuple: (letti, scritti), oppure None se non disponibile
+    """
+    entries = (stats.get("blkio_stats") or {}).get("io_service_bytes_recursive")
+    if entries is None:
+        return None
+    read = sum(item.get("value", 0) for item in entries if item.get("op", "").lower() == "read")
+    write = sum(item.get("value", 0) for item in entries if item.get("op", "").lower() == "write")
+    return read, write
+
+def calculate_memory_usage(stats):
+    """Memoria usata, limite e percentuale come in `docker stats` (cache esclusa)
+
+    Returns:
+        tuple: (usata, limite, percentuale), oppure None se non disponibile
+    """
+    memory = stats.get("memory_stats") or {}
+    usage = memory.get("usage")
+    limit = memory.get("limit")
+    if usage is None or not limit:
+        return None
+    details = memory.get("stats") or {}
+    # cgroup v1: total_inactive_file, cgroup v2: inactive_file
+    cache = details.get("total_inactive_file", details.get("inactive_file", 0))
+    if cache < usage:
+        usage -= cache
+    return usage, limit, usage / limit * 100
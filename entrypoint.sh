@@ -12,6 +12,9 @@ if [ -n "$TELEGRAM_BOT_TOKEN" ] && [ -n "$TELEGRAM_CHAT_ID" ]; then
 [Telegram]
 bot_token = $TELEGRAM_BOT_TOKEN
 chat_id = $TELEGRAM_CHAT_ID
+update_mode = ${TELEGRAM_UPDATE_MODE:-polling}
+webhook_url = ${TELEGRAM_WEBHOOK_URL:-}
+webhook_secret = ${TELEGRAM_WEBHOOK_SECRET:-}
 
 [Monitor]
 check_interval = ${CHECK_INTERVAL:-10}
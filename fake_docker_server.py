@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Server locale che emula la Docker Engine API su un socket Unix per test offline
+
+Avvio:
+    python fake_docker_server.py --socket /tmp/docker.sock --containers 25 --latency 5
+
+Poi puntare il bot al socket con la variabile DOCKER_SOCKET=/tmp/docker.sock.
+
+Endpoint emulati (con o senza prefisso di versione /v1.xx):
+    GET  /containers/json                 elenco (all=1 per includere i container fermi)
+    GET  /containers/{nome}/json          dettagli
+    GET  /containers/{nome}/stats         un campione (stream=0) o un campione al secondo (stream=1),
+                                          con CPU, memoria, rete e I/O simulati
+    GET  /containers/{nome}/logs          log simulati (una riga ogni LOG_INTERVAL secondi dall'avvio),
+                                          con tail e since; multiplexati stdout/stderr salvo i container con Tty
+    POST /containers/{nome}/{azione}      start, stop, restart, pause, unpause, kill
+    GET  /events                          flusso degli eventi (chunked, un JSON per riga);
+                                          since non ripete gli eventi passati
+
+Endpoint di controllo:
+    POST /_control/event     simula un evento: {"name": "app-001", "action": "die", "exit_code": 1},
+                             {"name": "app-001", "action": "die", "exit_code": 1, "restart": true}
+                             (crash seguito dal riavvio del criterio di riavvio),
+                             {"name": "app-001", "action": "oom"} oppure
+                             {"name": "app-001", "action": "health_status", "health": "unhealthy"}
+    POST /_control/config    modifica latency
+    GET  /_control/stats     contatori per endpoint
+    POST /_control/reset     ricrea i container iniziali
+"""
+
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+import queue
+import socketserver
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, parse_qs, unquote
+from http.server import BaseHTTPRequestHandler
+import logging
+
+# Configurazione logging
+logger = logging.getLogger("SSH Monitor - Fake Docker")
+
+# Comportamento del server (modificabile da riga di comando o da /_control/config)
+SETTINGS = {
+    "latency": 0.0,  # Millisecondi aggiunti a ogni chiamata
+    "containers": 5  # Container creati all'avvio e dopo /_control/reset
+}
+
+# Stato emulato
+STATE_LOCK = threading.Lock()
+CONTAINERS = {}  # nome -> {"id", "image", "project", "state", "health", "exit_code", "oom_killed", "restarts", "started", ...}
+STATS = Counter()
+EVENT_SUBSCRIBERS = []  # Una coda per ogni client collegato a /events
+
+ONLINE_CPUS = 4
+MEMORY_LIMIT = 8 * 1024 ** 3
+VERSION_PREFIX = re.compile(r"^/v\d+\.\d+")
+CONTAINER_PATTERN = re.compile(r"^/containers/(?P<name>[^/]+)/(?P<action>[a-z]+)$")
+LOG_INTERVAL = 2  # Secondi tra due righe di log simulate
+LOG_PATHS = ["/api/orders", "/api/users", "/health", "/static/app.js", "/login"]
+ACTION_STATES = {"start": "running", "stop": "exited", "restart": "running", "kill": "exited",
+                 "pause": "paused", "unpause": "running"}
+
+def iso_time(timestamp):
+    """Data nel formato usato dall'API (RFC 3339 con nanosecondi)"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f000Z")
+
+def create_containers(count):
+    """Ricrea count container: due su tre in esecuzione, gli altri fermi
+
+    I container sono raggruppati a cinque a cinque in progetti compose
+    (stack-0, stack-1, ...).
+    """
+    now = time.time()
+    with STATE_LOCK:
+        CONTAINERS.clear()
+        for index in range(count):
+            name = f"app-{index:03d}"
+            CONTAINERS[name] = {
+                "id": hashlib.sha256(name.encode()).hexdigest(),
+                "image": random.choice(["nginx:latest", "redis:7", "postgres:16", "python:3.12-slim"]),
+                "project": f"stack-{index // 5}",
+                "tty": index % 4 == 3,
+                "state": "exited" if index % 3 == 2 else "running",
+                "health": None,
+                "exit_code": 0,
+                "oom_killed": False,
+                "restarts": 0,
+                "created": now - 86400 * (index + 1),
+                "started": now - 3600 * (index + 1),
+                "cpu_usage": 0,
+                "cpu_read": now,
+                "rx_bytes": 0,
+                "tx_bytes": 0,
+                "blk_read": 0,
+                "blk_write": 0,
+                "memory": random.randint(20, 500) * 1024 ** 2
+            }
+
+def find_container(reference):
+    """Cerca un container per nome, id o prefisso dell'id, come il demone
+
+    Returns:
+        tuple: (nome, container) oppure (None, None)
+    """
+    if reference in CONTAINERS:
+        return reference, CONTAINERS[reference]
+    for name, container in CONTAINERS.items():
+        if len(reference) >= 4 and container["id"].startswith(reference):
+            return name, container
+    return None, None
+
+def container_labels(name, container):
+    """Etichette aggiunte da docker compose"""
+    return {"com.docker.compose.project": container["project"], "com.docker.compose.service": name}
+
+def format_status(container):
+    """Colonna Status di `docker ps`"""
+    if container["state"] == "exited":
+        return "Exited (0) 5 minutes ago"
+    hours = int((time.time() - container["started"]) // 3600)
+    uptime = f"{hours} hours" if hours else "Less than a second"
+    return f"Up {uptime} (Paused)" if container["state"] == "paused" else f"Up {uptime}"
+
+def list_containers(params):
+    with STATE_LOCK:
+        items = [(name, dict(c)) for name, c in sorted(CONTAINERS.items())]
+    show_all = params.get("all") in ("1", "true", "True")
+    return [{
+        "Id": c["id"],
+        "Names": [f"/{name}"],
+        "Image": c["image"],
+        "Labels": container_labels(name, c),
+        "State": c["state"],
+        "Status": format_status(c),
+        "Created": int(c["created"])
+    } for name, c in items if show_all or c["state"] != "exited"]
+
+def inspect_container(name, container):
+    running = container["state"] in ("running", "paused")
+    state = {
+        "Status": container["state"],
+        "Running": running,
+        "Paused": container["state"] == "paused",
+        "OOMKilled": container["oom_killed"],
+        "StartedAt": iso_time(container["started"]),
+        "ExitCode": container["exit_code"]
+    }
+    if container["health"]:
+        state["Health"] = {"Status": container["health"], "FailingStreak": 0, "Log": []}
+    return {
+        "Id": container["id"],
+        "Name": f"/{name}",
+        "Created": iso_time(container["created"]),
+        "RestartCount": container["restarts"],
+        "State": state,
+        "Config": {"Image": container["image"], "Env": ["PATH=/usr/local/bin:/usr/bin:/bin"],
+                   "Tty": container["tty"],
+                   "Labels": container_labels(name, container)},
+        "NetworkSettings": {"Ports": {"80/tcp": [{"HostIp": "0.0.0.0", "HostPort": "8080"}]} if running else {}},
+        "Mounts": []
+    }
+
+def container_stats(container):
+    """Un campione con contatori cumulativi coerenti tra chiamate successive"""
+    now = time.time()
+    with STATE_LOCK:
+        if container["state"] == "running":
+            # Tra il 5% e il 150% di una CPU nel tempo trascorso dall'ultima lettura
+            elapsed = now - container["cpu_read"]
+            container["cpu_usage"] += int(elapsed * 1e9 * random.uniform(0.05, 1.5))
+            container["rx_bytes"] += int(elapsed * random.uniform(1e3, 1e6))
+            container["tx_bytes"] += int(elapsed * random.uniform(1e3, 5e5))
+            container["blk_read"] += int(elapsed * random.uniform(0, 2e6))
+            container["blk_write"] += int(elapsed * random.uniform(0, 1e6))
+            container["memory"] = max(10 * 1024 ** 2, container["memory"] + random.randint(-4, 4) * 1024 ** 2)
+        container["cpu_read"] = now
+        usage = container["cpu_usage"]
+    now_ns = int(now * 1e9)
+    running = container["state"] != "exited"
+    return {
+        "read": iso_time(time.time()),
+        "cpu_stats": {"cpu_usage": {"total_usage": usage}, "system_cpu_usage": now_ns * ONLINE_CPUS,
+                      "online_cpus": ONLINE_CPUS},
+        "precpu_stats": {"cpu_usage": {"total_usage": 0}},
+        "memory_stats": {"usage": container["memory"], "limit": MEMORY_LIMIT,
+                         "stats": {"inactive_file": container["memory"] // 10}} if running else {},
+        "networks": {"eth0": {"rx_bytes": container["rx_bytes"], "tx_bytes": container["tx_bytes"]}},
+        "blkio_stats": {"io_service_bytes_recursive": [
+            {"major": 8, "minor": 0, "op": "read", "value": container["blk_read"]},
+            {"major": 8, "minor": 0, "op": "write", "value": container["blk_write"]}
+        ]}
+    }
+
+def log_line(container, index):
+    """Riga di log numero index di un container: (stream, testo), 1 = stdout, 2 = stderr"""
+    timestamp = container["started"] + index * LOG_INTERVAL
+    status = (200, 200, 200, 201, 304, 404, 500)[index % 7]
+    level = "ERROR" if status >= 500 else "WARN" if status >= 400 else "INFO"
+    text = (f"{iso_time(timestamp)[:23]}Z {level} request id={index} method=GET "
+            f"path={LOG_PATHS[index % len(LOG_PATHS)]} status={status} duration={index % 97 + 3}ms\n")
+    return (2 if level == "ERROR" else 1), text
+
+def log_range(container, params):
+    """Indici delle righe di log richieste (since e tail dell'API)"""
+    # Un container fermo ha scritto log per dieci minuti prima di fermarsi
+    end = container["started"] + 600 if container["state"] == "exited" else time.time()
+    count = max(0, int((end - container["started"]) // LOG_INTERVAL))
+    first = 0
+    if params.get("since"):
+        first = max(0, int((float(params["since"]) - container["started"] + LOG_INTERVAL - 1) // LOG_INTERVAL))
+    tail = params.get("tail", "all")
+    if tail != "all":
+        first = max(first, count - int(tail))
+    return range(min(first, count), count)
+
+def emit_event(name, container, action, **attributes):
+    """Invia un evento a tutti i client collegati a /events"""
+    now = time.time()
+    event = {
+        "status": action, "id": container["id"], "from": container["image"],
+        "Type": "container", "Action": action,
+        "Actor": {"ID": container["id"], "Attributes": dict(attributes, name=name, image=container["image"])},
+        "scope": "local", "time": int(now), "timeNano": int(now * 1e9)
+    }
+    STATS["events"] += 1
+    for subscriber in list(EVENT_SUBSCRIBERS):
+        subscriber.put(event)
+
+def emit_stop_events(name, container, exit_code):
+    """Eventi di un arresto richiesto (kill, die, stop), come quelli del demone"""
+    emit_event(name, container, "kill", signal="15")
+    emit_event(name, container, "die", exitCode=str(exit_code))
+    emit_event(name, container, "stop")
+
+def simulate_event(params):
+    """Applica un evento simulato (crash, OOM, cambio di salute) e lo notifica"""
+    name = params.get("name")
+    with STATE_LOCK:
+        container = CONTAINERS.get(name)
+        if container is None:
+            return None
+        action = params.get("action")
+        if action == "oom":
+            container.update(state="exited", exit_code=137, oom_killed=True)
+        elif action == "die":
+            container.update(state="exited", exit_code=int(params.get("exit_code", 1)), oom_killed=False)
+            if params.get("restart"):
+                # Riavvio deciso dal criterio di riavvio: RestartCount aumenta
+                container.update(state="running", started=time.time(), restarts=container["restarts"] + 1)
+        elif action == "health_status":
+            container["health"] = params.get("health", "unhealthy")
+        else:
+            return None
+    if action == "oom":
+        emit_event(name, container, "oom")
+        emit_event(name, container, "die", exitCode="137")
+    elif action == "die":
+        emit_event(name, container, "die", exitCode=str(container["exit_code"]))
+        if params.get("restart"):
+            emit_event(name, container, "start")
+    else:
+        emit_event(name, container, f"health_status: {container['health']}")
+    return True
+
+class FakeDockerHandler(BaseHTTPRequestHandler):
+    """Gestisce le richieste HTTP verso l'API emulata"""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, come il demone reale
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def address_string(self):
+        return "unix"
+
+    def send_json(self, status, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        if body:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_json(status, {"message": message})
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def handle_request(self, method):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        path = VERSION_PREFIX.sub("", url.path)
+
+        if path.startswith("/_control/"):
+            self.handle_control(path, json.loads(body) if body else params)
+            return
+
+        if SETTINGS["latency"]:
+            time.sleep(SETTINGS["latency"] / 1000)
+
+        if method == "GET" and path == "/events":
+            self.handle_events()
+            return
+
+        if method == "GET" and path == "/containers/json":
+            STATS["list"] += 1
+            self.send_json(200, list_containers(params))
+            return
+
+        match = CONTAINER_PATTERN.match(path)
+        if not match:
+            self.send_error_json(404, "page not found")
+            return
+        reference, action = unquote(match.group("name")), match.group("action")
+        with STATE_LOCK:
+            name, container = find_container(reference)
+        if container is None:
+            self.send_error_json(404, f"No such container: {reference}")
+            return
+
+        STATS[action] += 1
+        if method == "GET" and action == "json":
+            self.send_json(200, inspect_container(name, container))
+        elif method == "GET" and action == "stats":
+            if params.get("stream", "1") in ("0", "false", "False"):
+                self.send_json(200, container_stats(container))
+            else:
+                self.handle_stats_stream(container)
+        elif method == "GET" and action == "logs":
+            self.handle_logs(container, params)
+        elif method == "POST" and action in ACTION_STATES:
+            self.handle_action(name, container, action)
+        else:
+            self.send_error_json(404, "page not found")
+
+    def handle_action(self, name, container, action):
+        with STATE_LOCK:
+            state = container["state"]
+            if action == "start" and state == "running" or action == "stop" and state == "exited":
+                self.send_json(304)
+                return
+            if action == "pause" and state != "running":
+                self.send_error_json(409, f"Container {container['id'][:12]} is not running")
+                return
+            if action in ("start", "restart"):
+                container["started"] = time.time()
+            if action in ("stop", "kill", "restart"):
+                container.update(exit_code=137 if action == "kill" else 0, oom_killed=False)
+            container["state"] = ACTION_STATES[action]
+        if action in ("stop", "restart") and state != "exited":
+            emit_stop_events(name, container, 0)
+        elif action == "kill":
+            emit_event(name, container, "kill", signal="9")
+            emit_event(name, container, "die", exitCode="137")
+        if action in ("start", "restart"):
+            emit_event(name, container, "start")
+        if action in ("restart", "pause", "unpause"):
+            emit_event(name, container, action)
+        self.send_json(204)
+
+    def send_chunked_header(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.wfile.flush()
+
+    def send_chunk(self, payload):
+        data = json.dumps(payload).encode() + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def handle_logs(self, container, params):
+        """Log in chunk da 64 KiB: frame di 8 byte (stream, lunghezza) per riga, o testo semplice con Tty"""
+        STATS["log_lines"] += len(log_range(container, params))
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/vnd.docker.raw-stream" if container["tty"]
+                             else "application/vnd.docker.multiplexed-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            buffer = bytearray()
+            for index in log_range(container, params):
+                stream, text = log_line(container, index)
+                data = text.encode()
+                if container["tty"]:
+                    buffer += data.replace(b"\n", b"\r\n")
+                else:
+                    buffer += bytes([stream, 0, 0, 0]) + len(data).to_bytes(4, "big") + data
+                if len(buffer) >= 65536:
+                    self.wfile.write(f"{len(buffer):x}\r\n".encode() + bytes(buffer) + b"\r\n")
+                    buffer.clear()
+            if buffer:
+                self.wfile.write(f"{len(buffer):x}\r\n".encode() + bytes(buffer) + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            self.close_connection = True
+
+    def handle_stats_stream(self, container):
+        """Un campione al secondo finché il client resta collegato o il container è in esecuzione"""
+        STATS["stats_streams"] += 1
+        try:
+            self.send_chunked_header()
+            previous = None
+            while True:
+                sample = container_stats(container)
+                if previous:
+                    sample["precpu_stats"] = previous["cpu_stats"]
+                self.send_chunk(sample)
+                previous = sample
+                if container["state"] == "exited":
+                    break
+                time.sleep(1)
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            pass
+        self.close_connection = True
+
+    def handle_events(self):
+        """Flusso degli eventi: resta aperto finché il client non si scollega"""
+        STATS["events_subscribers"] += 1
+        subscriber = queue.Queue()
+        EVENT_SUBSCRIBERS.append(subscriber)
+        try:
+            self.send_chunked_header()
+            while True:
+                self.send_chunk(subscriber.get())
+        except OSError:
+            pass
+        finally:
+            EVENT_SUBSCRIBERS.remove(subscriber)
+            self.close_connection = True
+
+    def handle_control(self, path, params):
+        if path == "/_control/event":
+            if simulate_event(params):
+                self.send_json(200, True)
+            else:
+                self.send_error_json(400, "container o azione non validi")
+        elif path == "/_control/config":
+            for key in SETTINGS:
+                if key in params:
+                    SETTINGS[key] = type(SETTINGS[key])(params[key])
+            self.send_json(200, SETTINGS)
+        elif path == "/_control/stats":
+            with STATE_LOCK:
+                result = {"calls": dict(STATS), "containers": len(CONTAINERS)}
+            self.send_json(200, result)
+        elif path == "/_control/reset":
+            create_containers(SETTINGS["containers"])
+            STATS.clear()
+            self.send_json(200, True)
+        else:
+            self.send_error_json(404, "page not found")
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128  # Un flusso di statistiche per container: molte connessioni in pochi istanti
+
+def create_server(socket_path):
+    """Crea il server senza avviarlo (utile per avviarlo in un thread durante i test)"""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    create_containers(SETTINGS["containers"])
+    return ThreadingUnixHTTPServer(socket_path, FakeDockerHandler)
+
+def main():
+    parser = argparse.ArgumentParser(description="Server locale che emula la Docker Engine API")
+    parser.add_argument("--socket", default="/tmp/fake-docker.sock")
+    parser.add_argument("--containers", type=int, default=5, help="container creati all'avvio")
+    parser.add_argument("--latency", type=float, default=0.0, help="latenza aggiunta in millisecondi")
+    args = parser.parse_args()
+
+    SETTINGS.update(latency=args.latency, containers=args.containers)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    server = create_server(args.socket)
+    logger.info(f"Fake Docker Engine API in ascolto su {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(args.socket)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Server locale che emula l'API Bot di Telegram per test offline e di carico
+
+Avvio:
+    python fake_telegram_server.py --port 8081 --latency 50 --rate-limit 0.05
+
+Poi puntare il bot al server con la variabile TELEGRAM_API_BASE_URL=http://127.0.0.1:8081
+(oppure api_base_url nella sezione [Telegram] di config.ini).
+
+Endpoint di controllo:
+    POST /_control/updates   inietta aggiornamenti: {"updates": [...]} con update grezzi, oppure
+                             {"text": "/res", "chat_id": 1, "count": 1000} /
+                             {"callback_data": "docker_list", "chat_id": 1, "message_id": 1} /
+                             {"document": {"file_name": "a.txt", "content": "..."}, "chat_id": 1}
+    POST /_control/config    modifica latency, jitter, rate_limit, retry_after, public_ip
+    GET  /_control/stats     contatori per metodo e aggiornamenti in attesa
+    GET  /_control/messages  ultimi messaggi inviati dal bot
+    POST /_control/reset     svuota lo stato
+
+Servizio IP pubblico finto (da usare nei providers della sezione public_ip):
+    GET  /ip                 restituisce public_ip in testo semplice
+"""
+
+import re
+import json
+import time
+import base64
+import random
+import argparse
+import threading
+import urllib.request
+from collections import deque, Counter
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import logging
+
+# Configurazione logging
+logger = logging.getLogger("SSH Monitor - Fake Telegram")
+
+# Comportamento del server (modificabile da riga di comando o da /_control/config)
+SETTINGS = {
+    "latency": 0.0,  # Millisecondi aggiunti a ogni chiamata
+    "jitter": 0.0,  # Millisecondi casuali aggiuntivi (0..jitter)
+    "rate_limit": 0.0,  # Probabilità di rispondere 429 ai metodi di invio
+    "retry_after": 1,  # Secondi indicati nelle risposte 429
+    "public_ip": "203.0.113.10"  # Indirizzo restituito da GET /ip
+}
+RATE_LIMITED_METHODS = {"sendMessage", "editMessageText", "sendDocument", "sendPhoto", "answerCallbackQuery"}
+
+# Stato emulato
+STATE_LOCK = threading.Condition()
+UPDATES = deque()  # Aggiornamenti non ancora confermati da getUpdates
+NEXT_UPDATE_ID = 1
+NEXT_MESSAGE_ID = 1
+NEXT_FILE_ID = 1
+FILES = {}  # file_id -> {"file_path": str, "content": bytes}
+SENT_MESSAGES = deque(maxlen=1000)
+STATS = Counter()
+WEBHOOK = {"url": "", "secret_token": ""}  # Con un URL impostato gli aggiornamenti vengono consegnati via POST
+
+BOT_USER = {"id": 1000000, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}
+METHOD_PATTERN = re.compile(r"^/bot(?P<token>[^/]+)/(?P<method>\w+)$")
+FILE_PATTERN = re.compile(r"^/file/bot(?P<token>[^/]+)/(?P<path>.+)$")
+
+def make_chat(chat_id):
+    """Chat privata fittizia"""
+    return {"id": int(chat_id), "type": "private", "first_name": "Tester"}
+
+def make_user(chat_id):
+    """Utente fittizio associato alla chat"""
+    return {"id": int(chat_id), "is_bot": False, "first_name": "Tester"}
+
+def next_message_id():
+    """Restituisce un nuovo message_id (chiamata con STATE_LOCK acquisito)"""
+    global NEXT_MESSAGE_ID
+    message_id = NEXT_MESSAGE_ID
+    NEXT_MESSAGE_ID += 1
+    return message_id
+
+def store_file(file_name, content):
+    """Registra un file scaricabile con getFile (chiamata con STATE_LOCK acquisito)"""
+    global NEXT_FILE_ID
+    file_id = f"file{NEXT_FILE_ID}"
+    NEXT_FILE_ID += 1
+    FILES[file_id] = {"file_path": f"documents/{file_id}_{file_name}", "content": content}
+    return {"file_id": file_id, "file_unique_id": file_id, "file_name": file_name, "file_size": len(content)}
+
+def push_update(update):
+    """Aggiunge un aggiornamento alla coda di getUpdates (chiamata con STATE_LOCK acquisito)"""
+    global NEXT_UPDATE_ID
+    update["update_id"] = NEXT_UPDATE_ID
+    NEXT_UPDATE_ID += 1
+    UPDATES.append(update)
+
+def inject_updates(payload):
+    """Crea gli aggiornamenti richiesti da /_control/updates e restituisce quanti ne ha accodati"""
+    chat_id = payload.get("chat_id", 1)
+    count = int(payload.get("count", 1))
+    created = 0
+
+    with STATE_LOCK:
+        for update in payload.get("updates", []):
+            push_update(dict(update))
+            created += 1
+
+        for _ in range(count if any(k in payload for k in ("text", "callback_data", "document")) else 0):
+            now = int(time.time())
+            if "callback_data" in payload:
+                message = {"message_id": payload.get("message_id", 1), "date": now, "chat": make_chat(chat_id),
+                           "from": BOT_USER, "text": payload.get("message_text", "")}
+                push_update({"callback_query": {"id": str(random.getrandbits(48)), "from": make_user(chat_id),
+                                                "chat_instance": str(chat_id), "message": message,
+                                                "data": payload["callback_data"]}})
+            else:
+                message = {"message_id": next_message_id(), "date": now, "chat": make_chat(chat_id),
+                           "from": make_user(chat_id)}
+                if "document" in payload:
+                    document = payload["document"]
+                    content = document.get("content", "")
+                    content = base64.b64decode(content) if document.get("base64") else content.encode()
+                    message["document"] = store_file(document.get("file_name", "file.bin"), content)
+                else:
+                    text = payload["text"]
+                    message["text"] = text
+                    if text.startswith("/"):
+                        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+                push_update({"message": message})
+            created += 1
+
+        STATS["injected_updates"] += created
+        STATE_LOCK.notify_all()
+    return created
+
+def get_updates(params):
+    """getUpdates con long polling: attende fino a timeout secondi un nuovo aggiornamento"""
+    if WEBHOOK["url"]:
+        return None
+    offset = int(params.get("offset") or 0)
+    limit = int(params.get("limit") or 100)
+    deadline = time.monotonic() + float(params.get("timeout") or 0)
+
+    with STATE_LOCK:
+        # Un offset conferma tutti gli aggiornamenti precedenti
+        while UPDATES and UPDATES[0]["update_id"] < offset:
+            UPDATES.popleft()
+        while not UPDATES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            STATE_LOCK.wait(remaining)
+        return [UPDATES[i] for i in range(min(limit, len(UPDATES)))]
+
+def send_message(params):
+    """sendMessage: registra il messaggio e restituisce l'oggetto Message"""
+    with STATE_LOCK:
+        message = {"message_id": next_message_id(), "date": int(time.time()),
+                   "chat": make_chat(params.get("chat_id", 0)), "from": BOT_USER, "text": params.get("text", "")}
+        SENT_MESSAGES.append({"method": "sendMessage", "chat_id": params.get("chat_id"), "text": params.get("text")})
+    return message
+
+def edit_message_text(params):
+    """editMessageText: restituisce il messaggio modificato"""
+    with STATE_LOCK:
+        SENT_MESSAGES.append({"method": "editMessageText", "chat_id": params.get("chat_id"),
+                              "message_id": params.get("message_id"), "text": params.get("text")})
+    return {"message_id": int(params.get("message_id") or 0), "date": int(time.time()),
+            "chat": make_chat(params.get("chat_id", 0)), "from": BOT_USER, "text": params.get("text", "")}
+
+def send_document(params, files):
+    """sendDocument: conserva il file ricevuto e restituisce il messaggio con il documento"""
+    upload = files.get("document")
+    with STATE_LOCK:
+        if upload:
+            document = store_file(upload["file_name"], upload["content"])
+        else:
+            # Documento già presente indicato tramite file_id
+            stored = FILES.get(params.get("document"), {"content": b""})
+            document = {"file_id": params.get("document"), "file_unique_id": params.get("document"),
+                        "file_size": len(stored["content"])}
+        SENT_MESSAGES.append({"method": "sendDocument", "chat_id": params.get("chat_id"),
+                              "file_name": document.get("file_name")})
+        return {"message_id": next_message_id(), "date": int(time.time()),
+                "chat": make_chat(params.get("chat_id", 0)), "from": BOT_USER, "document": document,
+                "caption": params.get("caption")}
+
+def send_photo(params, files):
+    """sendPhoto: conserva l'immagine ricevuta e restituisce il messaggio con la foto"""
+    upload = files.get("photo")
+    with STATE_LOCK:
+        photo = store_file(upload["file_name"] or "photo.png", upload["content"]) if upload else {}
+        SENT_MESSAGES.append({"method": "sendPhoto", "chat_id": params.get("chat_id"),
+                              "caption": params.get("caption"), "file_size": photo.get("file_size")})
+        return {"message_id": next_message_id(), "date": int(time.time()),
+                "chat": make_chat(params.get("chat_id", 0)), "from": BOT_USER,
+                "photo": [{"file_id": photo.get("file_id"), "file_unique_id": photo.get("file_unique_id"),
+                           "file_size": photo.get("file_size"), "width": 800, "height": 400}],
+                "caption": params.get("caption")}
+
+def get_file(params):
+    """getFile: restituisce il percorso da scaricare da /file/bot<token>/"""
+    with STATE_LOCK:
+        stored = FILES.get(params.get("file_id"))
+    if not stored:
+        return None
+    return {"file_id": params.get("file_id"), "file_unique_id": params.get("file_id"),
+            "file_size": len(stored["content"]), "file_path": stored["file_path"]}
+
+def set_webhook(params):
+    """setWebhook / deleteWebhook: imposta o rimuove la destinazione degli aggiornamenti"""
+    with STATE_LOCK:
+        WEBHOOK["url"] = params.get("url", "")
+        WEBHOOK["secret_token"] = params.get("secret_token", "")
+        if str(params.get("drop_pending_updates", "")).lower() in ("true", "1"):
+            UPDATES.clear()
+        STATE_LOCK.notify_all()
+    return True
+
+def webhook_delivery_loop():
+    """Consegna in ordine gli aggiornamenti al webhook, riprovando finché non risponde 200"""
+    while True:
+        with STATE_LOCK:
+            while not (WEBHOOK["url"] and UPDATES):
+                STATE_LOCK.wait()
+            url, secret_token, update = WEBHOOK["url"], WEBHOOK["secret_token"], UPDATES[0]
+
+        request = urllib.request.Request(url, data=json.dumps(update).encode(), method="POST",
+                                         headers={"Content-Type": "application/json",
+                                                  "X-Telegram-Bot-Api-Secret-Token": secret_token})
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                delivered = response.status == 200
+        except Exception as e:
+            logger.debug(f"Consegna webhook non riuscita: {e}")
+            delivered = False
+
+        with STATE_LOCK:
+            if delivered:
+                STATS["webhook_delivered"] += 1
+                if UPDATES and UPDATES[0] is update:
+                    UPDATES.popleft()
+        if not delivered:
+            STATS["webhook_failed"] += 1
+            time.sleep(1)
+
+API_METHODS = {
+    "getMe": lambda params, files: BOT_USER,
+    "getUpdates": lambda params, files: get_updates(params),
+    "sendMessage": lambda params, files: send_message(params),
+    "editMessageText": lambda params, files: edit_message_text(params),
+    "answerCallbackQuery": lambda params, files: True,
+    "sendDocument": send_document,
+    "sendPhoto": send_photo,
+    "getFile": lambda params, files: get_file(params),
+    "setWebhook": lambda params, files: set_webhook(params),
+    "deleteWebhook": lambda params, files: set_webhook({}),
+    "getWebhookInfo": lambda params, files: {"url": WEBHOOK["url"], "has_custom_certificate": False,
+                                             "pending_update_count": len(UPDATES)},
+    "setMyCommands": lambda params, files: True
+}
+
+def parse_multipart(content_type, body):
+    """Separa campi e file di un corpo multipart/form-data"""
+    params, files = {}, {}
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        filename = part.get_filename()
+        payload = part.get_payload(decode=True) or b""
+        if filename:
+            files[name] = {"file_name": filename, "content": payload}
+        else:
+            params[name] = payload.decode("utf-8", errors="replace")
+    return params, files
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    """Gestisce le richieste HTTP verso l'API emulata"""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, come l'API reale
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_params(self):
+        """Legge i parametri da query string, JSON, form urlencoded o multipart"""
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        files = {}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        content_type = self.headers.get("Content-Type", "")
+        if body:
+            if content_type.startswith("application/json"):
+                params.update(json.loads(body))
+            elif content_type.startswith("multipart/form-data"):
+                fields, files = parse_multipart(content_type, body)
+                params.update(fields)
+            else:
+                params.update({key: values[-1] for key, values in parse_qs(body.decode()).items()})
+        return url.path, params, files
+
+    def do_GET(self):
+        self.handle_request()
+
+    def do_POST(self):
+        self.handle_request()
+
+    def handle_request(self):
+        try:
+            path, params, files = self.read_params()
+        except Exception as e:
+            self.send_json(400, {"ok": False, "error_code": 400, "description": f"Bad Request: {e}"})
+            return
+
+        if path.startswith("/_control/"):
+            self.handle_control(path, params)
+            return
+
+        delay = SETTINGS["latency"] + random.uniform(0, SETTINGS["jitter"])
+        if delay:
+            time.sleep(delay / 1000)
+
+        if path == "/ip":
+            self.handle_public_ip()
+            return
+
+        match = FILE_PATTERN.match(path)
+        if match:
+            self.handle_file_download(match.group("path"))
+            return
+
+        match = METHOD_PATTERN.match(path)
+        if not match or match.group("method") not in API_METHODS:
+            self.send_json(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+            return
+
+        method = match.group("method")
+        STATS[method] += 1
+        if method in RATE_LIMITED_METHODS and random.random() < SETTINGS["rate_limit"]:
+            STATS["rate_limited"] += 1
+            retry_after = SETTINGS["retry_after"]
+            self.send_json(429, {"ok": False, "error_code": 429,
+                                 "description": f"Too Many Requests: retry after {retry_after}",
+                                 "parameters": {"retry_after": retry_after}})
+            return
+
+        result = API_METHODS[method](params, files)
+        if result is None and method == "getUpdates":
+            self.send_json(409, {"ok": False, "error_code": 409,
+                                 "description": "Conflict: can't use getUpdates method while webhook is active"})
+        elif result is None:
+            self.send_json(400, {"ok": False, "error_code": 400, "description": "Bad Request: invalid file_id"})
+        else:
+            self.send_json(200, {"ok": True, "result": result})
+
+    def handle_file_download(self, file_path):
+        with STATE_LOCK:
+            stored = next((f for f in FILES.values() if f["file_path"] == file_path), None)
+        if not stored:
+            self.send_json(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+            return
+        STATS["file_download"] += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(stored["content"])))
+        self.end_headers()
+        self.wfile.write(stored["content"])
+
+    def handle_public_ip(self):
+        STATS["public_ip"] += 1
+        body = f"{SETTINGS['public_ip']}\n".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_control(self, path, params):
+        if path == "/_control/updates":
+            self.send_json(200, {"ok": True, "result": inject_updates(params)})
+        elif path == "/_control/config":
+            for key in SETTINGS:
+                if key in params:
+                    SETTINGS[key] = type(SETTINGS[key])(params[key])
+            self.send_json(200, {"ok": True, "result": SETTINGS})
+        elif path == "/_control/stats":
+            with STATE_LOCK:
+                result = {"calls": dict(STATS), "pending_updates": len(UPDATES), "files": len(FILES)}
+            self.send_json(200, {"ok": True, "result": result})
+        elif path == "/_control/messages":
+            with STATE_LOCK:
+                result = list(SENT_MESSAGES)[-int(params.get("limit", 100)):]
+            self.send_json(200, {"ok": True, "result": result})
+        elif path == "/_control/reset":
+            with STATE_LOCK:
+                UPDATES.clear()
+                FILES.clear()
+                SENT_MESSAGES.clear()
+                STATS.clear()
+            self.send_json(200, {"ok": True, "result": True})
+        else:
+            self.send_json(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+
+def create_server(host="127.0.0.1", port=8081):
+    """Crea il server senza avviarlo (utile per avviarlo in un thread durante i test)"""
+    server = ThreadingHTTPServer((host, port), FakeTelegramHandler)
+    server.daemon_threads = True
+    threading.Thread(target=webhook_delivery_loop, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Server locale che emula l'API Bot di Telegram")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="latenza aggiunta in millisecondi")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latenza casuale aggiuntiva in millisecondi")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="probabilità di risposta 429 (0-1)")
+    parser.add_argument("--retry-after", type=int, default=1, help="secondi indicati nelle risposte 429")
+    args = parser.parse_args()
+
+    SETTINGS.update(latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit,
+                    retry_after=args.retry_after)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    server = create_server(args.host, args.port)
+    logger.info(f"Fake Telegram Bot API in ascolto su http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Agente persistente per eseguire comandi sull'host tramite un socket Unix
+
+Sostituisce l'avvio di un container `docker run --privileged debian` per ogni
+comando: l'agente gira una sola volta (container sidecar con --pid=host, vedi
+docker-compose.yml) ed esegue i comandi nei namespace del processo 1 dell'host
+con nsenter.
+
+Avvio:
+    python host_agent.py --socket /var/lib/ssh_monitor/host_agent.sock --max-concurrent 4
+
+Protocollo: ogni messaggio è un frame composto da 4 byte (lunghezza, big endian)
+seguiti da un oggetto JSON. Su una connessione si possono inviare più richieste
+in sequenza.
+    richiesta: {"id": 1, "command": "hostname -I", "timeout": 10}
+    risposta:  {"id": 1, "returncode": 0, "stdout": "...", "stderr": "", "error": null}
+
+Con la richiesta {"watch": "netlink"} la connessione resta aperta e l'agente
+invia un frame {"event": "netlink", "types": [...]} per ogni cambio di link o
+indirizzo segnalato da rtnetlink (l'agente usa la rete dell'host).
+"""
+
+import os
+import json
+import socket
+import struct
+import argparse
+import threading
+import subprocess
+import logging
+
+# Configurazione logging
+logger = logging.getLogger("SSH Monitor - Host Agent")
+
+DEFAULT_SOCKET_PATH = "/var/lib/ssh_monitor/host_agent.sock"
+DEFAULT_TIMEOUT = 10  # Secondi concessi a un comando se la richiesta non ne indica
+MAX_TIMEOUT = 300
+MAX_FRAME_SIZE = 16 * 1024 * 1024  # Limite di una richiesta o risposta (output compreso)
+FRAME_HEADER = struct.Struct(">I")
+
+# Comando usato per entrare nei namespace dell'host (mount, uts, ipc, rete, pid)
+NSENTER_PREFIX = ["nsenter", "--target", "1", "--mount", "--uts", "--ipc", "--net", "--pid", "--"]
+
+# Gruppi rtnetlink osservati: link e indirizzi IPv4/IPv6
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+NETLINK_GROUPS = RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR
+NETLINK_HEADER = struct.Struct("=IHHII")  # nlmsghdr: lunghezza, tipo, flag, sequenza, pid
+NETLINK_KEEPALIVE = 60  # Secondi senza eventi dopo cui si invia un ping (rileva client scomparsi)
+
+# Impostati da main()
+COMMAND_SLOTS = threading.BoundedSemaphore(4)  # Comandi in esecuzione contemporaneamente
+COMMAND_PREFIX = NSENTER_PREFIX
+
+def send_frame(sock, payload):
+    """Invia un oggetto JSON preceduto dalla sua lunghezza"""
+    data = json.dumps(payload).encode()
+    sock.sendall(FRAME_HEADER.pack(len(data)) + data)
+
+def recv_exact(sock, size):
+    """Legge esattamente size byte (None se la connessione viene chiusa prima)"""
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def recv_frame(sock):
+    """Riceve un frame e restituisce l'oggetto JSON (None a fine connessione)"""
+    header = recv_exact(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    (size,) = FRAME_HEADER.unpack(header)
+    if size > MAX_FRAME_SIZE:
+        raise ValueError(f"frame troppo grande ({size} byte)")
+    data = recv_exact(sock, size)
+    if data is None:
+        return None
+    return json.loads(data)
+
+def call(command, timeout=DEFAULT_TIMEOUT, socket_path=DEFAULT_SOCKET_PATH):
+    """Esegue un comando tramite l'agente e restituisce la risposta
+
+    Solleva OSError se l'agente non è raggiungibile (il chiamante può
+    ripiegare su un altro metodo).
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        # Margine oltre il timeout del comando per l'avvio e la risposta
+        sock.settimeout(timeout + 5)
+        sock.connect(socket_path)
+        send_frame(sock, {"id": 1, "command": command, "timeout": timeout})
+        response = recv_frame(sock)
+    if response is None:
+        raise ConnectionError("l'agente ha chiuso la connessione senza rispondere")
+    return response
+
+def watch_netlink(socket_path=DEFAULT_SOCKET_PATH):
+    """Si iscrive agli eventi rtnetlink dell'agente e li restituisce man mano
+
+    Solleva OSError se l'agente non è raggiungibile o la connessione cade.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(NETLINK_KEEPALIVE * 2)
+        sock.connect(socket_path)
+        send_frame(sock, {"watch": "netlink"})
+        while True:
+            event = recv_frame(sock)
+            if event is None:
+                raise ConnectionError("l'agente ha chiuso la connessione")
+            if event.get("error"):
+                raise ConnectionError(event["error"])
+            if event.get("event") != "ping":
+                yield event
+
+def open_netlink_socket():
+    """Apre un socket rtnetlink iscritto ai cambi di link e indirizzi"""
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+    sock.bind((0, NETLINK_GROUPS))
+    return sock
+
+def parse_netlink_types(data):
+    """Restituisce i tipi dei messaggi netlink contenuti in un datagramma"""
+    types = []
+    offset = 0
+    while offset + NETLINK_HEADER.size <= len(data):
+        length, msg_type, _, _, _ = NETLINK_HEADER.unpack_from(data, offset)
+        if length < NETLINK_HEADER.size:
+            break
+        types.append(msg_type)
+        offset += (length + 3) & ~3  # I messaggi sono allineati a 4 byte
+    return types
+
+def stream_netlink_events(conn):
+    """Inoltra al client gli eventi rtnetlink finché la connessione resta aperta"""
+    try:
+        netlink = open_netlink_socket()
+    except OSError as e:
+        send_frame(conn, {"error": f"rtnetlink non disponibile: {e}"})
+        return
+    with netlink:
+        netlink.settimeout(NETLINK_KEEPALIVE)
+        send_frame(conn, {"event": "ready"})
+        while True:
+            try:
+                data = netlink.recv(65536)
+            except socket.timeout:
+                send_frame(conn, {"event": "ping"})
+                continue
+            send_frame(conn, {"event": "netlink", "types": parse_netlink_types(data)})
+
+def run_command(request):
+    """Esegue il comando richiesto rispettando timeout e limite di concorrenza"""
+    command = request.get("command")
+    timeout = min(float(request.get("timeout") or DEFAULT_TIMEOUT), MAX_TIMEOUT)
+    response = {"id": request.get("id"), "returncode": None, "stdout": "", "stderr": "", "error": None}
+    if not isinstance(command, str) or not command:
+        response["error"] = "comando mancante"
+        return response
+
+    # L'attesa di uno slot libero rientra nel timeout della richiesta
+    if not COMMAND_SLOTS.acquire(timeout=timeout):
+        response["error"] = "troppi comandi in esecuzione"
+        return response
+    try:
+        result = subprocess.run(COMMAND_PREFIX + ["sh", "-c", command], capture_output=True, text=True,
+                                timeout=timeout)
+        response.update(returncode=result.returncode, stdout=result.stdout, stderr=result.stderr)
+    except subprocess.TimeoutExpired:
+        response["error"] = f"timeout dopo {timeout:.0f}s"
+    except Exception as e:
+        response["error"] = str(e)
+    finally:
+        COMMAND_SLOTS.release()
+    logger.debug(f"{command!r} -> {response['returncode']} {response['error'] or ''}")
+    return response
+
+def handle_connection(conn):
+    """Serve le richieste di una connessione finché il client non la chiude"""
+    with conn:
+        try:
+            while True:
+                request = recv_frame(conn)
+                if request is None:
+                    return
+                if request.get("watch") == "netlink":
+                    stream_netlink_events(conn)
+                    return
+                send_frame(conn, run_command(request))
+        except Exception as e:
+            logger.warning(f"Connessione chiusa per errore: {e}")
+
+def serve_forever(socket_path):
+    """Accetta connessioni sul socket Unix, un thread per connessione"""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    # Solo root (lo stesso utente del container principale) può inviare comandi
+    os.chmod(socket_path, 0o600)
+    server.listen(16)
+    logger.info(f"Agente host in ascolto su {socket_path}")
+    try:
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=handle_connection, args=(conn,), daemon=True).start()
+    finally:
+        server.close()
+        os.unlink(socket_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Agente per eseguire comandi sull'host tramite socket Unix")
+    parser.add_argument("--socket", default=os.environ.get("HOST_AGENT_SOCKET", DEFAULT_SOCKET_PATH))
+    parser.add_argument("--max-concurrent", type=int, default=4, help="comandi eseguiti contemporaneamente")
+    parser.add_argument("--no-nsenter", action="store_true",
+                        help="esegue i comandi senza entrare nei namespace del processo 1 (per i test)")
+    args = parser.parse_args()
+
+    global COMMAND_SLOTS, COMMAND_PREFIX
+    COMMAND_SLOTS = threading.BoundedSemaphore(args.max_concurrent)
+    COMMAND_PREFIX = [] if args.no_nsenter else NSENTER_PREFIX
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    serve_forever(args.socket)
+
+if __name__ == "__main__":
+    main()
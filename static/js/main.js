@@ -224,6 +224,58 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Modalità di ricezione degli aggiornamenti del bot (polling / webhook)
+    const updateModeSelect = document.getElementById('updateMode');
+    const webhookUrlInput = document.getElementById('webhookUrl');
+    const applyUpdateModeBtn = document.getElementById('applyUpdateMode');
+    
+    function loadUpdateMode() {
+        if (!updateModeSelect) return;
+        
+        fetch('/api/telegram-delivery')
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                updateModeSelect.value = data.mode;
+                webhookUrlInput.value = data.webhook_url || '';
+                webhookUrlInput.disabled = data.mode !== 'webhook';
+            }
+        })
+        .catch(error => {
+            console.error('Errore nel caricamento della modalità di ricezione:', error);
+        });
+    }
+    
+    if (updateModeSelect) {
+        updateModeSelect.addEventListener('change', function() {
+            webhookUrlInput.disabled = this.value !== 'webhook';
+        });
+        
+        applyUpdateModeBtn.addEventListener('click', function() {
+            fetch('/api/telegram-delivery', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ mode: updateModeSelect.value, webhook_url: webhookUrlInput.value.trim() })
+            })
+            .then(response => response.json())
+            .then(data => {
+                showMessage(data.message, data.success ? 'success' : 'danger');
+                if (data.mode) {
+                    updateModeSelect.value = data.mode;
+                    webhookUrlInput.disabled = data.mode !== 'webhook';
+                }
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                showMessage('Errore di connessione al server', 'danger');
+            });
+        });
+        
+        loadUpdateMode();
+    }
+    
     // Funzioni per la gestione dei punti di mount
     
     // Carica i punti di mount esistenti
@@ -553,6 +605,8 @@ document.addEventListener('DOMContentLoaded', function() {
                     availableMountPoints = data.available_mount_points || [];
                     populateMonitoringForm();
                     renderDiskConfigurations();
+                    renderPressureConfigurations();
+                    renderContainerAlertConfigurations();
                 } else {
                     showMessage('Errore nel caricamento della configurazione monitoraggio', 'danger');
                 }
@@ -601,6 +655,18 @@ document.addEventListener('DOMContentLoaded', function() {
         document.getElementById('networkTestHost').value = monitoringConfig.network_connection?.test_host || '8.8.8.8';
         document.getElementById('networkTestTimeout').value = monitoringConfig.network_connection?.test_timeout || 5;
         document.getElementById('networkReconnectEnabled').checked = monitoringConfig.network_connection?.reconnect_alert || false;
+        
+        // IP pubblico
+        document.getElementById('publicIpAlertEnabled').checked = monitoringConfig.public_ip?.change_alert || false;
+        document.getElementById('publicIpTtl').value = monitoringConfig.public_ip?.ttl || 900;
+        document.getElementById('publicIpProviders').value = (monitoringConfig.public_ip?.providers || []).join('\n');
+        
+        // Eventi dei container Docker
+        document.getElementById('dockerDieAlertEnabled').checked = monitoringConfig.docker_events?.die_alert || false;
+        document.getElementById('dockerOomAlertEnabled').checked = monitoringConfig.docker_events?.oom_alert || false;
+        document.getElementById('dockerHealthAlertEnabled').checked = monitoringConfig.docker_events?.health_alert || false;
+        document.getElementById('dockerAlertCooldown').value = monitoringConfig.docker_events?.cooldown ?? 300;
+        document.getElementById('dockerBulkParallelism').value = monitoringConfig.docker_bulk?.parallelism ?? 4;
     }
     
     // Renderizza le configurazioni dei dischi
@@ -664,6 +730,183 @@ document.addEventListener('DOMContentLoaded', function() {
                         </button>
                     </div>
                 </div>
+                <div class="row mt-2">
+                    ${diskIoMetrics.map(metric => {
+                        const metricConfig = monitoringConfig.disk_io?.[mountPoint]?.[metric.key] || {};
+                        return `
+                    <div class="col-md-3">
+                        <div class="form-check form-switch">
+                            <input class="form-check-input diskio-enabled" type="checkbox" data-mount="${mountPoint}" data-metric="${metric.key}" ${metricConfig.enabled ? 'checked' : ''}>
+                            <label class="form-check-label">${getTranslation(`alerts.diskio_${metric.key}`)}</label>
+                        </div>
+                    </div>
+                    <div class="col-md-3">
+                        <label class="form-label">${getTranslation('alerts.threshold')} (${metric.unit})</label>
+                        <input type="number" class="form-control diskio-threshold" data-mount="${mountPoint}" data-metric="${metric.key}" value="${metricConfig.threshold ?? metric.defaultThreshold}" min="0">
+                    </div>`;
+                    }).join('')}
+                </div>
+            `;
+            container.appendChild(configDiv);
+        });
+    }
+    
+    // Metriche I/O per punto di mount configurabili dall'interfaccia (/proc/diskstats)
+    const diskIoMetrics = [
+        { key: 'util', unit: '%', defaultThreshold: 90 },
+        { key: 'await', unit: 'ms', defaultThreshold: 100 }
+    ];
+    
+    // Risorse PSI monitorate (/proc/pressure)
+    const pressureResources = [
+        { key: 'cpu', label: 'CPU', defaultThreshold: 20 },
+        { key: 'memory', label: 'Memory', defaultThreshold: 10 },
+        { key: 'io', label: 'I/O', defaultThreshold: 20 }
+    ];
+    
+    // Renderizza le configurazioni della pressione PSI
+    function renderPressureConfigurations() {
+        const container = document.getElementById('pressureConfigurations');
+        if (!container) return;
+        
+        container.innerHTML = '';
+        
+        pressureResources.forEach(resource => {
+            const pressureConfig = monitoringConfig[`${resource.key}_pressure`] || {
+                enabled: false,
+                threshold: resource.defaultThreshold,
+                kind: 'some',
+                window: 'avg10',
+                reminder_enabled: false,
+                reminder_interval: 300,
+                reminder_unit: 'seconds'
+            };
+            
+            const configDiv = document.createElement('div');
+            configDiv.className = 'monitoring-config';
+            configDiv.innerHTML = `
+                <h6>${resource.label}</h6>
+                <div class="row">
+                    <div class="col-md-1">
+                        <div class="form-check form-switch">
+                            <input class="form-check-input pressure-enabled" type="checkbox" data-resource="${resource.key}" ${pressureConfig.enabled ? 'checked' : ''}>
+                            <label class="form-check-label">${getTranslation('alerts.enabled')}</label>
+                        </div>
+                    </div>
+                    <div class="col-md-2">
+                        <label class="form-label">${getTranslation('alerts.threshold')} (%)</label>
+                        <input type="number" class="form-control pressure-threshold" data-resource="${resource.key}" value="${pressureConfig.threshold}" min="1" max="100">
+                    </div>
+                    <div class="col-md-1">
+                        <label class="form-label">${getTranslation('alerts.pressure_kind')}</label>
+                        <select class="form-select pressure-kind" data-resource="${resource.key}">
+                            <option value="some" ${pressureConfig.kind === 'some' ? 'selected' : ''}>some</option>
+                            <option value="full" ${pressureConfig.kind === 'full' ? 'selected' : ''}>full</option>
+                        </select>
+                    </div>
+                    <div class="col-md-1">
+                        <label class="form-label">${getTranslation('alerts.pressure_window')}</label>
+                        <select class="form-select pressure-window" data-resource="${resource.key}">
+                            <option value="avg10" ${pressureConfig.window === 'avg10' ? 'selected' : ''}>10s</option>
+                            <option value="avg60" ${pressureConfig.window === 'avg60' ? 'selected' : ''}>60s</option>
+                        </select>
+                    </div>
+                    <div class="col-md-2">
+                        <div class="form-check form-switch">
+                            <input class="form-check-input pressure-reminder-enabled" type="checkbox" data-resource="${resource.key}" ${pressureConfig.reminder_enabled ? 'checked' : ''}>
+                            <label class="form-check-label">${getTranslation('alerts.reminder')}</label>
+                        </div>
+                    </div>
+                    <div class="col-md-2">
+                        <label class="form-label">${getTranslation('alerts.interval')}</label>
+                        <input type="number" class="form-control pressure-reminder-interval" data-resource="${resource.key}" value="${pressureConfig.reminder_interval}" min="60">
+                    </div>
+                    <div class="col-md-2">
+                        <label class="form-label">${getTranslation('alerts.unit')}</label>
+                        <select class="form-select pressure-reminder-unit" data-resource="${resource.key}">
+                            <option value="seconds" ${pressureConfig.reminder_unit === 'seconds' ? 'selected' : ''}>${getTranslation('alerts.units.seconds')}</option>
+                            <option value="minutes" ${pressureConfig.reminder_unit === 'minutes' ? 'selected' : ''}>${getTranslation('alerts.units.minutes')}</option>
+                            <option value="hours" ${pressureConfig.reminder_unit === 'hours' ? 'selected' : ''}>${getTranslation('alerts.units.hours')}</option>
+                            <option value="days" ${pressureConfig.reminder_unit === 'days' ? 'selected' : ''}>${getTranslation('alerts.units.days')}</option>
+                        </select>
+                    </div>
+                    <div class="col-md-1">
+                        <button type="button" class="btn btn-outline-info btn-sm mt-4" onclick="testAlert('pressure')">
+                            <i class="bi bi-play"></i> ${getTranslation('alerts.test')}
+                        </button>
+                    </div>
+                </div>
+            `;
+            container.appendChild(configDiv);
+        });
+    }
+    
+    // Regole di alert sui container (solo restarts ha soglia e finestra)
+    const containerAlertRules = [
+        { key: 'unhealthy' },
+        { key: 'restarts', defaultThreshold: 3, defaultWindow: 600 },
+        { key: 'exited' }
+    ];
+    
+    // Renderizza le regole di alert sui container
+    function renderContainerAlertConfigurations() {
+        const container = document.getElementById('containerAlertConfigurations');
+        if (!container) return;
+        
+        container.innerHTML = '';
+        
+        containerAlertRules.forEach(rule => {
+            const ruleConfig = Object.assign({
+                enabled: false,
+                threshold: rule.defaultThreshold,
+                window: rule.defaultWindow,
+                reminder_enabled: false,
+                reminder_interval: 30,
+                reminder_unit: 'minutes'
+            }, monitoringConfig.container_alerts?.[rule.key]);
+            
+            const thresholdFields = rule.defaultThreshold === undefined ? '<div class="col-md-4"></div>' : `
+                    <div class="col-md-2">
+                        <label class="form-label">${getTranslation('alerts.container_restart_threshold')}</label>
+                        <input type="number" class="form-control container-rule-threshold" data-rule="${rule.key}" value="${ruleConfig.threshold}" min="1">
+                    </div>
+                    <div class="col-md-2">
+                        <label class="form-label">${getTranslation('alerts.container_restart_window')}</label>
+                        <input type="number" class="form-control container-rule-window" data-rule="${rule.key}" value="${Math.round(ruleConfig.window / 60)}" min="1">
+                    </div>`;
+            
+            const configDiv = document.createElement('div');
+            configDiv.className = 'monitoring-config';
+            configDiv.innerHTML = `
+                <h6>${getTranslation(`alerts.container_rule_${rule.key}`)}</h6>
+                <div class="row">
+                    <div class="col-md-2">
+                        <div class="form-check form-switch">
+                            <input class="form-check-input container-rule-enabled" type="checkbox" data-rule="${rule.key}" ${ruleConfig.enabled ? 'checked' : ''}>
+                            <label class="form-check-label">${getTranslation('alerts.enabled')}</label>
+                        </div>
+                    </div>
+                    ${thresholdFields}
+                    <div class="col-md-2">
+                        <div class="form-check form-switch">
+                            <input class="form-check-input container-rule-reminder-enabled" type="checkbox" data-rule="${rule.key}" ${ruleConfig.reminder_enabled ? 'checked' : ''}>
+                            <label class="form-check-label">${getTranslation('alerts.reminder')}</label>
+                        </div>
+                    </div>
+                    <div class="col-md-2">
+                        <label class="form-label">${getTranslation('alerts.interval')}</label>
+                        <input type="number" class="form-control container-rule-reminder-interval" data-rule="${rule.key}" value="${ruleConfig.reminder_interval}" min="1">
+                    </div>
+                    <div class="col-md-2">
+                        <label class="form-label">${getTranslation('alerts.unit')}</label>
+                        <select class="form-select container-rule-reminder-unit" data-rule="${rule.key}">
+                            <option value="seconds" ${ruleConfig.reminder_unit === 'seconds' ? 'selected' : ''}>${getTranslation('alerts.units.seconds')}</option>
+                            <option value="minutes" ${ruleConfig.reminder_unit === 'minutes' ? 'selected' : ''}>${getTranslation('alerts.units.minutes')}</option>
+                            <option value="hours" ${ruleConfig.reminder_unit === 'hours' ? 'selected' : ''}>${getTranslation('alerts.units.hours')}</option>
+                            <option value="days" ${ruleConfig.reminder_unit === 'days' ? 'selected' : ''}>${getTranslation('alerts.units.days')}</option>
+                        </select>
+                    </div>
+                </div>
             `;
             container.appendChild(configDiv);
         });
@@ -672,8 +915,8 @@ document.addEventListener('DOMContentLoaded', function() {
     // Salva la configurazione del monitoraggio
     if (saveMonitoringConfigBtn) {
         saveMonitoringConfigBtn.addEventListener('click', function() {
-            // Raccogli i dati dal form
-            const config = {
+            // Raccogli i dati dal form (le sezioni non presenti nel form vengono preservate)
+            const config = Object.assign({}, monitoringConfig, {
                 global_enabled: globalMonitoringToggle.checked,
                 monitoring_interval: parseInt(monitoringInterval.value),
                 cpu_usage: {
@@ -702,8 +945,24 @@ document.addEventListener('DOMContentLoaded', function() {
                     test_timeout: parseInt(document.getElementById('networkTestTimeout').value),
                     reconnect_alert: document.getElementById('networkReconnectEnabled').checked
                 },
-                disk_usage: {}
-            };
+                public_ip: Object.assign({}, monitoringConfig.public_ip, {
+                    change_alert: document.getElementById('publicIpAlertEnabled').checked,
+                    ttl: Math.max(60, parseInt(document.getElementById('publicIpTtl').value) || 900),
+                    providers: document.getElementById('publicIpProviders').value
+                        .split('\n').map(url => url.trim()).filter(url => url)
+                }),
+                docker_events: Object.assign({}, monitoringConfig.docker_events, {
+                    die_alert: document.getElementById('dockerDieAlertEnabled').checked,
+                    oom_alert: document.getElementById('dockerOomAlertEnabled').checked,
+                    health_alert: document.getElementById('dockerHealthAlertEnabled').checked,
+                    cooldown: Math.max(0, parseInt(document.getElementById('dockerAlertCooldown').value) || 0)
+                }),
+                docker_bulk: Object.assign({}, monitoringConfig.docker_bulk, {
+                    parallelism: Math.min(16, Math.max(1, parseInt(document.getElementById('dockerBulkParallelism').value) || 4))
+                }),
+                disk_usage: {},
+                disk_io: Object.assign({}, monitoringConfig.disk_io)
+            });
             
             // Raccogli le configurazioni dei dischi
             availableMountPoints.forEach(mountPoint => {
@@ -720,6 +979,51 @@ document.addEventListener('DOMContentLoaded', function() {
                     reminder_interval: reminderInterval,
                     reminder_unit: reminderUnit
                 };
+                
+                // Metriche I/O: le metriche non presenti nel form (iops, throughput, queue) vengono preservate
+                const ioConfig = Object.assign({}, config.disk_io[mountPoint]);
+                diskIoMetrics.forEach(metric => {
+                    const selector = `[data-mount="${mountPoint}"][data-metric="${metric.key}"]`;
+                    ioConfig[metric.key] = Object.assign({}, ioConfig[metric.key], {
+                        enabled: document.querySelector(`.diskio-enabled${selector}`)?.checked || false,
+                        threshold: parseFloat(document.querySelector(`.diskio-threshold${selector}`)?.value || metric.defaultThreshold),
+                        reminder_enabled: reminderEnabled,
+                        reminder_interval: reminderInterval,
+                        reminder_unit: reminderUnit
+                    });
+                });
+                config.disk_io[mountPoint] = ioConfig;
+            });
+            
+            // Raccogli le configurazioni PSI
+            pressureResources.forEach(resource => {
+                const selector = `[data-resource="${resource.key}"]`;
+                config[`${resource.key}_pressure`] = {
+                    enabled: document.querySelector(`.pressure-enabled${selector}`)?.checked || false,
+                    threshold: parseFloat(document.querySelector(`.pressure-threshold${selector}`)?.value || resource.defaultThreshold),
+                    kind: document.querySelector(`.pressure-kind${selector}`)?.value || 'some',
+                    window: document.querySelector(`.pressure-window${selector}`)?.value || 'avg10',
+                    reminder_enabled: document.querySelector(`.pressure-reminder-enabled${selector}`)?.checked || false,
+                    reminder_interval: parseInt(document.querySelector(`.pressure-reminder-interval${selector}`)?.value || 300),
+                    reminder_unit: document.querySelector(`.pressure-reminder-unit${selector}`)?.value || 'seconds'
+                };
+            });
+            
+            // Raccogli le regole sui container
+            config.container_alerts = Object.assign({}, monitoringConfig.container_alerts);
+            containerAlertRules.forEach(rule => {
+                const selector = `[data-rule="${rule.key}"]`;
+                const ruleConfig = Object.assign({}, config.container_alerts[rule.key], {
+                    enabled: document.querySelector(`.container-rule-enabled${selector}`)?.checked || false,
+                    reminder_enabled: document.querySelector(`.container-rule-reminder-enabled${selector}`)?.checked || false,
+                    reminder_interval: parseInt(document.querySelector(`.container-rule-reminder-interval${selector}`)?.value || 30),
+                    reminder_unit: document.querySelector(`.container-rule-reminder-unit${selector}`)?.value || 'minutes'
+                });
+                if (rule.defaultThreshold !== undefined) {
+                    ruleConfig.threshold = Math.max(1, parseInt(document.querySelector(`.container-rule-threshold${selector}`)?.value) || rule.defaultThreshold);
+                    ruleConfig.window = Math.max(1, parseInt(document.querySelector(`.container-rule-window${selector}`)?.value) || rule.defaultWindow / 60) * 60;
+                }
+                config.container_alerts[rule.key] = ruleConfig;
             });
             
             // Invia la configurazione
@@ -847,6 +1151,27 @@ document.addEventListener('DOMContentLoaded', function() {
                 }
             });
         }
+        
+        // Pressione PSI (some avg10)
+        const pressureMetricsContainer = document.getElementById('pressureMetrics');
+        if (pressureMetricsContainer && metrics.pressure) {
+            pressureMetricsContainer.innerHTML = '';
+            pressureResources.forEach(resource => {
+                const pressure = metrics.pressure[resource.key];
+                if (pressure && pressure.some) {
+                    const value = pressure.some.avg10;
+                    const pressureDiv = document.createElement('div');
+                    pressureDiv.className = 'col-md-3';
+                    pressureDiv.innerHTML = `
+                        <div class="metric-card">
+                            <div class="metric-title">PSI ${resource.label}</div>
+                            <div class="metric-value ${value > 20 ? 'danger' : value > 5 ? 'warning' : 'success'}">${value.toFixed(1)}%</div>
+                        </div>
+                    `;
+                    pressureMetricsContainer.appendChild(pressureDiv);
+                }
+            });
+        }
     }
     
     // Refresh metriche
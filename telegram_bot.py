@@ -3,19 +3,45 @@
 
 import os
 import re
+import hmac
 import json
+import hashlib
 import time
+import math
+import queue
+import select
+import selectors
+import socket
+import itertools
+import fnmatch
 import threading
 import subprocess
 import psutil
 import ipaddress
+import io
+import gzip
+import html
+import tempfile
+import struct
+from array import array
+from bisect import bisect_left
+from urllib.parse import quote, unquote
+from types import MappingProxyType
 from datetime import datetime, timedelta
 from pathlib import Path
+from collections import deque, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait as wait_futures, TimeoutError as FuturesTimeoutError
 import logging
 
 import telegram
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import Updater, CommandHandler, CallbackQueryHandler, MessageHandler, Filters, CallbackContext
+import requests
+
+import telegram_client
+import chart_renderer
+import host_agent
+import docker_api
 
 # Configurazione logging
 logger = logging.getLogger("SSH Monitor - Telegram Bot")
@@ -31,9 +57,14 @@ MONITOR_THREAD = None
 CONFIG_PATH = Path('/etc/ssh_monitor/config.ini')
 MOUNT_POINTS_FILE = Path('/etc/ssh_monitor/mount_points.json')
 
-# Cache per i percorsi lunghi
-PATH_CACHE = {}
-PATH_COUNTER = 0
+# Token dei percorsi usati nei pulsanti (callback_data ha un limite di 64 byte)
+PATH_TOKENS = OrderedDict()  # "path_<hash>" -> percorso, dal meno recente
+PATH_TOKENS_FILE = Path('/var/lib/ssh_monitor/path_tokens.json')
+PATH_TOKENS_LOCK = threading.Lock()
+PATH_TOKENS_MAX = 10000  # Token conservati al massimo (i meno usati vengono scartati)
+PATH_TOKENS_SAVE_DELAY = 5  # Secondi di attesa prima di salvare, per raccogliere i token di una schermata
+PATH_TOKENS_LOADED = False
+PATH_TOKENS_SAVE_TIMER = None
 
 # Stato di upload e download
 UPLOAD_STATES = {}
@@ -42,12 +73,235 @@ DOWNLOAD_STATES = {}
 # Stato per la creazione di nuove cartelle
 FOLDER_CREATION_STATES = {}
 
+# Snapshot delle liste paginate (/docker, download): uno per messaggio, così le pagine restano coerenti
+LISTING_SNAPSHOTS = OrderedDict()  # (chat_id, message_id, tipo) -> {"source", "items", "created", ...}, dal meno recente
+LISTING_SNAPSHOT_LOCK = threading.Lock()
+LISTING_SNAPSHOT_TTL = 600  # Secondi dopo cui una lista viene ricostruita al cambio pagina
+LISTING_SNAPSHOT_MAX_ITEMS = 100000  # Voci tenute al massimo, sommando tutti gli snapshot
+
+# Indici ordinati delle directory sfogliate (upload/download), validi finché la directory non cambia
+DIRECTORY_INDEXES = OrderedDict()  # percorso -> {"stamp", "entries", "directories", "files", "large_files"}, dal meno recente
+DIRECTORY_INDEX_LOCK = threading.Lock()
+DIRECTORY_INDEX_MAX_ENTRIES = 500000  # Voci tenute al massimo, sommando tutte le directory
+DIRECTORY_PAGE_SIZE = 15  # Voci per pagina nella navigazione delle directory
+LARGE_FILE_SIZE = 50 * 1024 * 1024  # Limite dei file inviabili dal bot
+
 # Sistema di monitoraggio
 MONITORING_CONFIG_FILE = Path('/etc/ssh_monitor/monitoring_config.json')
 MONITORING_THREAD = None
 MONITORING_ACTIVE = False
 ALERT_STATES = {}  # Stato corrente degli alert
 REMINDER_TIMERS = {}  # Timer per i reminder
+ALERT_LOCK = threading.RLock()  # Serializza i controlli soglia tra loop e trigger PSI
+
+# Pressure Stall Information (PSI) del kernel
+PSI_PATH = Path('/proc/pressure')
+PSI_RESOURCES = ("cpu", "memory", "io")
+PSI_TRIGGER_WINDOW_US = 10000000  # Finestra massima consentita dal kernel (10 s)
+PSI_TRIGGER_THREAD = None
+PSI_TRIGGER_ACTIVE = False
+PSI_WINDOW_SAMPLES = {}  # (risorsa, kind) -> deque di (monotonic, total in µs), campionati dal thread dei trigger
+PSI_WINDOW_VALUES = {}  # (risorsa, kind) -> (stallo % nella finestra del trigger, monotonic della misura)
+PSI_WINDOW_MAX_AGE = 5  # Secondi dopo cui la misura sulla finestra non viene più considerata
+
+# Statistiche I/O dei dischi da /proc/diskstats
+DISKSTATS_PATH = Path('/proc/diskstats')
+DISKSTATS_SAMPLE_INTERVAL = 5  # Secondi tra due campioni
+DISKSTATS_SECTOR_SIZE = 512  # /proc/diskstats conta sempre settori da 512 byte
+DISK_IO_METRICS = ("util", "await", "iops", "throughput", "queue")
+DISKSTATS_THREAD = None
+DISKSTATS_ACTIVE = False
+DISKSTATS_RATES = {}  # device -> metriche calcolate sull'ultimo intervallo
+DISKSTATS_DEVICES = {}  # (major, minor) -> device
+DISKSTATS_LOCK = threading.Lock()
+
+# Indice dei mount da /proc/self/mountinfo, ricostruito solo quando il kernel segnala un cambio
+MOUNTINFO_PATH = Path('/proc/self/mountinfo')
+MOUNTINFO_FALLBACK_TTL = 60  # Ricostruzione periodica se poll() non è supportato
+MOUNTINFO_THREAD = None
+MOUNTINFO_LOCK = threading.Lock()
+MOUNTINFO_INDEX = None  # {"mounts": {mount_point: {...}}, "by_dev": {(major, minor): [mount_point]}, "built": timestamp}
+
+# Agente host persistente (host_agent.py) raggiungibile tramite socket Unix
+HOST_AGENT_SOCKET = os.environ.get('HOST_AGENT_SOCKET', host_agent.DEFAULT_SOCKET_PATH)
+HOST_COMMAND_TIMEOUT = 10  # Secondi concessi a un comando sull'host
+HOST_AGENT_RETRY_INTERVAL = 60  # Dopo un errore di connessione si usa docker run per questo intervallo
+HOST_AGENT_STATE = {"unavailable_since": 0, "calls": 0, "fallbacks": 0}
+
+# Cache delle interrogazioni in sola lettura sull'host (IP, interfacce), per comando
+HOST_QUERY_TTL = 600  # Secondi di validità se rtnetlink non segnala cambi prima
+HOST_QUERY_CACHE = {}  # comando -> (scadenza, risultato)
+HOST_QUERY_INFLIGHT = {}  # comando -> Future dell'esecuzione in corso (le richieste identiche la attendono)
+HOST_QUERY_LOCK = threading.Lock()
+HOST_QUERY_WATCH_THREAD = None
+HOST_QUERY_STATE = {"generation": 0, "hits": 0, "misses": 0, "invalidations": 0, "watching": False}
+
+# Statistiche dei container: un flusso per container in esecuzione, letti tutti da un solo thread
+DOCKER_STATS_THREAD = None
+DOCKER_STATS_LOCK = threading.Lock()
+DOCKER_STATS_SLOT_INTERVAL = 5  # Secondi aggregati in ogni posizione dello storico
+DOCKER_STATS_SLOTS = 60  # Posizioni dello storico per container (60 x 5s = ultimi 5 minuti)
+DOCKER_STATS_FIELDS = ("time", "cpu", "memory", "memory_limit", "net_rx", "net_tx", "blk_read", "blk_write")
+DOCKER_STATS_RETRY_INTERVAL = 30  # Secondi prima di riaprire un flusso interrotto con errore
+DOCKER_STATS_OPEN_BATCH = 20  # Flussi aperti al massimo per giro (evita raffiche di connessioni all'avvio)
+DOCKER_STATS_MAX_AGE = 10  # Oltre questa età l'ultimo campione del flusso non è considerato attuale
+DOCKER_STATS_HISTORY = {}  # id container -> buffer circolare (vedi new_container_stats_history)
+# Riserva se il flusso non è ancora disponibile: ultimo campione one-shot per la CPU
+DOCKER_STATS_PREVIOUS = {}  # nome -> (time.monotonic(), campione)
+DOCKER_STATS_SAMPLE_GAP = 0.5  # Secondi tra due campioni se manca un riferimento recente
+
+# Inventario dei container: sincronizzato all'avvio e aggiornato dal flusso /events del demone
+DOCKER_INVENTORY = {"containers": {}, "order": (), "by_name": {}, "running": 0, "live": False, "synced": 0}  # Sostituito, mai modificato
+DOCKER_INVENTORY_LOCK = threading.Lock()
+DOCKER_EVENTS_THREAD = None
+DOCKER_EVENTS_RETRY_INTERVAL = 10  # Secondi prima di ricollegarsi al flusso degli eventi
+DOCKER_EXPECTED_DIE_WINDOW = 30  # Un "die" entro questo tempo da kill/oom non è un arresto inatteso
+DOCKER_EVENT_MARKS = {}  # id container -> {"kill": ts, "oom": ts, "unhealthy_alerted": bool}
+DOCKER_ALERTS_SENT = {}  # (nome container, tipo di alert) -> timestamp dell'ultimo invio
+DOCKER_ALERT_SETTINGS = {"died": "die_alert", "oom": "oom_alert", "unhealthy": "health_alert", "healthy": "health_alert"}
+
+# Regole di alert sui container, valutate dallo stato mantenuto dagli eventi (stessa logica alert/recovery/reminder)
+CONTAINER_ALERT_RULES = ("unhealthy", "restarts", "exited")
+CONTAINER_RESTART_TIMES = {}  # id container -> deque dei timestamp dei riavvii automatici (RestartCount in aumento)
+CONTAINER_RESTART_HISTORY = 100  # Riavvii ricordati al massimo per container
+CONTAINER_RESTART_LOCK = threading.Lock()  # Scritti dal thread degli eventi, letti anche dal loop di monitoraggio
+CONTAINER_EXIT_GRACE = 60  # Secondi di arresto prima dell'alert "exited" (un criterio di riavvio lo rimette in piedi prima)
+
+# Azioni in blocco sui container: selezione per chat e avanzamento in un solo messaggio
+DOCKER_BULK_STATES = {}  # chat_id -> {"selected": set di id container, "page": int}
+DOCKER_BULK_ACTIONS = ("start", "stop", "restart", "pause")
+DOCKER_BULK_MAX_PARALLELISM = 16
+DOCKER_BULK_PROGRESS_INTERVAL = 2  # Secondi minimi tra due modifiche del messaggio di avanzamento
+DOCKER_BULK_MAX_ERRORS_SHOWN = 10  # Errori elencati nel messaggio (gli altri solo contati)
+
+# Log dei container (/logs e pulsante nei dettagli): memoria limitata qualunque sia la quantità di log
+CONTAINER_LOGS_DEFAULT_LINES = 100
+CONTAINER_LOGS_MAX_LINES = 100000  # Righe finali richiedibili con /logs <container> <righe>
+CONTAINER_LOGS_PAGE_CHARS = 3800  # Caratteri per messaggio (Telegram ne accetta 4096)
+CONTAINER_LOGS_MAX_PAGES = 3  # Oltre questi messaggi i log vengono inviati come file .gz
+CONTAINER_LOGS_MAX_BYTES = 64 * 1024 * 1024  # Byte di log non compressi al massimo nel file
+
+# Campionatore di rete: contatori per interfaccia e velocità medie sempre pronte in memoria
+NETWORK_SAMPLE_INTERVAL = 1  # Secondi tra due letture dei contatori del container
+NETWORK_RATE_WINDOWS = {"1s": 1, "10s": 10, "1m": 60}  # Costanti di tempo delle medie EWMA
+NETWORK_HOST_REFRESH_INTERVAL = 10  # Secondi tra due letture dei contatori dell'host (docker run)
+NETWORK_HOST_IDLE_TIMEOUT = 300  # Dopo quanto tempo senza consultazioni si smette di interrogare l'host
+NETWORK_SAMPLER_THREAD = None
+NETWORK_HOST_THREAD = None
+NETWORK_LOCK = threading.Lock()
+NETWORK_SNAPSHOT = {}  # Ultimo campione pubblicato (sostituito a ogni giro, mai modificato)
+NETWORK_HOST_INFO = {}  # IP host, interfaccia host e contatori host
+NETWORK_LAST_VIEWED = 0
+
+# Snapshot delle metriche: un solo thread campiona, web, bot e alert leggono l'ultimo snapshot
+SYSTEM_PARTITIONS = ('/', '/home', '/var', '/tmp')  # Partizioni mostrate nella vista Disco
+METRICS_THREAD = None
+METRICS_ACTIVE = False
+METRICS_SETTINGS = None  # {"interval", "max_age"} letti dalla configurazione a ogni ciclo e a ogni salvataggio
+METRICS_CONDITION = threading.Condition()  # Notifica i consumatori a ogni nuovo snapshot
+METRICS_SNAPSHOT = None  # Ultimo snapshot pubblicato (MappingProxyType, in sola lettura)
+METRICS_SUBSCRIBERS = []  # Callback chiamate dal thread di raccolta a ogni snapshot
+
+# Storico delle metriche per /graph: un file binario per metrica con record (timestamp, valore)
+HISTORY_DIR = Path('/var/lib/ssh_monitor/history')
+HISTORY_INTERVAL = 30  # Secondi tra due campioni salvati
+HISTORY_RETENTION = 30 * 86400  # Campioni più vecchi di 30 giorni vengono scartati
+HISTORY_COMPACT_INTERVAL = 3600  # Secondi tra due controlli della dimensione dei file
+HISTORY_RECORD = struct.Struct("<dd")
+HISTORY_LOCK = threading.Lock()
+HISTORY_STATE = {"subscribed": False, "last_sample": 0, "last_compact": 0}
+HISTORY_LAST_SAMPLE = {}  # metrica -> timestamp dell'ultimo campione salvato
+HISTORY_CHART_CACHE = {}  # (metrica, intervallo, bucket) -> (ultimo campione, png, statistiche)
+HISTORY_CHART_CACHE_SIZE = 32
+HISTORY_CHART_LOCK = threading.Lock()  # La cache è usata dai thread del pool degli handler
+GRAPH_DEFAULT_RANGE = "24h"
+GRAPH_RANGE_UNITS = {"m": 60, "h": 3600, "d": 86400}
+# Metriche fisse: nome -> (unità nel grafico, unità nella didascalia, minimo e massimo dell'asse Y)
+HISTORY_METRICS = {
+    "cpu": ("%", "%", 0, 100),
+    "ram": ("%", "%", 0, 100),
+    "swap": ("%", "%", 0, 100),
+    "temp": ("C", "°C", None, None),
+    "psi_cpu": ("%", "%", 0, None),
+    "psi_memory": ("%", "%", 0, None),
+    "psi_io": ("%", "%", 0, None)
+}
+
+# Vista "Tutte le risorse": raccolta in parallelo con timeout per singola sezione
+RESOURCE_COLLECTOR_TIMEOUTS = {"cpu": 5, "ram": 2, "disk": 5, "network": 5}  # Secondi
+RESOURCE_EXECUTOR = ThreadPoolExecutor(max_workers=len(RESOURCE_COLLECTOR_TIMEOUTS), thread_name_prefix="resource-collector")
+RESOURCE_INFLIGHT = {}  # nome sezione -> Future ancora in esecuzione (non viene lanciata una seconda copia)
+RESOURCE_LOCK = threading.Lock()
+
+# IP pubblico: aggiornato in background interrogando più servizi in parallelo
+PUBLIC_IP_STATE_FILE = Path('/var/lib/ssh_monitor/public_ip.json')
+PUBLIC_IP_DEFAULT_PROVIDERS = [
+    "https://api.ipify.org",
+    "https://ipv4.icanhazip.com",
+    "https://ifconfig.me/ip",
+    "https://checkip.amazonaws.com"
+]
+PUBLIC_IP_RETRY_INTERVAL = 60  # Secondi prima di riprovare dopo un aggiornamento fallito
+PUBLIC_IP_THREAD = None
+PUBLIC_IP_LOCK = threading.Lock()
+PUBLIC_IP_REFRESH = threading.Event()  # Forza un aggiornamento anticipato (es. cambio configurazione)
+PUBLIC_IP_STATE = {}  # {"ip": str, "provider": str, "updated": float, "changed": float, "error": str}
+
+# Modalità di ricezione degli aggiornamenti: "polling" (getUpdates) o "webhook" (rotta Flask)
+UPDATE_MODE = "polling"
+UPDATE_MODE_LOCK = threading.Lock()
+WEBHOOK_ROUTE = "/telegram/webhook"
+WEBHOOK_SECRET = None  # Confrontato con l'header X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_DISPATCHER_THREAD = None
+
+# Esecuzione degli handler del bot: pool limitato, ordine garantito per singola chat
+HANDLER_WORKERS = 4
+HANDLER_MAX_PENDING_PER_CHAT = 50
+HANDLER_EXECUTOR = ThreadPoolExecutor(max_workers=HANDLER_WORKERS, thread_name_prefix="bot-handler")
+HANDLER_LOCK = threading.Lock()
+HANDLER_CHAT_QUEUES = {}  # chat_id -> deque di (handler, update, context, enqueued)
+HANDLER_STATS = {}  # nome handler -> tempi di attesa in coda ed esecuzione
+
+# Coda di invio dei messaggi Telegram (un solo worker, limiti di frequenza dell'API)
+PRIORITY_ALERT = 0  # Alert e recovery
+PRIORITY_INFO = 1  # Notifiche informative (connessioni SSH, test, ...)
+# Coda senza limite: il worker vi rimette i messaggi da ritentare e non deve mai restare bloccato sulla
+# propria coda; il limite OUTBOUND_MAX_PENDING viene applicato ai nuovi messaggi in send_telegram_message
+OUTBOUND_QUEUE = queue.PriorityQueue()
+OUTBOUND_MAX_PENDING = 1000  # Messaggi in attesa oltre i quali i nuovi messaggi informativi vengono scartati
+OUTBOUND_SEQUENCE = itertools.count()  # Mantiene l'ordine FIFO a parità di priorità
+OUTBOUND_THREAD = None
+OUTBOUND_LOCK = threading.Lock()
+OUTBOUND_GLOBAL_RATE = 30  # Messaggi al secondo verso tutte le chat
+OUTBOUND_CHAT_RATE = 1  # Messaggi al secondo verso la stessa chat
+OUTBOUND_MAX_BACKOFF = 60  # Attesa massima tra due tentativi durante un'interruzione
+OUTBOUND_BUCKETS = {}  # chiave -> {"tokens": float, "updated": monotonic}
+OUTBOUND_STATS = {
+    "enqueued": 0,
+    "sent": 0,
+    "failed": 0,
+    "dropped": 0,
+    "retries": 0,
+    "rate_limited": 0,
+    "collapsed": 0,
+    "replayed": 0,
+    "last_latency": None,
+    "avg_latency": None,
+    "max_latency": 0.0
+}
+OUTBOUND_COLLAPSE = {}  # collapse_key -> id dell'ultimo messaggio in attesa
+OUTBOUND_SUPERSEDED = set()  # id dei messaggi sostituiti da uno più recente
+
+# Spool su disco dei messaggi in uscita (sopravvive a interruzioni di rete e riavvii)
+NOTIFICATION_SPOOL_FILE = Path('/var/lib/ssh_monitor/notification_spool.jsonl')
+NOTIFICATION_SPOOL_FSYNC_INTERVAL = 1  # Secondi massimi tra due fsync
+NOTIFICATION_SPOOL_MAX_BYTES = 1024 * 1024
+SPOOL_LOCK = threading.Lock()
+SPOOL_HANDLE = None
+SPOOL_DIRTY = False
+SPOOL_LAST_SYNC = 0
+SPOOL_PENDING = {}  # id -> record "add" non ancora confermato
+SPOOL_LOADED = False
 
 # ----------------------------------------
 # Funzioni per il sistema di monitoraggio
@@ -80,12 +334,92 @@ def get_default_monitoring_config():
         "disk_usage": {
             # Struttura: {"mount_point": {"enabled": bool, "threshold": float, "reminder_enabled": bool, "reminder_interval": int}}
         },
+        # Pressione PSI: percentuale di tempo in stallo (kind: some/full, window: avg10/avg60)
+        "cpu_pressure": {
+            "enabled": False,
+            "threshold": 20.0,
+            "kind": "some",
+            "window": "avg10",
+            "reminder_enabled": False,
+            "reminder_interval": 300,
+            "reminder_unit": "seconds"
+        },
+        "memory_pressure": {
+            "enabled": False,
+            "threshold": 10.0,
+            "kind": "some",
+            "window": "avg10",
+            "reminder_enabled": False,
+            "reminder_interval": 300,
+            "reminder_unit": "seconds"
+        },
+        "io_pressure": {
+            "enabled": False,
+            "threshold": 20.0,
+            "kind": "some",
+            "window": "avg10",
+            "reminder_enabled": False,
+            "reminder_interval": 300,
+            "reminder_unit": "seconds"
+        },
+        "disk_io": {
+            # Struttura: {"mount_point": {"util": {"enabled": bool, "threshold": float, ...}, "await": {...}, ...}}
+            # Metriche: util (%), await (ms), iops (op/s), throughput (MB/s), queue (richieste in coda)
+        },
         "network_connection": {
             "test_host": "8.8.8.8",
             "test_timeout": 5,
             "reconnect_alert": False
         },
+        # IP pubblico: validità della cache (secondi), servizi interrogati e notifica al cambio
+        "public_ip": {
+            "change_alert": False,
+            "ttl": 900,
+            "timeout": 5,
+            "providers": list(PUBLIC_IP_DEFAULT_PROVIDERS)
+        },
+        # Eventi dei container Docker: arresti inattesi, OOM e cambi di stato di salute
+        "docker_events": {
+            "die_alert": False,
+            "oom_alert": False,
+            "health_alert": False,
+            "cooldown": 300  # Secondi minimi tra due alert uguali per lo stesso container
+        },
+        # Regole di alert sui container: restano attive fino al rientro, con reminder come le soglie dell'host
+        "container_alerts": {
+            "unhealthy": {  # Health check fallito
+                "enabled": False,
+                "reminder_enabled": False,
+                "reminder_interval": 30,
+                "reminder_unit": "minutes"
+            },
+            "restarts": {  # Più di threshold riavvii automatici negli ultimi window secondi
+                "enabled": False,
+                "threshold": 3,
+                "window": 600,
+                "reminder_enabled": False,
+                "reminder_interval": 30,
+                "reminder_unit": "minutes"
+            },
+            "exited": {  # Arresto con codice diverso da zero non richiesto
+                "enabled": False,
+                "reminder_enabled": False,
+                "reminder_interval": 30,
+                "reminder_unit": "minutes"
+            }
+        },
+        # Azioni in blocco sui container (/docker, selezione multipla)
+        "docker_bulk": {
+            "parallelism": 4  # Container su cui si agisce contemporaneamente
+        },
         "monitoring_interval": 60,  # Controllo ogni 60 secondi
+        # Snapshot delle metriche: frequenza di raccolta ed età massima accettata da ogni consumatore (secondi)
+        "metrics_interval": 5,
+        "metrics_max_age": {
+            "web": 10,
+            "bot": 10,
+            "alerts": 120
+        },
         "global_enabled": False
     }
 
@@ -110,33 +444,37 @@ def load_monitoring_config():
 def save_monitoring_config(config):
     """Salva la configurazione del monitoraggio nel file"""
     try:
+        public_ip_changed = load_monitoring_config().get("public_ip") != config.get("public_ip")
         MONITORING_CONFIG_FILE.parent.mkdir(parents=True, exist_ok=True)
         with open(MONITORING_CONFIG_FILE, "w") as f:
             json.dump(config, f, indent=2)
+        update_metrics_settings(config)
+        if public_ip_changed:
+            # Nuovi servizi o nuovo TTL: l'aggiornamento in background riparte subito
+            PUBLIC_IP_REFRESH.set()
         return True
     except Exception as e:
         logger.error(f"Errore nel salvataggio della configurazione monitoraggio: {e}")
         return False
 
-def get_cpu_usage_value():
-    """Ottiene la percentuale di utilizzo CPU corrente"""
-    try:
-        return psutil.cpu_percent(interval=1)
-    except Exception as e:
-        logger.error(f"Errore nel recupero dell'utilizzo CPU: {e}")
-        return None
+def freeze_snapshot(value):
+    """Rende uno snapshot immutabile (dizionari in sola lettura, liste come tuple)"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze_snapshot(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_snapshot(item) for item in value)
+    return value
 
-def get_ram_usage_value():
-    """Ottiene la percentuale di utilizzo RAM corrente"""
-    try:
-        ram = psutil.virtual_memory()
-        return ram.percent
-    except Exception as e:
-        logger.error(f"Errore nel recupero dell'utilizzo RAM: {e}")
-        return None
+def snapshot_to_dict(value):
+    """Converte uno snapshot in strutture modificabili (es. per la serializzazione JSON)"""
+    if isinstance(value, MappingProxyType):
+        return {key: snapshot_to_dict(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [snapshot_to_dict(item) for item in value]
+    return value
 
-def get_cpu_temperature_value():
-    """Ottiene la temperatura CPU corrente"""
+def read_cpu_temperature():
+    """Legge la temperatura CPU (prima i sensori della CPU, poi il primo disponibile)"""
     try:
         temps = psutil.sensors_temperatures()
         # Cerca prima la CPU
@@ -154,23 +492,720 @@ def get_cpu_temperature_value():
         logger.error(f"Errore nel recupero della temperatura CPU: {e}")
         return None
 
+def get_snapshot_mount_points(config):
+    """Percorsi di cui raccogliere l'occupazione: punti di mount configurati e dischi monitorati"""
+    paths = [mount.get('path') for mount in load_mount_points() if mount.get('path')]
+    paths.extend(config.get("disk_usage", {}).keys())
+    return list(dict.fromkeys(paths))
+
+def collect_metrics_snapshot(config):
+    """Raccoglie tutte le metriche di sistema in un unico snapshot
+
+    L'utilizzo CPU è calcolato rispetto alla raccolta precedente, quindi la
+    raccolta non resta mai in attesa (niente interval=1).
+    """
+    cpu_times = psutil.cpu_times_percent(interval=None)
+    cpu_freq = psutil.cpu_freq()
+    ram = psutil.virtual_memory()
+    swap = psutil.swap_memory()
+    
+    mounts = get_mountinfo_index()["mounts"]
+    partitions = {}
+    for mount_point in SYSTEM_PARTITIONS:
+        if mount_point not in mounts:
+            continue
+        try:
+            usage = psutil.disk_usage(mount_point)
+            partitions[mount_point] = {"fstype": mounts[mount_point]["fstype"], "device": get_mount_device(mount_point),
+                                       "total": usage.total, "used": usage.used, "free": usage.free, "percent": usage.percent}
+        except PermissionError:
+            partitions[mount_point] = {"fstype": mounts[mount_point]["fstype"], "error": "access_denied"}
+        except Exception as e:
+            logger.error(f"Errore nella lettura della partizione {mount_point}: {e}")
+    
+    disk_usage = {}
+    for path in get_snapshot_mount_points(config):
+        try:
+            if os.path.exists(path):
+                usage = psutil.disk_usage(path)
+                disk_usage[path] = {"device": get_mount_device(path), "total": usage.total, "used": usage.used,
+                                    "free": usage.free, "percent": usage.percent}
+        except Exception as e:
+            disk_usage[path] = {"error": str(e)}
+    
+    return {
+        "timestamp": time.time(),
+        "cpu": {
+            # Come psutil.cpu_percent: il tempo in iowait non conta come occupato
+            "percent": round(max(0.0, 100.0 - cpu_times.idle - getattr(cpu_times, "iowait", 0.0)), 1),
+            "count": psutil.cpu_count(logical=True),
+            "times_percent": cpu_times._asdict(),
+            "freq": {"current": cpu_freq.current, "min": cpu_freq.min, "max": cpu_freq.max} if cpu_freq else None,
+            "temperature": read_cpu_temperature()
+        },
+        "ram": {"total": ram.total, "used": ram.used, "available": ram.available, "percent": ram.percent},
+        "swap": {"total": swap.total, "used": swap.used, "percent": swap.percent},
+        "uptime": get_uptime(),
+        "partitions": partitions,
+        "disk_usage": disk_usage,
+        "pressure": {resource: read_pressure(resource) for resource in PSI_RESOURCES}
+    }
+
+def update_metrics_settings(config):
+    """Aggiorna frequenza di raccolta ed età massime usate dai lettori dello snapshot"""
+    global METRICS_SETTINGS
+    METRICS_SETTINGS = {
+        "interval": max(1, config.get("metrics_interval", 5)),
+        "max_age": dict(config.get("metrics_max_age", {}))
+    }
+    return METRICS_SETTINGS
+
+def metrics_collector_loop():
+    """Pubblica uno snapshot delle metriche alla frequenza configurata (metrics_interval)"""
+    global METRICS_SNAPSHOT
+    
+    logger.info("Raccolta delle metriche avviata")
+    # La prima lettura della CPU serve solo da riferimento per quella successiva
+    psutil.cpu_times_percent(interval=None)
+    time.sleep(1)
+    
+    sequence = 0
+    while METRICS_ACTIVE:
+        config = load_monitoring_config()
+        settings = update_metrics_settings(config)
+        try:
+            sequence += 1
+            snapshot = collect_metrics_snapshot(config)
+            snapshot["sequence"] = sequence
+            snapshot = freeze_snapshot(snapshot)
+            with METRICS_CONDITION:
+                METRICS_SNAPSHOT = snapshot
+                METRICS_CONDITION.notify_all()
+                subscribers = list(METRICS_SUBSCRIBERS)
+            for callback in subscribers:
+                try:
+                    callback(snapshot)
+                except Exception as e:
+                    logger.error(f"Errore in un sottoscrittore delle metriche: {e}")
+        except Exception as e:
+            logger.error(f"Errore nella raccolta delle metriche: {e}")
+        time.sleep(settings["interval"])
+    
+    logger.info("Raccolta delle metriche arrestata")
+
+def ensure_metrics_collector():
+    """Avvia il thread di raccolta delle metriche se non è già in esecuzione
+
+    Dopo stop_monitoring il primo lettore lo riavvia; se il thread non è ancora
+    uscito dall'attesa riprende senza avviarne un altro.
+    """
+    global METRICS_THREAD, METRICS_ACTIVE
+    
+    with METRICS_CONDITION:
+        METRICS_ACTIVE = True
+        if METRICS_THREAD and METRICS_THREAD.is_alive():
+            return
+        METRICS_THREAD = threading.Thread(target=metrics_collector_loop, daemon=True)
+        METRICS_THREAD.start()
+
+def subscribe_metrics(callback):
+    """Registra una callback chiamata con ogni nuovo snapshot (nel thread di raccolta)"""
+    with METRICS_CONDITION:
+        METRICS_SUBSCRIBERS.append(callback)
+    ensure_metrics_collector()
+
+def get_metrics_snapshot(consumer="bot"):
+    """Restituisce l'ultimo snapshot delle metriche per un consumatore (web, bot, alerts)
+
+    Il lettore non campiona mai: se lo snapshot è più vecchio dell'età massima
+    configurata per il consumatore attende il successivo, al più per un
+    intervallo di raccolta, e poi restituisce quello che c'è (None se nessuno).
+    """
+    ensure_metrics_collector()
+    # Nessuna lettura del file di configurazione: le impostazioni arrivano dal thread di raccolta
+    settings = METRICS_SETTINGS or update_metrics_settings(load_monitoring_config())
+    max_age = settings["max_age"].get(consumer, 10)
+    wait_timeout = settings["interval"] + 2
+    
+    with METRICS_CONDITION:
+        METRICS_CONDITION.wait_for(
+            lambda: METRICS_SNAPSHOT is not None and time.time() - METRICS_SNAPSHOT["timestamp"] <= max_age,
+            timeout=wait_timeout)
+        return METRICS_SNAPSHOT
+
+def get_cpu_usage_value():
+    """Ottiene la percentuale di utilizzo CPU corrente"""
+    snapshot = get_metrics_snapshot("alerts")
+    return snapshot["cpu"]["percent"] if snapshot else None
+
+def get_ram_usage_value():
+    """Ottiene la percentuale di utilizzo RAM corrente"""
+    snapshot = get_metrics_snapshot("alerts")
+    return snapshot["ram"]["percent"] if snapshot else None
+
+def get_cpu_temperature_value():
+    """Ottiene la temperatura CPU corrente"""
+    snapshot = get_metrics_snapshot("alerts")
+    return snapshot["cpu"]["temperature"] if snapshot else None
+
 def get_disk_usage_value(mount_point):
     """Ottiene la percentuale di utilizzo disco per un mount point"""
+    snapshot = get_metrics_snapshot("alerts")
+    if not snapshot:
+        return None
+    # Un mount point appena configurato compare dallo snapshot successivo
+    return snapshot["disk_usage"].get(mount_point, {}).get("percent")
+
+def get_history_values(snapshot):
+    """Estrae da uno snapshot i valori da salvare nello storico (disk:<percorso> per i dischi)"""
+    values = {
+        "cpu": snapshot["cpu"]["percent"],
+        "ram": snapshot["ram"]["percent"],
+        "swap": snapshot["swap"]["percent"],
+        "temp": snapshot["cpu"]["temperature"]
+    }
+    for resource, pressure in snapshot["pressure"].items():
+        values[f"psi_{resource}"] = pressure["some"]["avg10"] if pressure else None
+    for path, usage in snapshot["disk_usage"].items():
+        values[f"disk:{path}"] = usage.get("percent")
+    return {metric: value for metric, value in values.items() if value is not None}
+
+def get_history_file(metric):
+    """Percorso del file di storico di una metrica (il nome è codificato per i percorsi dei dischi)"""
+    return HISTORY_DIR / f"{quote(metric, safe='')}.bin"
+
+def list_history_metrics():
+    """Metriche per cui esiste uno storico"""
+    if not HISTORY_DIR.exists():
+        return []
+    return sorted(unquote(path.stem) for path in HISTORY_DIR.glob("*.bin"))
+
+def compact_history_file(path, cutoff):
+    """Riscrive un file di storico senza i campioni più vecchi di cutoff"""
+    data = array("d")
+    with open(path, "rb") as f:
+        data.frombytes(f.read())
+    start = bisect_left(data[0::2], cutoff)
+    temp_path = path.with_suffix(".tmp")
+    with open(temp_path, "wb") as f:
+        f.write(data[start * 2:].tobytes())
+    os.replace(temp_path, path)
+
+def record_metric_history(snapshot):
+    """Sottoscrittore dello snapshot delle metriche: salva un campione ogni HISTORY_INTERVAL secondi"""
+    timestamp = snapshot["timestamp"]
+    if timestamp - HISTORY_STATE["last_sample"] < HISTORY_INTERVAL:
+        return
+    
     try:
-        if os.path.exists(mount_point):
-            usage = psutil.disk_usage(mount_point)
-            return usage.percent
+        HISTORY_DIR.mkdir(parents=True, exist_ok=True)
+        with HISTORY_LOCK:
+            HISTORY_STATE["last_sample"] = timestamp
+            for metric, value in get_history_values(snapshot).items():
+                with open(get_history_file(metric), "ab") as f:
+                    f.write(HISTORY_RECORD.pack(timestamp, float(value)))
+                HISTORY_LAST_SAMPLE[metric] = timestamp
+            
+            # I file crescono di ~16 byte per campione: si compattano quando superano la conservazione del 10%
+            if timestamp - HISTORY_STATE["last_compact"] >= HISTORY_COMPACT_INTERVAL:
+                HISTORY_STATE["last_compact"] = timestamp
+                max_size = HISTORY_RETENTION // HISTORY_INTERVAL * HISTORY_RECORD.size * 1.1
+                for path in HISTORY_DIR.glob("*.bin"):
+                    if path.stat().st_size > max_size:
+                        compact_history_file(path, timestamp - HISTORY_RETENTION)
+    except Exception as e:
+        logger.error(f"Errore nel salvataggio dello storico delle metriche: {e}")
+
+def ensure_metric_history():
+    """Registra il salvataggio dello storico sullo snapshot delle metriche (una sola volta)"""
+    with HISTORY_LOCK:
+        if HISTORY_STATE["subscribed"]:
+            return
+        HISTORY_STATE["subscribed"] = True
+    subscribe_metrics(record_metric_history)
+
+def read_metric_history(metric, start):
+    """Legge i campioni di una metrica a partire da start
+
+    Returns:
+        tuple: (timestamp, valori) come array di double ordinati per tempo
+    """
+    data = array("d")
+    with HISTORY_LOCK:
+        with open(get_history_file(metric), "rb") as f:
+            data.frombytes(f.read())
+    timestamps = data[0::2]
+    first = bisect_left(timestamps, start)
+    return timestamps[first:], data[1::2][first:]
+
+def parse_graph_range(text):
+    """Converte un intervallo come 90m, 6h o 7d in secondi (None se non valido)"""
+    match = re.fullmatch(r"(\d+)([mhd])", (text or "").strip().lower())
+    if not match:
+        return None
+    seconds = int(match.group(1)) * GRAPH_RANGE_UNITS[match.group(2)]
+    return seconds if 0 < seconds <= HISTORY_RETENTION else None
+
+def render_metric_graph(metric, range_seconds):
+    """Disegna il grafico di una metrica sull'intervallo richiesto
+
+    Il risultato resta in cache per (metrica, intervallo, bucket) finché non
+    arriva un nuovo campione; la fine dell'asse X è allineata al bucket
+    dell'ultimo campione, così lo stesso storico produce sempre la stessa immagine.
+
+    Returns:
+        tuple: (png, statistiche {"min", "max", "avg", "samples"}) oppure (None, None) senza dati
+    """
+    bucket = range_seconds / chart_renderer.PLOT_WIDTH
+    key = (metric, range_seconds, bucket)
+    last_sample = HISTORY_LAST_SAMPLE.get(metric)
+    with HISTORY_CHART_LOCK:
+        cached = HISTORY_CHART_CACHE.get(key)
+    if cached and last_sample and cached[0] == last_sample:
+        return cached[1], cached[2]
+    
+    if not get_history_file(metric).exists():
+        return None, None
+    end_hint = last_sample or time.time()
+    timestamps, values = read_metric_history(metric, end_hint - range_seconds - bucket)
+    if not timestamps:
+        return None, None
+    last_sample = timestamps[-1]
+    HISTORY_LAST_SAMPLE.setdefault(metric, last_sample)
+    end = (math.floor(last_sample / bucket) + 1) * bucket
+    start = end - range_seconds
+    
+    buckets = chart_renderer.downsample(timestamps, values, start, end)
+    present = [item for item in buckets if item]
+    if not present:
+        return None, None
+    unit, _, y_min, y_max = HISTORY_METRICS.get(metric, ("%", "%", 0, 100))
+    png = chart_renderer.render_line_chart(buckets, start, end, unit=unit, y_min=y_min, y_max=y_max,
+                                           max_gap=HISTORY_INTERVAL * 3)
+    first = bisect_left(timestamps, start)
+    stats = {
+        "min": min(item[0] for item in present),
+        "max": max(item[1] for item in present),
+        "avg": sum(values[first:]) / max(1, len(values) - first),
+        "samples": len(values) - first
+    }
+    
+    # Il disegno avviene fuori dal lock; due richieste uguali producono la stessa immagine
+    with HISTORY_CHART_LOCK:
+        if key not in HISTORY_CHART_CACHE and len(HISTORY_CHART_CACHE) >= HISTORY_CHART_CACHE_SIZE:
+            HISTORY_CHART_CACHE.pop(next(iter(HISTORY_CHART_CACHE)))
+        HISTORY_CHART_CACHE[key] = (last_sample, png, stats)
+    return png, stats
+
+def read_pressure(resource):
+    """Legge /proc/pressure/<resource> e restituisce i valori some/full
+
+    Returns:
+        dict: {"some": {"avg10": float, "avg60": float, "avg300": float, "total": int}, "full": {...}}
+              oppure None se PSI non è disponibile
+    """
+    try:
+        with open(PSI_PATH / resource, "r") as f:
+            pressure = {}
+            for line in f:
+                parts = line.split()
+                if not parts:
+                    continue
+                values = {}
+                for item in parts[1:]:
+                    key, _, value = item.partition("=")
+                    values[key] = int(value) if key == "total" else float(value)
+                pressure[parts[0]] = values
+            return pressure
+    except FileNotFoundError:
+        logger.debug(f"PSI non disponibile per {resource} (kernel senza CONFIG_PSI?)")
         return None
     except Exception as e:
-        logger.error(f"Errore nel recupero dell'utilizzo disco per {mount_point}: {e}")
+        logger.error(f"Errore nella lettura della pressione {resource}: {e}")
+        return None
+
+def get_pressure_value(resource, kind="some", window="avg10"):
+    """Ottiene la percentuale di stallo PSI per una risorsa (cpu, memory, io)"""
+    pressure = read_pressure(resource)
+    if not pressure or kind not in pressure:
         return None
+    return pressure[kind].get(window)
 
-def send_alert_notification(parameter_name, current_value, threshold, is_alert=True):
+def get_parameter_config(config, parameter_name):
+    """Restituisce la sezione di configurazione associata a un parametro monitorato"""
+    if parameter_name.startswith("container_"):
+        _, rule, _ = parameter_name.split("_", 2)
+        return config.get("container_alerts", {}).get(rule, {})
+    if parameter_name.startswith("diskio_"):
+        _, metric, mount_point = parameter_name.split("_", 2)
+        return config.get("disk_io", {}).get(mount_point, {}).get(metric, {})
+    if parameter_name.startswith("disk_"):
+        mount_point = parameter_name.replace("disk_", "")
+        return config.get("disk_usage", {}).get(mount_point, {})
+    return config.get(parameter_name, {})
+
+def register_psi_trigger(resource, param_config):
+    """Registra un trigger PSI nel kernel e restituisce il file descriptor da passare a poll()
+
+    Il kernel notifica POLLPRI quando il tempo di stallo nella finestra supera la soglia.
+    La finestra del trigger è sempre PSI_TRIGGER_WINDOW_US (10 s, il massimo consentito),
+    anche se l'alert è configurato su avg60 o avg300: il trigger anticipa l'alert, mentre
+    il rientro segue la media configurata.
+    """
+    kind = param_config.get("kind", "some")
+    threshold = float(param_config.get("threshold", 0))
+    stall_us = int(PSI_TRIGGER_WINDOW_US * threshold / 100)
+    if stall_us <= 0 or stall_us > PSI_TRIGGER_WINDOW_US:
+        logger.warning(f"Soglia PSI non valida per {resource}: {threshold}%")
+        return None
+
+    fd = None
+    try:
+        fd = os.open(str(PSI_PATH / resource), os.O_RDWR | os.O_NONBLOCK)
+        os.write(fd, f"{kind} {stall_us} {PSI_TRIGGER_WINDOW_US}\0".encode())
+        logger.info(f"Trigger PSI registrato per {resource}: {kind} {stall_us}us / {PSI_TRIGGER_WINDOW_US}us")
+        return fd
+    except Exception as e:
+        # Kernel senza supporto ai trigger o permessi insufficienti: resta il controllo periodico
+        logger.info(f"Trigger PSI non disponibile per {resource}, uso il controllo periodico: {e}")
+        if fd is not None:
+            os.close(fd)
+        return None
+
+def sample_pressure_window(resource, kind):
+    """Campiona il contatore total di PSI e misura lo stallo % nella finestra del trigger
+
+    È la stessa grandezza che il kernel confronta con la soglia del trigger; le
+    medie avg10/avg60 la seguono in ritardo (dopo 10 s di stallo costante avg10
+    ne vale circa il 63%). La misura viene salvata in PSI_WINDOW_VALUES quando
+    i campioni coprono almeno metà finestra.
+    """
+    pressure = read_pressure(resource)
+    if not pressure or "total" not in pressure.get(kind, {}):
+        return
+    now = time.monotonic()
+    total = pressure[kind]["total"]
+    window = PSI_TRIGGER_WINDOW_US / 1000000
+    samples = PSI_WINDOW_SAMPLES.setdefault((resource, kind), deque())
+    samples.append((now, total))
+    # Il primo campione resta il più recente tra quelli vecchi almeno quanto la finestra
+    while len(samples) > 1 and now - samples[1][0] >= window:
+        samples.popleft()
+    start, start_total = samples[0]
+    if now - start >= window / 2:
+        PSI_WINDOW_VALUES[(resource, kind)] = ((total - start_total) / ((now - start) * 1000000) * 100, now)
+
+def check_pressure_parameter(resource, config):
+    """Valuta la soglia di pressione PSI di una risorsa
+
+    Con i trigger attivi conta anche lo stallo misurato sulla finestra del
+    trigger: l'alert scatta subito quando il kernel lo segnala e rientra solo
+    quando anche la media configurata torna sotto la soglia.
+    """
+    parameter_name = f"{resource}_pressure"
+    param_config = config.get(parameter_name, {})
+    kind = param_config.get("kind", "some")
+    value = get_pressure_value(resource, kind, param_config.get("window", "avg10"))
+    window_value, measured = PSI_WINDOW_VALUES.get((resource, kind), (None, 0))
+    if value is not None and window_value is not None and time.monotonic() - measured < PSI_WINDOW_MAX_AGE:
+        value = max(value, round(window_value, 2))
+    check_parameter_threshold(parameter_name, value, param_config)
+
+def psi_trigger_loop():
+    """Thread che attende i trigger PSI del kernel tramite poll()"""
+    logger.info("Thread trigger PSI avviato")
+
+    poller = select.poll()
+    triggers = {}  # fd -> risorsa
+    kinds = {}  # risorsa -> some/full del trigger registrato
+    signature = None
+
+    def close_triggers():
+        for fd in list(triggers):
+            try:
+                poller.unregister(fd)
+                os.close(fd)
+            except Exception:
+                pass
+        triggers.clear()
+        kinds.clear()
+        PSI_WINDOW_SAMPLES.clear()
+        PSI_WINDOW_VALUES.clear()
+
+    last_config_check = 0
+    while PSI_TRIGGER_ACTIVE:
+        try:
+            # Ricarica i trigger solo quando la configurazione PSI cambia
+            if time.time() - last_config_check >= 10:
+                last_config_check = time.time()
+                config = load_monitoring_config()
+                new_signature = tuple(
+                    (resource,
+                     config.get(f"{resource}_pressure", {}).get("enabled", False),
+                     config.get(f"{resource}_pressure", {}).get("threshold"),
+                     config.get(f"{resource}_pressure", {}).get("kind", "some"))
+                    for resource in PSI_RESOURCES
+                ) + (config.get("global_enabled", False),)
+                if new_signature != signature:
+                    signature = new_signature
+                    close_triggers()
+                    if config.get("global_enabled", False):
+                        for resource in PSI_RESOURCES:
+                            param_config = config.get(f"{resource}_pressure", {})
+                            if param_config.get("enabled", False):
+                                fd = register_psi_trigger(resource, param_config)
+                                if fd is not None:
+                                    poller.register(fd, select.POLLPRI)
+                                    triggers[fd] = resource
+                                    kinds[resource] = param_config.get("kind", "some")
+
+            if not triggers:
+                time.sleep(1)
+                continue
+
+            events = poller.poll(1000)
+            # Circa un campione al secondo: misura lo stallo sulla stessa finestra del kernel
+            for resource, kind in kinds.items():
+                sample_pressure_window(resource, kind)
+            for fd, event in events:
+                resource = triggers.get(fd)
+                if resource is None:
+                    continue
+                if event & select.POLLERR:
+                    # Il file di pressione non è più valido: forza la nuova registrazione
+                    logger.warning(f"Trigger PSI non più valido per {resource}")
+                    signature = None
+                    continue
+                if event & select.POLLPRI:
+                    logger.debug(f"Trigger PSI scattato per {resource}")
+                    check_pressure_parameter(resource, load_monitoring_config())
+        except Exception as e:
+            logger.error(f"Errore nel thread trigger PSI: {e}")
+            time.sleep(5)
+
+    close_triggers()
+    logger.info("Thread trigger PSI arrestato")
+
+def read_diskstats():
+    """Legge /proc/diskstats e restituisce i contatori cumulativi per dispositivo"""
+    stats = {}
+    try:
+        with open(DISKSTATS_PATH, "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 14:
+                    continue
+                stats[parts[2]] = {
+                    "major": int(parts[0]),
+                    "minor": int(parts[1]),
+                    "reads": int(parts[3]),
+                    "read_sectors": int(parts[5]),
+                    "read_ticks": int(parts[6]),
+                    "writes": int(parts[7]),
+                    "write_sectors": int(parts[9]),
+                    "write_ticks": int(parts[10]),
+                    "in_flight": int(parts[11]),
+                    "io_ticks": int(parts[12]),
+                    "weighted_ticks": int(parts[13])
+                }
+    except Exception as e:
+        logger.error(f"Errore nella lettura di {DISKSTATS_PATH}: {e}")
+    return stats
+
+def compute_diskstats_rates(previous, current, elapsed):
+    """Calcola IOPS, throughput, await e utilizzo dai delta tra due campioni di diskstats"""
+    rates = {}
+    if elapsed <= 0:
+        return rates
+    elapsed_ms = elapsed * 1000
+    for device, curr in current.items():
+        prev = previous.get(device)
+        if not prev:
+            continue
+        # I contatori possono ripartire da zero (dispositivo rimosso e ricollegato)
+        delta = {key: curr[key] - prev[key] for key in curr if key not in ("major", "minor", "in_flight")}
+        if any(value < 0 for value in delta.values()):
+            continue
+        ios = delta["reads"] + delta["writes"]
+        read_bytes = delta["read_sectors"] * DISKSTATS_SECTOR_SIZE
+        write_bytes = delta["write_sectors"] * DISKSTATS_SECTOR_SIZE
+        rates[device] = {
+            "read_iops": delta["reads"] / elapsed,
+            "write_iops": delta["writes"] / elapsed,
+            "iops": ios / elapsed,
+            "read_bytes_per_sec": read_bytes / elapsed,
+            "write_bytes_per_sec": write_bytes / elapsed,
+            "throughput": (read_bytes + write_bytes) / elapsed / (1024 * 1024),  # MB/s
+            "await": (delta["read_ticks"] + delta["write_ticks"]) / ios if ios else 0.0,  # ms
+            "util": min(100.0, delta["io_ticks"] / elapsed_ms * 100),
+            "queue": delta["weighted_ticks"] / elapsed_ms,
+            "in_flight": curr["in_flight"]
+        }
+    return rates
+
+def diskstats_sampler_loop():
+    """Campiona /proc/diskstats a intervalli regolari e mantiene le velocità per dispositivo"""
+    global DISKSTATS_RATES, DISKSTATS_DEVICES
+    
+    logger.info("Campionatore diskstats avviato")
+    previous = read_diskstats()
+    previous_time = time.monotonic()
+    
+    while DISKSTATS_ACTIVE:
+        time.sleep(DISKSTATS_SAMPLE_INTERVAL)
+        try:
+            current = read_diskstats()
+            now = time.monotonic()
+            rates = compute_diskstats_rates(previous, current, now - previous_time)
+            devices = {(stats["major"], stats["minor"]): device for device, stats in current.items()}
+            with DISKSTATS_LOCK:
+                DISKSTATS_RATES = {"timestamp": time.time(), "interval": now - previous_time, "devices": rates}
+                DISKSTATS_DEVICES = devices
+            previous, previous_time = current, now
+        except Exception as e:
+            logger.error(f"Errore nel campionamento diskstats: {e}")
+    
+    logger.info("Campionatore diskstats arrestato")
+
+def ensure_diskstats_sampler():
+    """Avvia il campionatore diskstats se non è già in esecuzione"""
+    global DISKSTATS_THREAD, DISKSTATS_ACTIVE
+    
+    if DISKSTATS_THREAD and DISKSTATS_THREAD.is_alive():
+        return
+    if not DISKSTATS_PATH.exists():
+        logger.warning(f"{DISKSTATS_PATH} non disponibile, statistiche I/O disattivate")
+        return
+    DISKSTATS_ACTIVE = True
+    DISKSTATS_THREAD = threading.Thread(target=diskstats_sampler_loop, daemon=True)
+    DISKSTATS_THREAD.start()
+
+def unescape_mountinfo(field):
+    """Decodifica gli escape ottali di mountinfo (es. \\040 per lo spazio)"""
+    return re.sub(r"\\([0-7]{3})", lambda match: chr(int(match.group(1), 8)), field)
+
+def parse_mountinfo(content):
+    """Analizza /proc/self/mountinfo
+
+    Formato: id parent major:minor root mount_point opzioni [campi opzionali] - fstype sorgente super_opzioni
+    """
+    mounts = {}
+    by_dev = {}
+    for line in content.splitlines():
+        fields = line.split()
+        try:
+            separator = fields.index("-")
+            major, minor = (int(value) for value in fields[2].split(":"))
+        except (ValueError, IndexError):
+            continue
+        mount_point = unescape_mountinfo(fields[4])
+        source = unescape_mountinfo(fields[separator + 2]) if len(fields) > separator + 2 else ""
+        # A parità di mount point vale l'ultimo montato (quello visibile)
+        mounts[mount_point] = {
+            "dev": (major, minor),
+            "root": unescape_mountinfo(fields[3]),
+            "fstype": fields[separator + 1],
+            "source": source,
+            "options": fields[5]
+        }
+        by_dev.setdefault((major, minor), []).append(mount_point)
+    return {"mounts": mounts, "by_dev": by_dev, "built": time.time()}
+
+def rebuild_mountinfo_index():
+    """Rilegge mountinfo e pubblica il nuovo indice"""
+    global MOUNTINFO_INDEX
+    
+    try:
+        with open(MOUNTINFO_PATH, "r") as f:
+            index = parse_mountinfo(f.read())
+    except Exception as e:
+        logger.error(f"Errore nella lettura di {MOUNTINFO_PATH}: {e}")
+        return MOUNTINFO_INDEX
+    with MOUNTINFO_LOCK:
+        MOUNTINFO_INDEX = index
+    logger.debug(f"Indice dei mount ricostruito: {len(index['mounts'])} mount point")
+    return index
+
+def mountinfo_watch_loop():
+    """Ricostruisce l'indice dei mount quando mountinfo segnala un cambio (POLLPRI)"""
+    try:
+        with open(MOUNTINFO_PATH, "r") as f:
+            poller = select.poll()
+            poller.register(f, select.POLLPRI | select.POLLERR)
+            while True:
+                # Il kernel segnala POLLPRI|POLLERR a ogni mount/umount nel namespace
+                if poller.poll(MOUNTINFO_FALLBACK_TTL * 1000):
+                    rebuild_mountinfo_index()
+    except Exception as e:
+        logger.warning(f"poll() su {MOUNTINFO_PATH} non disponibile ({e}), ricostruzione ogni {MOUNTINFO_FALLBACK_TTL}s")
+        while True:
+            time.sleep(MOUNTINFO_FALLBACK_TTL)
+            rebuild_mountinfo_index()
+
+def get_mountinfo_index():
+    """Restituisce l'indice dei mount, costruendolo e avviando il watcher al primo utilizzo"""
+    global MOUNTINFO_THREAD
+    
+    with MOUNTINFO_LOCK:
+        index = MOUNTINFO_INDEX
+        if not (MOUNTINFO_THREAD and MOUNTINFO_THREAD.is_alive()):
+            MOUNTINFO_THREAD = threading.Thread(target=mountinfo_watch_loop, daemon=True)
+            MOUNTINFO_THREAD.start()
+    return index or rebuild_mountinfo_index() or {"mounts": {}, "by_dev": {}, "built": 0}
+
+def find_mount(path):
+    """Restituisce (mount_point, dati del mount) del filesystem che contiene un percorso
+
+    Il confronto è per componenti di percorso (il mount più lungo che lo
+    contiene), quindi /mnt/data non viene confuso con /mnt/data2.
+    """
+    mounts = get_mountinfo_index()["mounts"]
+    path = os.path.realpath(path)
+    candidate = path
+    while True:
+        if candidate in mounts:
+            return candidate, mounts[candidate]
+        if candidate == "/":
+            return None, None
+        candidate = os.path.dirname(candidate)
+
+def get_mount_device(mount_point):
+    """Restituisce il dispositivo di /proc/diskstats che ospita un mount point
+
+    La corrispondenza avviene tramite major:minor dell'indice mountinfo, quindi
+    non serve eseguire `mount` né confrontare i nomi dei dispositivi come stringhe.
+    """
+    _, mount = find_mount(mount_point)
+    if not mount:
+        return None
+    with DISKSTATS_LOCK:
+        devices = DISKSTATS_DEVICES
+    if not devices:
+        devices = {(stats["major"], stats["minor"]): device for device, stats in read_diskstats().items()}
+    device = devices.get(mount["dev"])
+    if not device and mount["source"].startswith("/dev/"):
+        # Dispositivi non presenti in diskstats (es. device mapper con nomi diversi)
+        device = os.path.basename(mount["source"])
+    return device
+
+def get_disk_io_rates(mount_point):
+    """Restituisce le metriche I/O dell'ultimo intervallo per il dispositivo di un mount point"""
+    device = get_mount_device(mount_point)
+    if not device:
+        return None, None
+    with DISKSTATS_LOCK:
+        rates = DISKSTATS_RATES.get("devices", {}).get(device) if DISKSTATS_RATES else None
+    return device, rates
+
+def send_alert_notification(parameter_name, current_value, threshold, is_alert=True, reminder=False):
     """Invia una notifica di alert o recovery via Telegram"""
     try:
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        if is_alert:
+        if parameter_name.startswith("container_"):
+            # Regole sui container (il nome del container può contenere qualunque carattere)
+            message = format_container_notification(parameter_name, current_value, threshold, timestamp, is_alert)
+        elif is_alert:
             # Alert: parametro sopra soglia
             if parameter_name.startswith("disk_"):
                 mount_point = parameter_name.replace("disk_", "")
@@ -194,6 +1229,10 @@ def send_alert_notification(parameter_name, current_value, threshold, is_alert=T
                                             value=current_value, 
                                             threshold=threshold, 
                                             timestamp=timestamp)
+            elif parameter_name.endswith("_pressure"):
+                message = format_pressure_notification(parameter_name, current_value, threshold, timestamp, is_alert=True)
+            elif parameter_name.startswith("diskio_"):
+                message = format_disk_io_notification(parameter_name, current_value, threshold, timestamp, is_alert=True)
         else:
             # Recovery: parametro rientrato nella soglia
             if parameter_name.startswith("disk_"):
@@ -218,12 +1257,63 @@ def send_alert_notification(parameter_name, current_value, threshold, is_alert=T
                                             value=current_value, 
                                             threshold=threshold, 
                                             timestamp=timestamp)
-        
-        return send_telegram_message(message)
+            elif parameter_name.endswith("_pressure"):
+                message = format_pressure_notification(parameter_name, current_value, threshold, timestamp, is_alert=False)
+            elif parameter_name.startswith("diskio_"):
+                message = format_disk_io_notification(parameter_name, current_value, threshold, timestamp, is_alert=False)
+        
+        # Durante un'interruzione resta in coda solo l'ultimo reminder per parametro,
+        # e un recovery rende superflui quelli ancora in attesa
+        reminder_key = f"reminder:{parameter_name}"
+        if not is_alert:
+            supersede_outbound(reminder_key)
+        return send_telegram_message(message, priority=PRIORITY_ALERT,
+                                     collapse_key=reminder_key if reminder else None)
     except Exception as e:
         logger.error(f"Errore nell'invio della notifica: {e}")
         return False
 
+def format_pressure_notification(parameter_name, current_value, threshold, timestamp, is_alert=True):
+    """Formatta il messaggio di alert/recovery per un parametro di pressione PSI"""
+    resource = parameter_name[:-len("_pressure")]
+    param_config = load_monitoring_config().get(parameter_name, {})
+    key = "pressure_alert" if is_alert else "pressure_recovery"
+    return get_bot_translation(f"bot_messages.alert_messages.{key}",
+                               resource=get_bot_translation(f"bot_messages.alert_messages.pressure_resources.{resource}"),
+                               kind=param_config.get("kind", "some"),
+                               window=param_config.get("window", "avg10"),
+                               value=current_value,
+                               threshold=threshold,
+                               timestamp=timestamp)
+
+def format_disk_io_notification(parameter_name, current_value, threshold, timestamp, is_alert=True):
+    """Formatta il messaggio di alert/recovery per una metrica I/O di un mount point"""
+    _, metric, mount_point = parameter_name.split("_", 2)
+    key = "diskio_alert" if is_alert else "diskio_recovery"
+    return get_bot_translation(f"bot_messages.alert_messages.{key}",
+                               mount_point=mount_point,
+                               device=get_mount_device(mount_point) or "?",
+                               metric=get_bot_translation(f"bot_messages.alert_messages.diskio_metrics.{metric}"),
+                               unit=get_bot_translation(f"bot_messages.alert_messages.diskio_units.{metric}"),
+                               value=current_value,
+                               threshold=threshold,
+                               timestamp=timestamp)
+
+def format_container_notification(parameter_name, current_value, threshold, timestamp, is_alert=True):
+    """Formatta il messaggio di alert/recovery per una regola su un container"""
+    _, rule, name = parameter_name.split("_", 2)
+    inventory = DOCKER_INVENTORY
+    entry = inventory["containers"].get(inventory["by_name"].get(name)) or {}
+    rule_config = load_monitoring_config().get("container_alerts", {}).get(rule, {})
+    key = f"container_{rule}_alert" if is_alert else f"container_{rule}_recovery"
+    return get_bot_translation(f"bot_messages.alert_messages.{key}",
+                               name=name,
+                               image=entry.get("image") or "?",
+                               value=int(current_value),
+                               threshold=int(threshold),
+                               window=max(1, round(rule_config.get("window", 600) / 60)),
+                               timestamp=timestamp)
+
 def setup_reminder_timer(parameter_name, config):
     """Imposta un timer per il reminder di un parametro"""
     global REMINDER_TIMERS
@@ -264,15 +1354,11 @@ def setup_reminder_timer(parameter_name, config):
                     threshold = ALERT_STATES[parameter_name]["threshold"]
                     
                     logger.info(f"Invio reminder per {parameter_name}: valore {current_value}, soglia {threshold}")
-                    send_alert_notification(parameter_name, current_value, threshold, is_alert=True)
+                    send_alert_notification(parameter_name, current_value, threshold, is_alert=True, reminder=True)
                     
                     # Ricarica la configurazione corrente per il prossimo timer
                     current_config = load_monitoring_config()
-                    if parameter_name.startswith("disk_"):
-                        mount_point = parameter_name.replace("disk_", "")
-                        param_config = current_config.get("disk_usage", {}).get(mount_point, {})
-                    else:
-                        param_config = current_config.get(parameter_name, {})
+                    param_config = get_parameter_config(current_config, parameter_name)
                     
                     # Imposta il prossimo reminder solo se ancora abilitato
                     if param_config.get("reminder_enabled", False):
@@ -296,65 +1382,67 @@ def check_parameter_threshold(parameter_name, current_value, config):
     """Controlla se un parametro ha superato o rientrato nella soglia"""
     global ALERT_STATES
     
-    try:
-        if current_value is None:
-            return
+    # Il controllo può arrivare sia dal loop periodico sia dai trigger PSI
+    with ALERT_LOCK:
+        try:
+            if current_value is None:
+                return
             
-        threshold = config.get("threshold", 0)
-        was_in_alert = parameter_name in ALERT_STATES and ALERT_STATES[parameter_name]["active"]
-        
-        # Controlla se il parametro supera la soglia
-        if current_value > threshold:
-            if not was_in_alert:
-                # Nuovo alert
-                ALERT_STATES[parameter_name] = {
-                    "active": True,
-                    "current_value": current_value,
-                    "threshold": threshold,
-                    "alert_start": datetime.now()
-                }
-                logger.info(f"Nuovo alert per {parameter_name}: valore {current_value} > soglia {threshold}")
-                send_alert_notification(parameter_name, current_value, threshold, is_alert=True)
+            threshold = config.get("threshold", 0)
+            was_in_alert = parameter_name in ALERT_STATES and ALERT_STATES[parameter_name]["active"]
+        
+            # Controlla se il parametro supera la soglia
+            if current_value > threshold:
+                if not was_in_alert:
+                    # Nuovo alert
+                    ALERT_STATES[parameter_name] = {
+                        "active": True,
+                        "current_value": current_value,
+                        "threshold": threshold,
+                        "alert_start": datetime.now()
+                    }
+                    logger.info(f"Nuovo alert per {parameter_name}: valore {current_value} > soglia {threshold}")
+                    send_alert_notification(parameter_name, current_value, threshold, is_alert=True)
                 
-                # Imposta reminder se abilitato
-                if config.get("reminder_enabled", False):
-                    logger.info(f"Impostazione reminder per nuovo alert: {parameter_name}")
-                    setup_reminder_timer(parameter_name, config)
+                    # Imposta reminder se abilitato
+                    if config.get("reminder_enabled", False):
+                        logger.info(f"Impostazione reminder per nuovo alert: {parameter_name}")
+                        setup_reminder_timer(parameter_name, config)
+                    else:
+                        logger.debug(f"Reminder non abilitato per {parameter_name}")
                 else:
-                    logger.debug(f"Reminder non abilitato per {parameter_name}")
+                    # Aggiorna valore corrente per alert esistente
+                    ALERT_STATES[parameter_name]["current_value"] = current_value
+                    ALERT_STATES[parameter_name]["threshold"] = threshold
+                    logger.debug(f"Aggiornamento alert esistente per {parameter_name}: valore {current_value}")
+                
+                    # Verifica se il reminder è ancora attivo e correttamente configurato
+                    if config.get("reminder_enabled", False):
+                        # Se il reminder è abilitato ma non c'è un timer attivo, riavvialo
+                        if parameter_name not in REMINDER_TIMERS:
+                            logger.warning(f"Reminder abilitato ma timer non attivo per {parameter_name}, riavvio")
+                            setup_reminder_timer(parameter_name, config)
+                    else:
+                        # Se il reminder è stato disabilitato, cancella il timer esistente
+                        if parameter_name in REMINDER_TIMERS:
+                            logger.info(f"Reminder disabilitato per {parameter_name}, cancello timer")
+                            REMINDER_TIMERS[parameter_name].cancel()
+                            del REMINDER_TIMERS[parameter_name]
             else:
-                # Aggiorna valore corrente per alert esistente
-                ALERT_STATES[parameter_name]["current_value"] = current_value
-                ALERT_STATES[parameter_name]["threshold"] = threshold
-                logger.debug(f"Aggiornamento alert esistente per {parameter_name}: valore {current_value}")
+                if was_in_alert:
+                    # Recovery: parametro rientrato nella soglia
+                    send_alert_notification(parameter_name, current_value, threshold, is_alert=False)
                 
-                # Verifica se il reminder è ancora attivo e correttamente configurato
-                if config.get("reminder_enabled", False):
-                    # Se il reminder è abilitato ma non c'è un timer attivo, riavvialo
-                    if parameter_name not in REMINDER_TIMERS:
-                        logger.warning(f"Reminder abilitato ma timer non attivo per {parameter_name}, riavvio")
-                        setup_reminder_timer(parameter_name, config)
-                else:
-                    # Se il reminder è stato disabilitato, cancella il timer esistente
+                    # Cancella timer reminder se presente
                     if parameter_name in REMINDER_TIMERS:
-                        logger.info(f"Reminder disabilitato per {parameter_name}, cancello timer")
                         REMINDER_TIMERS[parameter_name].cancel()
                         del REMINDER_TIMERS[parameter_name]
-        else:
-            if was_in_alert:
-                # Recovery: parametro rientrato nella soglia
-                send_alert_notification(parameter_name, current_value, threshold, is_alert=False)
-                
-                # Cancella timer reminder se presente
-                if parameter_name in REMINDER_TIMERS:
-                    REMINDER_TIMERS[parameter_name].cancel()
-                    del REMINDER_TIMERS[parameter_name]
                 
-                # Rimuovi dallo stato alert
-                del ALERT_STATES[parameter_name]
+                    # Rimuovi dallo stato alert
+                    del ALERT_STATES[parameter_name]
                 
-    except Exception as e:
-        logger.error(f"Errore nel controllo soglia per {parameter_name}: {e}")
+        except Exception as e:
+            logger.error(f"Errore nel controllo soglia per {parameter_name}: {e}")
 
 def monitoring_loop():
     """Loop principale del monitoraggio"""
@@ -385,6 +1473,11 @@ def monitoring_loop():
                 temp_value = get_cpu_temperature_value()
                 check_parameter_threshold("cpu_temperature", temp_value, config["cpu_temperature"])
             
+            # Controlla la pressione PSI (cpu, memory, io); i trigger del kernel anticipano gli alert
+            for resource in PSI_RESOURCES:
+                if config.get(f"{resource}_pressure", {}).get("enabled", False):
+                    check_pressure_parameter(resource, config)
+            
             # Controlla utilizzo disco per ogni mount point configurato
             for mount_point, mount_config in config["disk_usage"].items():
                 if mount_config.get("enabled", False):
@@ -392,6 +1485,21 @@ def monitoring_loop():
                     parameter_name = f"disk_{mount_point}"
                     check_parameter_threshold(parameter_name, disk_value, mount_config)
             
+            # Controlla le metriche I/O (dall'ultimo campione diskstats) per ogni mount point configurato
+            for mount_point, metrics_config in config.get("disk_io", {}).items():
+                enabled_metrics = [metric for metric in DISK_IO_METRICS
+                                   if metrics_config.get(metric, {}).get("enabled", False)]
+                if not enabled_metrics:
+                    continue
+                _, rates = get_disk_io_rates(mount_point)
+                for metric in enabled_metrics:
+                    value = rates.get(metric) if rates else None
+                    check_parameter_threshold(f"diskio_{metric}_{mount_point}", value, metrics_config[metric])
+            
+            # Regole sui container: lo stato arriva dagli eventi, qui si fanno scadere le finestre dei riavvii
+            if any(rule.get("enabled", False) for rule in config.get("container_alerts", {}).values()):
+                evaluate_container_alerts(config=config)
+            
             # Attendi l'intervallo di monitoraggio
             time.sleep(config.get("monitoring_interval", 60))
             
@@ -403,7 +1511,7 @@ def monitoring_loop():
 
 def start_monitoring():
     """Avvia il sistema di monitoraggio"""
-    global MONITORING_THREAD, MONITORING_ACTIVE
+    global MONITORING_THREAD, MONITORING_ACTIVE, PSI_TRIGGER_THREAD, PSI_TRIGGER_ACTIVE
     
     if MONITORING_THREAD and MONITORING_THREAD.is_alive():
         logger.info("Sistema di monitoraggio già attivo")
@@ -413,6 +1521,28 @@ def start_monitoring():
         MONITORING_ACTIVE = True
         MONITORING_THREAD = threading.Thread(target=monitoring_loop, daemon=True)
         MONITORING_THREAD.start()
+        
+        # Snapshot delle metriche condiviso da alert, bot e interfaccia web, con lo storico per /graph
+        ensure_metrics_collector()
+        ensure_metric_history()
+        
+        # Campionatore delle statistiche I/O (usato dagli alert e dalla vista disco)
+        ensure_diskstats_sampler()
+        
+        # Campionatore di rete (la vista Rete legge l'ultimo campione senza attese)
+        ensure_network_sampler()
+        
+        # IP pubblico in cache, con notifica quando cambia
+        ensure_public_ip_tracker()
+        
+        # Inventario dei container aggiornato dagli eventi Docker (e relativi alert)
+        ensure_docker_inventory()
+        
+        # Thread per i trigger PSI (attivo solo se il kernel espone /proc/pressure)
+        if PSI_PATH.exists() and not (PSI_TRIGGER_THREAD and PSI_TRIGGER_THREAD.is_alive()):
+            PSI_TRIGGER_ACTIVE = True
+            PSI_TRIGGER_THREAD = threading.Thread(target=psi_trigger_loop, daemon=True)
+            PSI_TRIGGER_THREAD.start()
         logger.info("Sistema di monitoraggio avviato con successo")
         return True
     except Exception as e:
@@ -422,10 +1552,13 @@ def start_monitoring():
 
 def stop_monitoring():
     """Ferma il sistema di monitoraggio"""
-    global MONITORING_ACTIVE, REMINDER_TIMERS
+    global MONITORING_ACTIVE, REMINDER_TIMERS, PSI_TRIGGER_ACTIVE, METRICS_ACTIVE
     
     try:
         MONITORING_ACTIVE = False
+        PSI_TRIGGER_ACTIVE = False
+        with METRICS_CONDITION:
+            METRICS_ACTIVE = False
         
         # Cancella tutti i timer di reminder
         for timer in REMINDER_TIMERS.values():
@@ -450,7 +1583,11 @@ def get_monitoring_status():
         "active_alerts": len(ALERT_STATES),
         "active_reminders": len(REMINDER_TIMERS),
         "alert_details": {},
-        "reminder_details": {}
+        "reminder_details": {},
+        "outbound_queue": get_outbound_queue_status(),
+        "bot_handlers": get_handler_status(),
+        "public_ip": get_public_ip_status(),
+        "host_agent": get_host_agent_status()
     }
     
     # Dettagli degli alert attivi
@@ -494,35 +1631,221 @@ def get_monitoring_status():
 # Funzioni di utilità
 # ----------------------------------------
 
+def get_listing_snapshot(key, source, build, refresh=False):
+    """Restituisce lo snapshot di una lista paginata, costruendolo se serve
+
+    Lo snapshot è legato al messaggio che mostra la lista: cambiare pagina legge
+    solo la fetta richiesta di items (O(dimensione pagina)) e gli elementi non
+    si spostano tra una pagina e l'altra. Viene ricostruito se cambia la
+    sorgente (es. un'altra directory), se è scaduto o su richiesta (pulsante
+    Aggiorna).
+
+    Args:
+        key: (chat_id, message_id, tipo), oppure None per un messaggio non ancora
+             inviato (vedi store_listing_snapshot)
+        source: ciò che la lista rappresenta (es. il percorso)
+        build: funzione che restituisce un dict con almeno "items" (tupla)
+    """
+    now = time.time()
+    if key is not None and not refresh:
+        with LISTING_SNAPSHOT_LOCK:
+            snapshot = LISTING_SNAPSHOTS.get(key)
+            if snapshot and snapshot["source"] == source and now - snapshot["created"] < LISTING_SNAPSHOT_TTL:
+                LISTING_SNAPSHOTS.move_to_end(key)
+                return snapshot
+    snapshot = dict(build(), source=source, created=now)
+    if key is not None:
+        store_listing_snapshot(key, snapshot)
+    return snapshot
+
+def store_listing_snapshot(key, snapshot):
+    """Conserva uno snapshot, scartando quelli scaduti e i meno usati oltre LISTING_SNAPSHOT_MAX_ITEMS voci"""
+    now = time.time()
+    with LISTING_SNAPSHOT_LOCK:
+        LISTING_SNAPSHOTS[key] = snapshot
+        LISTING_SNAPSHOTS.move_to_end(key)
+        total = sum(len(entry["items"]) for entry in LISTING_SNAPSHOTS.values())
+        for other_key in list(LISTING_SNAPSHOTS):
+            entry = LISTING_SNAPSHOTS[other_key]
+            if other_key != key and (now - entry["created"] >= LISTING_SNAPSHOT_TTL or total > LISTING_SNAPSHOT_MAX_ITEMS):
+                total -= len(entry["items"])
+                del LISTING_SNAPSHOTS[other_key]
+
+def build_directory_index(path, stamp):
+    """Legge una directory con os.scandir: prima le cartelle, poi i file, in ordine alfabetico
+
+    Il tipo arriva da readdir senza stat aggiuntive; solo per i file serve una
+    stat (cachata da DirEntry) per la dimensione. Le voci sono tuple
+    (nome, è_directory, dimensione).
+    """
+    directories = []
+    files = []
+    with os.scandir(path) as iterator:
+        for entry in iterator:
+            try:
+                if entry.is_dir():
+                    directories.append(entry.name)
+                elif entry.is_file():
+                    files.append((entry.name, entry.stat().st_size))
+            except OSError as e:
+                logger.error(f"Errore accesso file {entry.name}: {str(e)}")
+    
+    directories.sort()
+    files.sort()
+    entries = tuple((name, True, None) for name in directories) + tuple((name, False, size) for name, size in files)
+    return {
+        "stamp": stamp,
+        "entries": entries,
+        "directories": len(directories),
+        "files": len(files),
+        "large_files": sum(1 for _, size in files if size > LARGE_FILE_SIZE)
+    }
+
+def get_directory_index(path, refresh=False):
+    """Restituisce l'indice ordinato di una directory, rileggendola solo se è cambiata
+
+    L'indice resta valido finché mtime (e inode) della directory non cambiano,
+    cioè finché non vengono aggiunte, rimosse o rinominate voci: la seconda
+    visita costa una sola stat. Le dimensioni dei file modificati sul posto si
+    aggiornano con refresh. Oltre DIRECTORY_INDEX_MAX_ENTRIES voci complessive
+    si scartano le directory usate meno di recente.
+    """
+    st = os.stat(path)
+    stamp = (st.st_dev, st.st_ino, st.st_mtime_ns)
+    if not refresh:
+        with DIRECTORY_INDEX_LOCK:
+            index = DIRECTORY_INDEXES.get(path)
+            if index and index["stamp"] == stamp:
+                DIRECTORY_INDEXES.move_to_end(path)
+                return index
+    
+    # Lo stamp è preso prima della lettura: una modifica durante la scansione forza la rilettura alla visita successiva
+    index = build_directory_index(path, stamp)
+    with DIRECTORY_INDEX_LOCK:
+        DIRECTORY_INDEXES[path] = index
+        DIRECTORY_INDEXES.move_to_end(path)
+        total = sum(len(entry["entries"]) for entry in DIRECTORY_INDEXES.values())
+        for other_path in list(DIRECTORY_INDEXES):
+            if total <= DIRECTORY_INDEX_MAX_ENTRIES:
+                break
+            if other_path != path:
+                total -= len(DIRECTORY_INDEXES.pop(other_path)["entries"])
+    return index
+
+def format_snapshot_time(snapshot):
+    """Riga con l'ora a cui si riferisce la lista mostrata"""
+    return get_bot_translation("bot_messages.snapshot_time",
+                               time=datetime.fromtimestamp(snapshot["created"]).strftime("%H:%M:%S"))
+
+def load_path_tokens():
+    """Carica i token dei percorsi salvati, così i pulsanti restano validi dopo un riavvio
+
+    Va chiamata con PATH_TOKENS_LOCK acquisito.
+    """
+    global PATH_TOKENS_LOADED
+    PATH_TOKENS_LOADED = True
+    try:
+        if PATH_TOKENS_FILE.exists():
+            with open(PATH_TOKENS_FILE, "r") as f:
+                for token, path in json.load(f)[-PATH_TOKENS_MAX:]:
+                    PATH_TOKENS[token] = path
+    except Exception as e:
+        logger.error(f"Errore nel caricamento dei token dei percorsi: {e}")
+
+def save_path_tokens():
+    """Salva i token dei percorsi in ordine di utilizzo (scrittura atomica)"""
+    global PATH_TOKENS_SAVE_TIMER
+    with PATH_TOKENS_LOCK:
+        PATH_TOKENS_SAVE_TIMER = None
+        entries = list(PATH_TOKENS.items())
+    try:
+        PATH_TOKENS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = PATH_TOKENS_FILE.with_suffix(".tmp")
+        with open(temp_path, "w") as f:
+            json.dump(entries, f)
+        os.replace(temp_path, PATH_TOKENS_FILE)
+    except Exception as e:
+        logger.error(f"Errore nel salvataggio dei token dei percorsi: {e}")
+
 def cache_path(path):
-    """Cache per i percorsi lunghi per evitare ButtonDataInvalid"""
-    global PATH_CACHE, PATH_COUNTER
-    
-    # Se il percorso è più lungo di 40 caratteri, lo memorizziamo nella cache
-    if len(path) > 40:
-        PATH_COUNTER += 1
-        cache_id = f"path_{PATH_COUNTER}"
-        PATH_CACHE[cache_id] = path
-        return cache_id
-    return path
+    """Restituisce il token di un percorso da usare nel callback_data dei pulsanti
+
+    Il token deriva dall'hash del percorso: lo stesso percorso riceve sempre lo
+    stesso token, quindi mostrare di nuovo una schermata non fa crescere la
+    tabella. Tutti i percorsi passano dal token (anche quelli brevi possono
+    superare i 64 byte con nomi multibyte). La tabella è limitata a
+    PATH_TOKENS_MAX voci e viene salvata su disco poco dopo ogni aggiunta.
+    """
+    global PATH_TOKENS_SAVE_TIMER
+    token = "path_" + hashlib.sha1(path.encode("utf-8", "surrogateescape")).hexdigest()[:16]
+    with PATH_TOKENS_LOCK:
+        if not PATH_TOKENS_LOADED:
+            load_path_tokens()
+        if PATH_TOKENS.get(token) == path:
+            PATH_TOKENS.move_to_end(token)
+            return token
+        PATH_TOKENS[token] = path
+        PATH_TOKENS.move_to_end(token)
+        while len(PATH_TOKENS) > PATH_TOKENS_MAX:
+            PATH_TOKENS.popitem(last=False)
+        if PATH_TOKENS_SAVE_TIMER is None:
+            PATH_TOKENS_SAVE_TIMER = threading.Timer(PATH_TOKENS_SAVE_DELAY, save_path_tokens)
+            PATH_TOKENS_SAVE_TIMER.daemon = True
+            PATH_TOKENS_SAVE_TIMER.start()
+    return token
 
 def get_cached_path(cache_id_or_path):
-    """Recupera un percorso dalla cache o restituisce il percorso diretto"""
-    global PATH_CACHE
-    
-    # Se è un ID della cache, recupera il percorso
-    if cache_id_or_path.startswith("path_"):
-        return PATH_CACHE.get(cache_id_or_path, "")
-    return cache_id_or_path
+    """Recupera il percorso di un token o restituisce il percorso diretto
+
+    I percorsi diretti arrivano dalle chiamate interne (es. ritorno alla
+    directory superiore) e dai pulsanti creati prima dei token. Un token
+    sconosciuto (scartato dalla tabella) restituisce una stringa vuota.
+    """
+    if not cache_id_or_path.startswith("path_"):
+        return cache_id_or_path
+    with PATH_TOKENS_LOCK:
+        if not PATH_TOKENS_LOADED:
+            load_path_tokens()
+        path = PATH_TOKENS.get(cache_id_or_path)
+        if path is None:
+            logger.warning(f"Token di percorso sconosciuto: {cache_id_or_path}")
+            return ""
+        PATH_TOKENS.move_to_end(cache_id_or_path)
+        return path
+
+def run_host_agent_command(cmd_str, timeout):
+    """Esegue un comando tramite l'agente host
+
+    Returns:
+        CompletedProcess, oppure None se l'agente non è raggiungibile
+    """
+    if time.time() - HOST_AGENT_STATE["unavailable_since"] < HOST_AGENT_RETRY_INTERVAL:
+        return None
+    if not os.path.exists(HOST_AGENT_SOCKET):
+        HOST_AGENT_STATE["unavailable_since"] = time.time()
+        return None
+    try:
+        response = host_agent.call(cmd_str, timeout=timeout, socket_path=HOST_AGENT_SOCKET)
+    except OSError as e:
+        logger.warning(f"Agente host non raggiungibile ({e}), uso docker run")
+        HOST_AGENT_STATE["unavailable_since"] = time.time()
+        return None
+    HOST_AGENT_STATE["calls"] += 1
+    if response.get("error"):
+        # Errore nell'esecuzione (timeout, troppi comandi): l'agente funziona, il comando no
+        return subprocess.CompletedProcess(cmd_str, -1, "", response["error"])
+    return subprocess.CompletedProcess(cmd_str, response["returncode"], response["stdout"], response["stderr"])
 
-def run_host_command(command):
+def run_host_command(command, timeout=HOST_COMMAND_TIMEOUT):
     """Esegue un comando sull'host anziché nel container
     
-    Utilizzando il socket Docker, è possibile eseguire comandi sull'host
-    creando un container privilegiato che condivide i namespace dell'host.
+    Il comando viene inviato all'agente host persistente (host_agent.py) se
+    è in esecuzione; altrimenti, utilizzando il socket Docker, viene creato un
+    container privilegiato che condivide i namespace dell'host.
     
     Args:
         command: Lista o stringa del comando da eseguire
+        timeout: Secondi massimi di esecuzione
         
     Returns:
         Il risultato dell'esecuzione del comando o None in caso di errore
@@ -533,30 +1856,15 @@ def run_host_command(command):
         else:
             cmd_str = command
         
-        # Per i comandi di sistema (reboot/poweroff) utilizziamo nsenter per accedere al namespace dell'host
-        if "reboot" in cmd_str or "poweroff" in cmd_str or "shutdown" in cmd_str:
-            # nsenter permette di eseguire comandi nei namespace dell'host
-            docker_cmd = [
-                "docker", "run", "--rm", "--privileged",
-                "--pid=host", "--net=host", "--ipc=host",
-                "--volume", "/:/host",  # Monta la root dell'host in /host
-                "debian:stable-slim",     # Usiamo Debian invece di Alpine
-                "chroot", "/host", "sh", "-c", cmd_str  # chroot nella root dell'host
-            ]
-        else:
-            # Per altri comandi, utilizziamo il metodo standard
-            docker_cmd = [
-                "docker", "run", "--rm", "--privileged", 
-                "--pid=host", "--net=host", "--ipc=host",
-                "debian:stable-slim", "sh", "-c", cmd_str
-            ]
-        
-        logger.info(f"Esecuzione comando sull'host: {cmd_str}")
-        logger.debug(f"Comando docker: {' '.join(docker_cmd)}")
+        result = run_host_agent_command(cmd_str, timeout)
+        if result is None:
+            HOST_AGENT_STATE["fallbacks"] += 1
+            result = run_host_command_container(cmd_str, timeout)
+            if result is None:
+                return None
         
-        result = subprocess.run(docker_cmd, capture_output=True, text=True)
         if result.returncode == 0:
-            logger.info(f"Comando eseguito con successo sull'host.")
+            logger.debug(f"Comando eseguito con successo sull'host: {cmd_str}")
             return result
         else:
             logger.error(f"Errore nell'esecuzione del comando sull'host: {result.stderr}")
@@ -566,6 +1874,131 @@ def run_host_command(command):
         logger.error(f"Errore durante l'esecuzione del comando sull'host: {e}")
         return None
 
+def run_host_command_container(cmd_str, timeout):
+    """Esegue un comando sull'host avviando un container privilegiato (metodo di riserva)"""
+    # Per i comandi di sistema (reboot/poweroff) utilizziamo nsenter per accedere al namespace dell'host
+    if "reboot" in cmd_str or "poweroff" in cmd_str or "shutdown" in cmd_str:
+        # nsenter permette di eseguire comandi nei namespace dell'host
+        docker_cmd = [
+            "docker", "run", "--rm", "--privileged",
+            "--pid=host", "--net=host", "--ipc=host",
+            "--volume", "/:/host",  # Monta la root dell'host in /host
+            "debian:stable-slim",     # Usiamo Debian invece di Alpine
+            "chroot", "/host", "sh", "-c", cmd_str  # chroot nella root dell'host
+        ]
+    else:
+        # Per altri comandi, utilizziamo il metodo standard
+        docker_cmd = [
+            "docker", "run", "--rm", "--privileged", 
+            "--pid=host", "--net=host", "--ipc=host",
+            "debian:stable-slim", "sh", "-c", cmd_str
+        ]
+    
+    logger.info(f"Esecuzione comando sull'host: {cmd_str}")
+    logger.debug(f"Comando docker: {' '.join(docker_cmd)}")
+    
+    try:
+        # L'avvio del container può richiedere qualche secondo in più del comando
+        return subprocess.run(docker_cmd, capture_output=True, text=True, timeout=timeout + 30)
+    except subprocess.TimeoutExpired:
+        logger.error(f"Timeout nell'esecuzione del comando sull'host: {cmd_str}")
+        return None
+
+def get_host_agent_status():
+    """Stato dell'agente host per la diagnostica"""
+    return {
+        "socket": HOST_AGENT_SOCKET,
+        "available": os.path.exists(HOST_AGENT_SOCKET)
+                     and time.time() - HOST_AGENT_STATE["unavailable_since"] >= HOST_AGENT_RETRY_INTERVAL,
+        "calls": HOST_AGENT_STATE["calls"],
+        "fallbacks": HOST_AGENT_STATE["fallbacks"],
+        "query_cache": {key: HOST_QUERY_STATE[key] for key in ("hits", "misses", "invalidations", "watching")}
+    }
+
+def invalidate_host_queries(reason):
+    """Svuota la cache delle interrogazioni sull'host
+
+    Le esecuzioni in corso non salvano il proprio risultato, perché potrebbe
+    essere precedente al cambio.
+    """
+    with HOST_QUERY_LOCK:
+        HOST_QUERY_STATE["generation"] += 1
+        HOST_QUERY_STATE["invalidations"] += 1
+        HOST_QUERY_CACHE.clear()
+    logger.debug(f"Cache delle interrogazioni sull'host invalidata: {reason}")
+
+def host_query_watch_loop():
+    """Invalida la cache quando rtnetlink (tramite l'agente host) segnala cambi di link o indirizzi
+
+    Senza agente la cache scade solo per TTL; il collegamento viene ritentato
+    periodicamente.
+    """
+    while True:
+        try:
+            for event in host_agent.watch_netlink(HOST_AGENT_SOCKET):
+                if event.get("event") == "ready":
+                    HOST_QUERY_STATE["watching"] = True
+                    # Eventi persi mentre non si era in ascolto
+                    invalidate_host_queries("iscrizione a rtnetlink")
+                else:
+                    invalidate_host_queries(f"evento rtnetlink {event.get('types')}")
+        except Exception as e:
+            if HOST_QUERY_STATE["watching"]:
+                logger.warning(f"Eventi rtnetlink dall'agente host interrotti: {e}")
+        HOST_QUERY_STATE["watching"] = False
+        time.sleep(HOST_AGENT_RETRY_INTERVAL)
+
+def ensure_host_query_watcher():
+    """Avvia il thread che invalida la cache su eventi rtnetlink"""
+    global HOST_QUERY_WATCH_THREAD
+    
+    with HOST_QUERY_LOCK:
+        if not (HOST_QUERY_WATCH_THREAD and HOST_QUERY_WATCH_THREAD.is_alive()):
+            HOST_QUERY_WATCH_THREAD = threading.Thread(target=host_query_watch_loop, daemon=True)
+            HOST_QUERY_WATCH_THREAD.start()
+
+def run_host_query(command, ttl=HOST_QUERY_TTL, timeout=HOST_COMMAND_TIMEOUT):
+    """Esegue un comando sull'host in sola lettura, riutilizzando il risultato recente
+
+    Il risultato resta valido per ttl secondi o finché rtnetlink non segnala un
+    cambio di link o indirizzi. Richieste identiche contemporanee attendono
+    un'unica esecuzione. Gli errori (None) non vengono memorizzati.
+
+    Da usare solo per comandi idempotenti: contatori e altri valori che
+    cambiano a ogni lettura vanno letti con run_host_command.
+    """
+    ensure_host_query_watcher()
+    with HOST_QUERY_LOCK:
+        cached = HOST_QUERY_CACHE.get(command)
+        if cached and cached[0] > time.monotonic():
+            HOST_QUERY_STATE["hits"] += 1
+            return cached[1]
+        future = HOST_QUERY_INFLIGHT.get(command)
+        owner = future is None
+        if owner:
+            HOST_QUERY_STATE["misses"] += 1
+            future = Future()
+            HOST_QUERY_INFLIGHT[command] = future
+            generation = HOST_QUERY_STATE["generation"]
+    
+    if not owner:
+        try:
+            # Margine per il ripiego su docker run
+            return future.result(timeout=timeout + 40)
+        except FuturesTimeoutError:
+            return None
+    
+    result = None
+    try:
+        result = run_host_command(command, timeout=timeout)
+    finally:
+        with HOST_QUERY_LOCK:
+            if result is not None and generation == HOST_QUERY_STATE["generation"]:
+                HOST_QUERY_CACHE[command] = (time.monotonic() + ttl, result)
+            HOST_QUERY_INFLIGHT.pop(command, None)
+        future.set_result(result)
+    return result
+
 def load_mount_points():
     """Carica i mount points dal file di configurazione"""
     try:
@@ -675,56 +2108,38 @@ def format_size(size_bytes):
 # ----------------------------------------
 
 def get_cpu_resources():
-    """Ottiene informazioni sulle risorse CPU"""
-    cpu_percent = psutil.cpu_percent(interval=1)
-    cpu_count = psutil.cpu_count(logical=True)
-    cpu_freq = psutil.cpu_freq()
-    # Ottieni informazioni dettagliate sull'utilizzo della CPU
-    cpu_times_percent = psutil.cpu_times_percent(interval=1)
-
-    # Ottieni la temperatura se disponibile
-    temperature = None
-    try:
-        temps = psutil.sensors_temperatures()
-        # Cerca prima la CPU
-        if 'coretemp' in temps:
-            temperature = temps['coretemp'][0].current
-        elif 'cpu_thermal' in temps:
-            temperature = temps['cpu_thermal'][0].current
-        # Altrimenti prendi la prima disponibile
-        elif temps:
-            for _, sensors in temps.items():
-                if sensors:
-                    temperature = sensors[0].current
-                    break
-    except:
-        temperature = None
+    """Ottiene informazioni sulle risorse CPU dall'ultimo snapshot delle metriche"""
+    snapshot = get_metrics_snapshot("bot")
+    if not snapshot:
+        return f"{get_bot_translation('bot_messages.resource_info.cpu_title')}\n\n_{get_bot_translation('bot_messages.resource_info.collector_error')}_"
+    cpu = snapshot["cpu"]
+    cpu_times_percent = cpu["times_percent"]
+    cpu_freq = cpu["freq"]
+    temperature = cpu["temperature"]
     
     # Ottieni l'uptime
-    uptime = get_uptime()
-    uptime_str = format_uptime(uptime)
+    uptime_str = format_uptime(snapshot["uptime"])
     
     # Formatta il messaggio
     message = f"{get_bot_translation('bot_messages.resource_info.cpu_title')}\n\n"
-    message += f"{get_bot_translation('bot_messages.resource_info.cpu_usage')}: *{cpu_percent}%*\n"
-    message += f"{get_bot_translation('bot_messages.resource_info.cpu_cores')}: {cpu_count}\n"
+    message += f"{get_bot_translation('bot_messages.resource_info.cpu_usage')}: *{cpu['percent']}%*\n"
+    message += f"{get_bot_translation('bot_messages.resource_info.cpu_cores')}: {cpu['count']}\n"
     # Dettagli utilizzo CPU
     message += f"\n*{get_bot_translation('bot_messages.resource_info.usage_details')}:*\n"
-    message += f"{get_bot_translation('bot_messages.resource_info.user')}: {cpu_times_percent.user:.1f}%\n"
-    message += f"{get_bot_translation('bot_messages.resource_info.system')}: {cpu_times_percent.system:.1f}%\n"
+    message += f"{get_bot_translation('bot_messages.resource_info.user')}: {cpu_times_percent['user']:.1f}%\n"
+    message += f"{get_bot_translation('bot_messages.resource_info.system')}: {cpu_times_percent['system']:.1f}%\n"
     
     # Aggiunge iowait se disponibile
-    if hasattr(cpu_times_percent, 'iowait'):
-        message += f"{get_bot_translation('bot_messages.resource_info.iowait')}: {cpu_times_percent.iowait:.1f}%\n"
+    if 'iowait' in cpu_times_percent:
+        message += f"{get_bot_translation('bot_messages.resource_info.iowait')}: {cpu_times_percent['iowait']:.1f}%\n"
     
-    message += f"{get_bot_translation('bot_messages.resource_info.idle')}: {cpu_times_percent.idle:.1f}%\n"
+    message += f"{get_bot_translation('bot_messages.resource_info.idle')}: {cpu_times_percent['idle']:.1f}%\n"
     
     # Informazioni sulla frequenza
     if cpu_freq:
-        current_freq = cpu_freq.current
-        message += f"\n{get_bot_translation('bot_messages.resource_info.frequency')}: {current_freq:.0f} MHz\n"
-        if hasattr(cpu_freq, 'min') and cpu_freq.min:
-            message += f"{get_bot_translation('bot_messages.resource_info.frequency_range')}: {cpu_freq.min:.0f}-{cpu_freq.max:.0f} MHz\n"
+        message += f"\n{get_bot_translation('bot_messages.resource_info.frequency')}: {cpu_freq['current']:.0f} MHz\n"
+        if cpu_freq['min']:
+            message += f"{get_bot_translation('bot_messages.resource_info.frequency_range')}: {cpu_freq['min']:.0f}-{cpu_freq['max']:.0f} MHz\n"
     # Informazioni sulla temperatura
     if temperature:
         message += f"\n{get_bot_translation('bot_messages.resource_info.temperature')}: *{temperature:.1f}°C*\n"
@@ -734,46 +2149,47 @@ def get_cpu_resources():
     return message
 
 def get_ram_resources():
-    """Ottiene informazioni sulle risorse RAM"""
-    ram = psutil.virtual_memory()
-    swap = psutil.swap_memory()
+    """Ottiene informazioni sulle risorse RAM dall'ultimo snapshot delle metriche"""
+    snapshot = get_metrics_snapshot("bot")
+    if not snapshot:
+        return f"{get_bot_translation('bot_messages.resource_info.ram_title')}\n\n_{get_bot_translation('bot_messages.resource_info.collector_error')}_"
+    ram = snapshot["ram"]
+    swap = snapshot["swap"]
     
     # Formatta il messaggio
     message = f"{get_bot_translation('bot_messages.resource_info.ram_title')}\n\n"
-    message += f"{get_bot_translation('bot_messages.resource_info.ram_total')}: {format_size(ram.total)}\n"
-    message += f"{get_bot_translation('bot_messages.resource_info.ram_used')}: *{format_size(ram.used)}* ({ram.percent}%)\n"
-    message += f"{get_bot_translation('bot_messages.resource_info.ram_available')}: {format_size(ram.available)}\n\n"
+    message += f"{get_bot_translation('bot_messages.resource_info.ram_total')}: {format_size(ram['total'])}\n"
+    message += f"{get_bot_translation('bot_messages.resource_info.ram_used')}: *{format_size(ram['used'])}* ({ram['percent']}%)\n"
+    message += f"{get_bot_translation('bot_messages.resource_info.ram_available')}: {format_size(ram['available'])}\n\n"
     
-    message += f"{get_bot_translation('bot_messages.resource_info.swap_total')}: {format_size(swap.total)}\n"
-    message += f"{get_bot_translation('bot_messages.resource_info.swap_used')}: {format_size(swap.used)} ({swap.percent}%)\n"
+    message += f"{get_bot_translation('bot_messages.resource_info.swap_total')}: {format_size(swap['total'])}\n"
+    message += f"{get_bot_translation('bot_messages.resource_info.swap_used')}: {format_size(swap['used'])} ({swap['percent']}%)\n"
     
     return message
 
 def get_disk_info():
-    """Ottiene informazioni sui dischi"""
-    partitions = psutil.disk_partitions()
+    """Ottiene informazioni sui dischi (occupazione dall'ultimo snapshot delle metriche)"""
+    snapshot = get_metrics_snapshot("bot")
+    partitions = snapshot["partitions"] if snapshot else {}
+    disk_usage = snapshot["disk_usage"] if snapshot else {}
     
     message = f"{get_bot_translation('bot_messages.resource_info.disk_title')}\n\n"
-    # Monitora solo le partizioni di sistema specificate
-    system_partitions = ['/', '/home', '/var', '/tmp']
     
     # Prima mostro le partizioni di sistema
     message += f"*{get_bot_translation('bot_messages.resource_info.system_partitions')}:*\n\n"
-    for part in partitions:
-        # Filtra solo le partizioni specificate
-        if part.mountpoint in system_partitions:
-            try:
-                usage = psutil.disk_usage(part.mountpoint)
-                
-                # Evidenzia partizioni con spazio quasi esaurito
-                highlight = usage.percent >= 90
-                
-                message += f"*{part.mountpoint}* ({part.fstype}):\n"
-                message += f"  {get_bot_translation('bot_messages.resource_info.total')}: {format_size(usage.total)}\n"
-                message += f"  {get_bot_translation('bot_messages.resource_info.used')}: {'*' if highlight else ''}{format_size(usage.used)} ({usage.percent}%){'*' if highlight else ''}\n"
-                message += f"  {get_bot_translation('bot_messages.resource_info.free')}: {format_size(usage.free)}\n\n"
-            except PermissionError:
-                message += f"*{part.mountpoint}* ({get_bot_translation('bot_messages.resource_info.access_denied')})\n\n"
+    for mountpoint, usage in partitions.items():
+        if usage.get("error"):
+            message += f"*{mountpoint}* ({get_bot_translation('bot_messages.resource_info.access_denied')})\n\n"
+            continue
+        
+        # Evidenzia partizioni con spazio quasi esaurito
+        highlight = usage['percent'] >= 90
+        
+        device = f"{usage['device']}, " if usage.get('device') else ""
+        message += f"*{mountpoint}* ({device}{usage['fstype']}):\n"
+        message += f"  {get_bot_translation('bot_messages.resource_info.total')}: {format_size(usage['total'])}\n"
+        message += f"  {get_bot_translation('bot_messages.resource_info.used')}: {'*' if highlight else ''}{format_size(usage['used'])} ({usage['percent']}%){'*' if highlight else ''}\n"
+        message += f"  {get_bot_translation('bot_messages.resource_info.free')}: {format_size(usage['free'])}\n\n"
     # Poi mostro i punti di mount configurati
     message += f"*{get_bot_translation('bot_messages.resource_info.mount_points_configured')}:*\n\n"
     
@@ -783,84 +2199,204 @@ def get_disk_info():
     if mount_points:
         for mount in mount_points:
             path = mount.get('path')
-            if path and os.path.exists(path):
-                try:
-                    usage = psutil.disk_usage(path)
-                    
-                    # Evidenzia partizioni con spazio quasi esaurito
-                    highlight = usage.percent >= 90
-                    
-                    message += f"*{path}*:\n"
-                    message += f"  {get_bot_translation('bot_messages.resource_info.total')}: {format_size(usage.total)}\n"
-                    message += f"  {get_bot_translation('bot_messages.resource_info.used')}: {'*' if highlight else ''}{format_size(usage.used)} ({usage.percent}%){'*' if highlight else ''}\n"
-                    message += f"  {get_bot_translation('bot_messages.resource_info.free')}: {format_size(usage.free)}\n\n"
-                except Exception as e:
-                    message += f"*{path}* (Errore: {str(e)})\n\n"
+            usage = disk_usage.get(path)
+            if not usage:
+                continue
+            if usage.get("error"):
+                message += f"*{path}* (Errore: {usage['error']})\n\n"
+                continue
+            
+            # Evidenzia partizioni con spazio quasi esaurito
+            highlight = usage['percent'] >= 90
+            
+            message += f"*{path}* ({usage['device']}):\n" if usage.get('device') else f"*{path}*:\n"
+            message += f"  {get_bot_translation('bot_messages.resource_info.total')}: {format_size(usage['total'])}\n"
+            message += f"  {get_bot_translation('bot_messages.resource_info.used')}: {'*' if highlight else ''}{format_size(usage['used'])} ({usage['percent']}%){'*' if highlight else ''}\n"
+            message += f"  {get_bot_translation('bot_messages.resource_info.free')}: {format_size(usage['free'])}\n\n"
     else:
         message += f"{get_bot_translation('bot_messages.resource_info.no_mount_points')}.\n\n"
         
-    # Statistiche I/O solo per i punti di mount configurati
+    # Statistiche I/O solo per i punti di mount configurati (velocità dall'ultimo campione diskstats)
     try:
-        # Ottieni le statistiche I/O per unità se disponibili
-        
-        # Aggiungiamo le statistiche I/O per unità se disponibili
-        disk_io_per_disk = psutil.disk_io_counters(perdisk=True)
-        if disk_io_per_disk and mount_points:
-            message += f"\n*{get_bot_translation('bot_messages.resource_info.io_statistics')}:*\n"
-            
-            # Mappa dei dispositivi ai punti di mount
-            mount_to_device = {}
-            
-            # Ottieni la mappa dei dispositivi
-            try:
-                # Usa il comando mount per ottenere la mappa
-                result = subprocess.run(["mount"], capture_output=True, text=True)
-                if result.returncode == 0:
-                    mount_output = result.stdout.strip().split('\n')
-                    for line in mount_output:
-                        parts = line.split()
-                        if len(parts) >= 3:
-                            device = parts[0]
-                            mount_point = parts[2]
-                            
-                            # Estrai il nome del dispositivo senza il percorso
-                            device_name = os.path.basename(device)
-                            
-                            # Mappa il dispositivo al punto di mount
-                            for mount in mount_points:
-                                path = mount.get('path')
-                                if path and (path == mount_point or mount_point.startswith(path + '/')):
-                                    mount_to_device[device_name] = path
-            except Exception as e:
-                logger.error(f"Errore nell'ottenimento della mappa dispositivi: {str(e)}")
+        ensure_diskstats_sampler()
+        
+        if mount_points:
+            io_lines = ""
+            shown_devices = set()
+            for mount in mount_points:
+                path = mount.get('path')
+                if not path:
+                    continue
+                device, rates = get_disk_io_rates(path)
+                # Più mount point sullo stesso dispositivo condividono le stesse statistiche
+                if not device or device in shown_devices:
+                    continue
+                shown_devices.add(device)
+                
+                io_lines += f"\n*{device}* ({path}):\n"
+                if rates:
+                    io_lines += f"  {get_bot_translation('bot_messages.resource_info.reads')}: {format_size(int(rates['read_bytes_per_sec']))}/s ({rates['read_iops']:.0f} IOPS)\n"
+                    io_lines += f"  {get_bot_translation('bot_messages.resource_info.writes')}: {format_size(int(rates['write_bytes_per_sec']))}/s ({rates['write_iops']:.0f} IOPS)\n"
+                    io_lines += f"  {get_bot_translation('bot_messages.resource_info.io_await')}: {rates['await']:.1f} ms\n"
+                    io_lines += f"  {get_bot_translation('bot_messages.resource_info.io_util')}: {rates['util']:.1f}%\n"
+                    io_lines += f"  {get_bot_translation('bot_messages.resource_info.io_queue')}: {rates['queue']:.2f}\n"
+                else:
+                    io_lines += f"  {get_bot_translation('bot_messages.resource_info.io_sampling')}\n"
             
-            # Mostra le statistiche solo per i dispositivi mappati ai punti di mount
-            for disk, stats in disk_io_per_disk.items():
-                # Cerca il disco nella mappa o controlla se è un disco principale
-                if disk in mount_to_device or any(disk in device for device in mount_to_device.keys()):
-                    mount_point = mount_to_device.get(disk, get_bot_translation('bot_messages.resource_info.mount_point_unknown'))
-                    message += f"\n*{disk}* ({mount_point}):\n"
-                    message += f"  {get_bot_translation('bot_messages.resource_info.reads')}: {format_size(stats.read_bytes)}\n"
-                    message += f"  {get_bot_translation('bot_messages.resource_info.writes')}: {format_size(stats.write_bytes)}\n"
+            if io_lines:
+                message += f"\n*{get_bot_translation('bot_messages.resource_info.io_statistics')}:*\n" + io_lines
     except Exception as e:
         logger.error(f"Errore nel recupero delle statistiche I/O: {str(e)}")
     
     return message
 
+def update_network_rates(previous_rates, delta, elapsed):
+    """Aggiorna le medie EWMA (byte/s) per ogni finestra a partire da un delta di contatori"""
+    rates = {}
+    for window, tau in NETWORK_RATE_WINDOWS.items():
+        # Il peso dipende dal tempo trascorso, così un campione in ritardo non falsa la media
+        alpha = 1 - math.exp(-elapsed / tau)
+        window_rates = {}
+        for key, value in delta.items():
+            instant = value / elapsed
+            previous = previous_rates.get(window, {}).get(key) if previous_rates else None
+            window_rates[key] = instant if previous is None else previous + alpha * (instant - previous)
+        rates[window] = window_rates
+    return rates
+
+def sample_network_counters(previous, elapsed):
+    """Legge i contatori delle interfacce e calcola le velocità rispetto al campione precedente"""
+    counters = psutil.net_io_counters(pernic=True)
+    addresses = psutil.net_if_addrs()
+    interfaces = {}
+    totals = {"bytes_sent": 0, "bytes_recv": 0, "packets_sent": 0, "packets_recv": 0}
+    
+    for name, stats in counters.items():
+        ipv4 = next((addr.address for addr in addresses.get(name, []) if addr.family == socket.AF_INET), None)
+        entry = {
+            "ipv4": ipv4,
+            "bytes_sent": stats.bytes_sent,
+            "bytes_recv": stats.bytes_recv,
+            "packets_sent": stats.packets_sent,
+            "packets_recv": stats.packets_recv,
+            "rates": None
+        }
+        if name != "lo":
+            for key in totals:
+                totals[key] += entry[key]
+        
+        previous_entry = previous.get("interfaces", {}).get(name) if previous else None
+        if previous_entry and elapsed > 0:
+            delta = {key: entry[key] - previous_entry[key] for key in totals}
+            # Contatori azzerati (interfaccia ricreata): si riparte senza medie
+            if all(value >= 0 for value in delta.values()):
+                entry["rates"] = update_network_rates(previous_entry["rates"], delta, elapsed)
+        interfaces[name] = entry
+    
+    total_rates = None
+    previous_total = previous.get("total") if previous else None
+    if previous_total and elapsed > 0:
+        delta = {key: totals[key] - previous_total[key] for key in totals}
+        if all(value >= 0 for value in delta.values()):
+            total_rates = update_network_rates(previous_total["rates"], delta, elapsed)
+    
+    return {"timestamp": time.time(), "interfaces": interfaces, "total": dict(totals, rates=total_rates)}
+
+def network_sampler_loop():
+    """Campiona ogni secondo i contatori di rete del container"""
+    global NETWORK_SNAPSHOT
+    
+    logger.info("Campionatore di rete avviato")
+    previous_time = time.monotonic()
+    while True:
+        try:
+            now = time.monotonic()
+            snapshot = sample_network_counters(NETWORK_SNAPSHOT, now - previous_time)
+            previous_time = now
+            with NETWORK_LOCK:
+                NETWORK_SNAPSHOT = snapshot
+        except Exception as e:
+            logger.error(f"Errore nel campionamento della rete: {e}")
+        time.sleep(NETWORK_SAMPLE_INTERVAL)
+
+def network_host_loop():
+    """Aggiorna IP e contatori dell'host (costosi: docker run) a cadenza lenta
+
+    L'host viene interrogato solo se la vista Rete è stata consultata di recente.
+    """
+    global NETWORK_HOST_INFO
+    
+    while True:
+        try:
+            if time.time() - NETWORK_LAST_VIEWED < NETWORK_HOST_IDLE_TIMEOUT:
+                info = dict(NETWORK_HOST_INFO)
+                # IP e interfaccia vengono dalla cache, riletti solo dopo un cambio segnalato da rtnetlink o il TTL
+                host_ip = get_host_ip()
+                if host_ip != info.get("host_ip"):
+                    info["local_ip"] = get_local_ip()
+                    info["host_ip"] = host_ip
+                
+                stats = get_host_interface_stats(host_ip)
+                if stats:
+                    previous = info.get("host_stats")
+                    elapsed = time.monotonic() - info.get("host_sampled", 0)
+                    if previous and previous["interface"] == stats["interface"] and elapsed > 0:
+                        # Velocità media tra due letture consecutive dell'host
+                        stats["rate_sent"] = max(0, stats["bytes_sent"] - previous["bytes_sent"]) / elapsed
+                        stats["rate_recv"] = max(0, stats["bytes_recv"] - previous["bytes_recv"]) / elapsed
+                    info["host_interface"] = stats["interface"]
+                    info["host_stats"] = stats
+                    info["host_sampled"] = time.monotonic()
+                    info["host_updated"] = time.time()
+                
+                with NETWORK_LOCK:
+                    NETWORK_HOST_INFO = info
+        except Exception as e:
+            logger.error(f"Errore nell'aggiornamento delle informazioni di rete dell'host: {e}")
+        time.sleep(NETWORK_HOST_REFRESH_INTERVAL)
+
+def ensure_network_sampler():
+    """Avvia i campionatori di rete se non sono già in esecuzione"""
+    global NETWORK_SAMPLER_THREAD, NETWORK_HOST_THREAD
+    
+    with NETWORK_LOCK:
+        if not (NETWORK_SAMPLER_THREAD and NETWORK_SAMPLER_THREAD.is_alive()):
+            NETWORK_SAMPLER_THREAD = threading.Thread(target=network_sampler_loop, daemon=True)
+            NETWORK_SAMPLER_THREAD.start()
+        if not (NETWORK_HOST_THREAD and NETWORK_HOST_THREAD.is_alive()):
+            NETWORK_HOST_THREAD = threading.Thread(target=network_host_loop, daemon=True)
+            NETWORK_HOST_THREAD.start()
+
+def get_network_snapshot():
+    """Restituisce l'ultimo campione di rete e le informazioni sull'host (senza bloccare)"""
+    global NETWORK_LAST_VIEWED
+    
+    NETWORK_LAST_VIEWED = time.time()
+    ensure_network_sampler()
+    ensure_public_ip_tracker()
+    with NETWORK_LOCK:
+        return NETWORK_SNAPSHOT, NETWORK_HOST_INFO
+
+def format_network_rates(rates):
+    """Formatta download/upload istantanei e medie 10s / 1m"""
+    if not rates:
+        return f"  {get_bot_translation('bot_messages.resource_info.rates_sampling')}\n"
+    current, medium, long = rates["1s"], rates["10s"], rates["1m"]
+    message = f"  {get_bot_translation('bot_messages.resource_info.download')}: {format_size(int(current['bytes_recv']))}/s"
+    message += f" ({format_size(int(medium['bytes_recv']))}/s · {format_size(int(long['bytes_recv']))}/s)\n"
+    message += f"  {get_bot_translation('bot_messages.resource_info.upload')}: {format_size(int(current['bytes_sent']))}/s"
+    message += f" ({format_size(int(medium['bytes_sent']))}/s · {format_size(int(long['bytes_sent']))}/s)\n"
+    return message
+
 def get_network_info():
-    """Ottiene informazioni sulla rete"""
-    # Ottieni le interfacce di rete
-    net_if_addrs = psutil.net_if_addrs()
-    # Ottieni statistiche I/O delle interfacce
-    net_io_now = psutil.net_io_counters(pernic=True)
-    
-    # Ottieni l'IP locale del container
-    local_ip = get_local_ip()
-    # Ottieni l'IP pubblico
-    public_ip = get_public_ip()
-    
-    # Ottieni l'IP locale del server host
-    host_ip = get_host_ip()
+    """Ottiene informazioni sulla rete dall'ultimo campione in memoria"""
+    snapshot, host_info = get_network_snapshot()
+    
+    # Al primo utilizzo i campionatori hanno appena iniziato: IP del container letto subito
+    local_ip = host_info.get("local_ip") or get_local_ip()
+    host_ip = host_info.get("host_ip")
+    public_ip, public_ip_age = get_public_ip()
+    host_stats = host_info.get("host_stats")
          
     message = f"{get_bot_translation('bot_messages.resource_info.network_title')}\n\n"
     # IPs sezione
@@ -871,97 +2407,243 @@ def get_network_info():
         message += f"{get_bot_translation('bot_messages.resource_info.ip_server_host')}: *{host_ip}*\n"
         
     if public_ip:
-        message += f"{get_bot_translation('bot_messages.resource_info.ip_public')}: *{public_ip}*\n"
-    
-    # Statistiche totali (basate sull'interfaccia dell'host)
-    try:
-        # Prova a ottenere le statistiche dell'interfaccia dell'host
-        host_stats = get_host_interface_stats(host_ip)
-        
-        if host_stats:
-            message += f"\n*{get_bot_translation('bot_messages.resource_info.total_statistics')}:*\n"
-            message += f"{get_bot_translation('bot_messages.resource_info.total_sent')}: {format_size(host_stats['bytes_sent'])}\n"
-            message += f"{get_bot_translation('bot_messages.resource_info.total_received')}: {format_size(host_stats['bytes_recv'])}\n"
-            
-            # Calcola velocità di trasmissione
-            # Prima misurazione
-            time.sleep(1)  # Attendi 1 secondo
-            
-            # Seconda misurazione
-            host_stats_new = get_host_interface_stats(host_ip)
-            
-            if host_stats_new:
-                # Calcola la velocità
-                upload_speed = host_stats_new['bytes_sent'] - host_stats['bytes_sent']
-                download_speed = host_stats_new['bytes_recv'] - host_stats['bytes_recv']
-                
-                message += f"\n*{get_bot_translation('bot_messages.resource_info.current_speed')}:*\n"
-                message += f"{get_bot_translation('bot_messages.resource_info.download')}: {format_size(download_speed)}/s\n"
-                message += f"{get_bot_translation('bot_messages.resource_info.upload')}: {format_size(upload_speed)}/s\n"
-        else:
-            # Fallback alle statistiche totali se non riusciamo ad ottenere quelle dell'host
-            total_stats = psutil.net_io_counters()
-            message += f"\n*{get_bot_translation('bot_messages.resource_info.total_statistics')}:*\n"
-            message += f"{get_bot_translation('bot_messages.resource_info.total_sent')}: {format_size(total_stats.bytes_sent)}\n"
-            message += f"{get_bot_translation('bot_messages.resource_info.total_received')}: {format_size(total_stats.bytes_recv)}\n"
-            
-            # Calcola velocità di trasmissione
-            time.sleep(1)
-            total_stats_new = psutil.net_io_counters()
-            
-            upload_speed = total_stats_new.bytes_sent - total_stats.bytes_sent
-            download_speed = total_stats_new.bytes_recv - total_stats.bytes_recv
-            
-            message += f"\n*{get_bot_translation('bot_messages.resource_info.current_speed')}:*\n"
-            message += f"{get_bot_translation('bot_messages.resource_info.download')}: {format_size(download_speed)}/s\n"
-            message += f"{get_bot_translation('bot_messages.resource_info.upload')}: {format_size(upload_speed)}/s\n"
-            
-    except Exception as e:
-        logger.error(f"Errore nel calcolo delle statistiche di rete: {str(e)}")
+        message += f"{get_bot_translation('bot_messages.resource_info.ip_public')}: *{public_ip}* "
+        message += f"_{get_bot_translation('bot_messages.resource_info.ip_public_age', age=format_uptime(public_ip_age))}_\n"
+    
+    # Statistiche totali (basate sull'interfaccia dell'host se disponibile)
+    if host_stats:
+        message += f"\n*{get_bot_translation('bot_messages.resource_info.total_statistics')}:*\n"
+        message += f"{get_bot_translation('bot_messages.resource_info.total_sent')}: {format_size(host_stats['bytes_sent'])}\n"
+        message += f"{get_bot_translation('bot_messages.resource_info.total_received')}: {format_size(host_stats['bytes_recv'])}\n"
+        
+        if "rate_sent" in host_stats:
+            age = int(time.time() - host_info.get("host_updated", time.time()))
+            message += f"\n*{get_bot_translation('bot_messages.resource_info.current_speed')}:* "
+            message += f"_{get_bot_translation('bot_messages.resource_info.host_rate_age', seconds=age)}_\n"
+            message += f"{get_bot_translation('bot_messages.resource_info.download')}: {format_size(int(host_stats['rate_recv']))}/s\n"
+            message += f"{get_bot_translation('bot_messages.resource_info.upload')}: {format_size(int(host_stats['rate_sent']))}/s\n"
+    elif snapshot:
+        # Fallback alle statistiche del container se quelle dell'host non sono disponibili
+        total = snapshot["total"]
+        message += f"\n*{get_bot_translation('bot_messages.resource_info.total_statistics')}:*\n"
+        message += f"{get_bot_translation('bot_messages.resource_info.total_sent')}: {format_size(total['bytes_sent'])}\n"
+        message += f"{get_bot_translation('bot_messages.resource_info.total_received')}: {format_size(total['bytes_recv'])}\n"
+        message += f"\n*{get_bot_translation('bot_messages.resource_info.current_speed')}:* _{get_bot_translation('bot_messages.resource_info.rate_windows')}_\n"
+        message += format_network_rates(total["rates"])
     
     # Dettagli per interfaccia
     message += f"\n*{get_bot_translation('bot_messages.resource_info.network_interfaces')}:*\n"
     
-    
-    # Per ogni interfaccia, mostra l'indirizzo e le statistiche I/O
-    for interface, addrs in net_if_addrs.items():
-        # Escludiamo loopback e interfacce virtuali
-        if interface != 'lo' and not interface.startswith('veth'):
-            # Otteniamo l'indirizzo IPv4 se disponibile
-            ipv4 = None
-            for addr in addrs:
-                if addr.family == 2:  # AF_INET (IPv4)
-                    ipv4 = addr.address
-                    break
-            
-            if ipv4:
-                message += f"\n*{interface}* ({ipv4})\n"
-                
-                # Aggiungiamo le statistiche I/O se disponibili
-                if interface in net_io_now:
-                    stats = net_io_now[interface]
-                    message += f"  {get_bot_translation('bot_messages.resource_info.total_sent')}: {format_size(stats.bytes_sent)}\n"
-                    message += f"  {get_bot_translation('bot_messages.resource_info.total_received')}: {format_size(stats.bytes_recv)}\n"
-                    message += f"  {get_bot_translation('bot_messages.resource_info.packets_sent')}: {stats.packets_sent}\n"
-                    message += f"  {get_bot_translation('bot_messages.resource_info.packets_received')}: {stats.packets_recv}\n"
+    # Per ogni interfaccia, mostra l'indirizzo, le statistiche I/O e le velocità
+    for interface, stats in (snapshot.get("interfaces", {}) if snapshot else {}).items():
+        # Escludiamo loopback, interfacce virtuali e interfacce senza IPv4
+        if interface == 'lo' or interface.startswith('veth') or not stats["ipv4"]:
+            continue
+        message += f"\n*{interface}* ({stats['ipv4']})\n"
+        message += f"  {get_bot_translation('bot_messages.resource_info.total_sent')}: {format_size(stats['bytes_sent'])}\n"
+        message += f"  {get_bot_translation('bot_messages.resource_info.total_received')}: {format_size(stats['bytes_recv'])}\n"
+        message += f"  {get_bot_translation('bot_messages.resource_info.packets_sent')}: {stats['packets_sent']}\n"
+        message += f"  {get_bot_translation('bot_messages.resource_info.packets_received')}: {stats['packets_recv']}\n"
+        message += format_network_rates(stats["rates"])
     
     return message
 
-def get_public_ip():
-    """Ottieni l'indirizzo IP pubblico"""
+def get_resource_collectors():
+    """Sezioni della vista "Tutte le risorse" nell'ordine di visualizzazione"""
+    return [
+        ("cpu", get_cpu_resources, "cpu_title"),
+        ("ram", get_ram_resources, "ram_title"),
+        ("disk", get_disk_info, "disk_title"),
+        ("network", get_network_info, "network_title")
+    ]
+
+def submit_resource_collector(name, collector):
+    """Avvia un collector, riutilizzando l'esecuzione precedente se è ancora in corso
+
+    Un collector bloccato occupa al massimo un worker: le richieste successive
+    attendono la stessa esecuzione invece di accodarne altre.
+    """
+    with RESOURCE_LOCK:
+        future = RESOURCE_INFLIGHT.get(name)
+        if future is None or future.done():
+            future = RESOURCE_EXECUTOR.submit(collector)
+            RESOURCE_INFLIGHT[name] = future
+        return future
+
+def gather_resources():
+    """Esegue in parallelo i collector e compone la vista "Tutte le risorse"
+
+    Ogni sezione ha il proprio timeout: una sezione lenta o in errore viene
+    sostituita da un avviso e le altre vengono mostrate comunque. Il tempo
+    totale è quello della sezione più lenta, non la somma.
+    """
+    started = time.monotonic()
+    collectors = get_resource_collectors()
+    futures = [(name, title, submit_resource_collector(name, collector)) for name, collector, title in collectors]
+    
+    sections = []
+    for name, title, future in futures:
+        timeout = RESOURCE_COLLECTOR_TIMEOUTS.get(name, 5)
+        remaining = max(0, started + timeout - time.monotonic())
+        try:
+            sections.append(future.result(timeout=remaining))
+        except FuturesTimeoutError:
+            logger.warning(f"Sezione {name} non completata entro {timeout}s")
+            sections.append(f"{get_bot_translation(f'bot_messages.resource_info.{title}')}\n\n"
+                            f"_{get_bot_translation('bot_messages.resource_info.collector_timeout', seconds=timeout)}_")
+        except Exception as e:
+            logger.error(f"Errore nella raccolta della sezione {name}: {e}")
+            sections.append(f"{get_bot_translation(f'bot_messages.resource_info.{title}')}\n\n"
+                            f"_{get_bot_translation('bot_messages.resource_info.collector_error')}_")
+    
+    logger.debug(f"Vista risorse composta in {time.monotonic() - started:.2f}s")
+    return f"\n\n{'-'*30}\n\n".join(sections)
+
+def fetch_public_ip(providers, timeout):
+    """Interroga in parallelo i servizi configurati e restituisce il primo IP valido
+
+    Returns:
+        tuple: (ip, provider) oppure (None, errore)
+    """
+    if not providers:
+        return None, "nessun servizio configurato"
+    
+    def query(provider):
+        response = requests.get(provider, timeout=timeout)
+        response.raise_for_status()
+        # Alcuni servizi aggiungono testo o spazi: si accetta solo un indirizzo valido
+        return str(ipaddress.ip_address(response.text.strip()))
+    
+    errors = []
+    executor = ThreadPoolExecutor(max_workers=len(providers), thread_name_prefix="public-ip")
+    try:
+        futures = {executor.submit(query, provider): provider for provider in providers}
+        for future in as_completed(futures, timeout=timeout + 1):
+            try:
+                return future.result(), futures[future]
+            except Exception as e:
+                errors.append(f"{futures[future]}: {e}")
+    except FuturesTimeoutError:
+        errors.append("timeout")
+    finally:
+        # Non si attendono i servizi più lenti: la risposta più veloce è sufficiente
+        executor.shutdown(wait=False)
+    return None, "; ".join(errors)
+
+def load_public_ip_state():
+    """Carica l'ultimo IP pubblico noto (per rilevare i cambi anche dopo un riavvio)"""
     try:
-        import requests as requests_module  # Importa localmente per evitare problemi di scope
-        response = requests_module.get('https://api.ipify.org', timeout=5)
-        return response.text.strip()
+        if PUBLIC_IP_STATE_FILE.exists():
+            with open(PUBLIC_IP_STATE_FILE, "r") as f:
+                return json.load(f)
     except Exception as e:
-        logger.error(f"Errore nel recupero dell'IP pubblico: {str(e)}")
-        return None
+        logger.error(f"Errore nel caricamento dello stato dell'IP pubblico: {e}")
+    return {}
+
+def save_public_ip_state(state):
+    """Salva l'ultimo IP pubblico noto"""
+    try:
+        PUBLIC_IP_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(PUBLIC_IP_STATE_FILE, "w") as f:
+            json.dump(state, f)
+    except Exception as e:
+        logger.error(f"Errore nel salvataggio dello stato dell'IP pubblico: {e}")
+
+def refresh_public_ip(config=None):
+    """Aggiorna l'IP pubblico e notifica l'eventuale cambio
+
+    Returns:
+        bool: True se l'aggiornamento è riuscito
+    """
+    global PUBLIC_IP_STATE
+    
+    config = config or load_monitoring_config().get("public_ip", {})
+    providers = config.get("providers") or PUBLIC_IP_DEFAULT_PROVIDERS
+    ip, provider = fetch_public_ip(providers, config.get("timeout", 5))
+    
+    with PUBLIC_IP_LOCK:
+        state = dict(PUBLIC_IP_STATE)
+        if not ip:
+            state["error"] = provider
+            PUBLIC_IP_STATE = state
+            logger.warning(f"Impossibile aggiornare l'IP pubblico: {provider}")
+            return False
+        
+        previous_ip = state.get("ip")
+        now = time.time()
+        state.update({"ip": ip, "provider": provider, "updated": now, "error": None})
+        if ip != previous_ip:
+            state["changed"] = now
+        PUBLIC_IP_STATE = state
+    
+    if ip != previous_ip:
+        save_public_ip_state({"ip": ip, "changed": state["changed"]})
+        if previous_ip:
+            logger.info(f"IP pubblico cambiato: {previous_ip} -> {ip}")
+            if config.get("change_alert", False):
+                send_telegram_message(get_bot_translation("bot_messages.alert_messages.public_ip_changed",
+                                                          old_ip=previous_ip,
+                                                          new_ip=ip,
+                                                          timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+                                      priority=PRIORITY_ALERT)
+    return True
+
+def public_ip_loop():
+    """Aggiorna l'IP pubblico alla scadenza del TTL configurato"""
+    global PUBLIC_IP_STATE
+    
+    with PUBLIC_IP_LOCK:
+        # L'IP salvato serve solo come confronto: finché non viene confermato non è "fresco"
+        previous = load_public_ip_state()
+        PUBLIC_IP_STATE = {"ip": previous.get("ip"), "changed": previous.get("changed"), "updated": None}
+    
+    while True:
+        config = load_monitoring_config().get("public_ip", {})
+        try:
+            ok = refresh_public_ip(config)
+        except Exception as e:
+            logger.error(f"Errore nell'aggiornamento dell'IP pubblico: {e}")
+            ok = False
+        ttl = max(60, int(config.get("ttl", 900)))
+        PUBLIC_IP_REFRESH.wait(ttl if ok else min(ttl, PUBLIC_IP_RETRY_INTERVAL))
+        PUBLIC_IP_REFRESH.clear()
+
+def ensure_public_ip_tracker():
+    """Avvia l'aggiornamento in background dell'IP pubblico se non è già attivo"""
+    global PUBLIC_IP_THREAD
+    
+    with PUBLIC_IP_LOCK:
+        if PUBLIC_IP_THREAD and PUBLIC_IP_THREAD.is_alive():
+            return
+        PUBLIC_IP_THREAD = threading.Thread(target=public_ip_loop, daemon=True)
+        PUBLIC_IP_THREAD.start()
+
+def get_public_ip():
+    """Restituisce subito l'IP pubblico in cache e la sua età in secondi
+
+    Returns:
+        tuple: (ip, età) oppure (None, None) se non è ancora stato rilevato
+    """
+    ensure_public_ip_tracker()
+    with PUBLIC_IP_LOCK:
+        state = PUBLIC_IP_STATE
+    if not state.get("ip") or not state.get("updated"):
+        return None, None
+    return state["ip"], time.time() - state["updated"]
+
+def get_public_ip_status():
+    """Stato dell'IP pubblico per la diagnostica"""
+    with PUBLIC_IP_LOCK:
+        state = dict(PUBLIC_IP_STATE)
+    if state.get("updated"):
+        state["age"] = round(time.time() - state["updated"], 1)
+    return state
 
 def get_host_ip():
     """Ottieni l'indirizzo IP del server host"""
     try:
         # Prova a eseguire un comando sul server host
-        result = run_host_command("hostname -I | awk '{print $1}'")
+        result = run_host_query("hostname -I | awk '{print $1}'")
         if result and result.stdout:
             return result.stdout.strip()
         return None
@@ -969,15 +2651,19 @@ def get_host_ip():
         logger.error(f"Errore nel recupero dell'IP host: {str(e)}")
         return None
 
-def get_host_interface_stats(host_ip):
-    """Ottieni le statistiche dell'interfaccia dell'host basandosi sull'IP"""
+def get_host_interface_stats(host_ip, host_interface=None):
+    """Ottieni le statistiche dell'interfaccia dell'host basandosi sull'IP
+
+    Se l'interfaccia è già nota (host_interface) la ricerca viene saltata e
+    basta una sola lettura di /proc/net/dev. La ricerca usa la cache delle
+    interrogazioni sull'host, i contatori vengono sempre riletti.
+    """
     try:
         if not host_ip:
             return None
-            
+        
         # Metodo 1: Prova con ip -j (JSON output)
-        result = run_host_command("ip -j addr show 2>/dev/null")
-        host_interface = None
+        result = None if host_interface else run_host_query("ip -j addr show 2>/dev/null")
         
         if result and result.stdout:
             try:
@@ -998,7 +2684,7 @@ def get_host_interface_stats(host_ip):
         
         # Metodo 2: Fallback con ip addr show (output text)
         if not host_interface:
-            result = run_host_command(f"ip addr show | grep -B2 '{host_ip}/' | grep '^[0-9]' | head -1")
+            result = run_host_query(f"ip addr show | grep -B2 '{host_ip}/' | grep '^[0-9]' | head -1")
             if result and result.stdout:
                 # Estrai il nome dell'interfaccia dal formato "2: eth0: <BROADCAST..."
                 line = result.stdout.strip()
@@ -1009,7 +2695,7 @@ def get_host_interface_stats(host_ip):
         
         # Metodo 3: Fallback con ifconfig se disponibile
         if not host_interface:
-            result = run_host_command(f"ifconfig | grep -B1 '{host_ip}' | grep '^[a-zA-Z]' | head -1")
+            result = run_host_query(f"ifconfig | grep -B1 '{host_ip}' | grep '^[a-zA-Z]' | head -1")
             if result and result.stdout:
                 line = result.stdout.strip()
                 if line:
@@ -1074,6 +2760,88 @@ def get_top_processes(num=5):
     
     return message
 
+# ----------------------------------------
+# Esecuzione concorrente degli handler
+# ----------------------------------------
+
+def record_handler_stats(name, wait, run_time, failed):
+    """Aggiorna le statistiche di attesa ed esecuzione di un handler"""
+    with HANDLER_LOCK:
+        stats = HANDLER_STATS.setdefault(name, {
+            "calls": 0, "errors": 0,
+            "avg_wait": 0.0, "max_wait": 0.0,
+            "avg_run": 0.0, "max_run": 0.0
+        })
+        stats["calls"] += 1
+        stats["errors"] += 1 if failed else 0
+        # Media mobile esponenziale: reagisce ai rallentamenti recenti
+        alpha = 1.0 if stats["calls"] == 1 else 0.1
+        stats["avg_wait"] += (wait - stats["avg_wait"]) * alpha
+        stats["avg_run"] += (run_time - stats["avg_run"]) * alpha
+        stats["max_wait"] = max(stats["max_wait"], wait)
+        stats["max_run"] = max(stats["max_run"], run_time)
+
+def drain_chat_queue(chat_id):
+    """Esegue in ordine gli handler accodati per una chat, finché la coda è vuota"""
+    while True:
+        with HANDLER_LOCK:
+            pending = HANDLER_CHAT_QUEUES[chat_id]
+            if not pending:
+                # Nessun altro lavoro: la prossima richiesta riattiverà la chat
+                del HANDLER_CHAT_QUEUES[chat_id]
+                return
+            handler, update, context, enqueued = pending.popleft()
+        
+        started = time.monotonic()
+        failed = False
+        try:
+            handler(update, context)
+        except Exception as e:
+            failed = True
+            logger.error(f"Errore nell'handler {handler.__name__}: {e}")
+        record_handler_stats(handler.__name__, started - enqueued, time.monotonic() - started, failed)
+
+def chat_serialized(handler):
+    """Avvolge un handler perché venga eseguito nel pool, in ordine per chat
+
+    Il dispatcher resta libero di ricevere altri aggiornamenti mentre l'handler
+    lavora; le callback query ricevono subito la risposta così il client Telegram
+    smette di mostrare il caricamento sul pulsante.
+    """
+    def wrapper(update, context):
+        if update.callback_query:
+            try:
+                update.callback_query.answer()
+            except Exception as e:
+                logger.warning(f"Impossibile rispondere alla callback query: {e}")
+        
+        chat_id = update.effective_chat.id if update.effective_chat else None
+        with HANDLER_LOCK:
+            pending = HANDLER_CHAT_QUEUES.get(chat_id)
+            if pending is not None and len(pending) >= HANDLER_MAX_PENDING_PER_CHAT:
+                logger.warning(f"Troppe richieste in attesa per la chat {chat_id}, richiesta scartata")
+                return
+            start_worker = pending is None
+            if start_worker:
+                pending = HANDLER_CHAT_QUEUES[chat_id] = deque()
+            pending.append((handler, update, context, time.monotonic()))
+        
+        if start_worker:
+            HANDLER_EXECUTOR.submit(drain_chat_queue, chat_id)
+    
+    wrapper.__name__ = handler.__name__
+    return wrapper
+
+def get_handler_status():
+    """Restituisce richieste in attesa e tempi degli handler per il debug"""
+    with HANDLER_LOCK:
+        return {
+            "workers": HANDLER_WORKERS,
+            "active_chats": len(HANDLER_CHAT_QUEUES),
+            "pending": sum(len(pending) for pending in HANDLER_CHAT_QUEUES.values()),
+            "handlers": {name: dict(stats) for name, stats in HANDLER_STATS.items()}
+        }
+
 # ----------------------------------------
 # Funzioni per il bot Telegram
 # ----------------------------------------
@@ -1088,32 +2856,40 @@ def init_bot(token=None, chat_id=None):
     
     if not BOT_INSTANCE and BOT_TOKEN:
         try:
-            BOT_INSTANCE = telegram.Bot(token=BOT_TOKEN)
-            UPDATER = Updater(token=BOT_TOKEN, use_context=True)
+            # Un solo Bot (e un solo pool di connessioni) condiviso tra polling e risposte
+            BOT_INSTANCE = telegram.Bot(token=BOT_TOKEN, request=telegram_client.get_ptb_request(),
+                                        **telegram_client.get_ptb_base_urls())
+            UPDATER = Updater(bot=BOT_INSTANCE, use_context=True)
             
             # Registra gli handler per i comandi (multilingue)
             dp = UPDATER.dispatcher
             # Comandi universali (stessi per tutte le lingue)
             # IMPORTANTE: Questi comandi NON devono mai essere tradotti per evitare problemi
-            dp.add_handler(CommandHandler("res", command_risorse))      # Risorse sistema
-            dp.add_handler(CommandHandler("start", command_start))      # Avvia bot
-            dp.add_handler(CommandHandler("help", command_help))        # Aiuto
-            dp.add_handler(CommandHandler("reboot", command_reboot))    # Riavvia server
-            dp.add_handler(CommandHandler("docker", command_docker))    # Gestione Docker
-            dp.add_handler(CommandHandler("upload", command_upload))    # Upload file
-            dp.add_handler(CommandHandler("download", command_download))  # Download file
-            dp.add_handler(CallbackQueryHandler(button_callback))
+            # Gli handler girano nel pool di worker, serializzati per chat
+            dp.add_handler(CommandHandler("res", chat_serialized(command_risorse)))      # Risorse sistema
+            dp.add_handler(CommandHandler("start", chat_serialized(command_start)))      # Avvia bot
+            dp.add_handler(CommandHandler("help", chat_serialized(command_help)))        # Aiuto
+            dp.add_handler(CommandHandler("reboot", chat_serialized(command_reboot)))    # Riavvia server
+            dp.add_handler(CommandHandler("docker", chat_serialized(command_docker)))    # Gestione Docker
+            dp.add_handler(CommandHandler("upload", chat_serialized(command_upload)))    # Upload file
+            dp.add_handler(CommandHandler("download", chat_serialized(command_download)))  # Download file
+            dp.add_handler(CommandHandler("graph", chat_serialized(command_graph)))      # Grafico storico metriche
+            dp.add_handler(CommandHandler("logs", chat_serialized(command_logs)))        # Log dei container
+            dp.add_handler(CallbackQueryHandler(chat_serialized(button_callback)))
             # Aggiungiamo un handler per i file ricevuti
-            dp.add_handler(MessageHandler(Filters.document, handle_file_upload))
+            dp.add_handler(MessageHandler(Filters.document, chat_serialized(handle_file_upload)))
             # Handler per input di testo (per la creazione di cartelle)
-            dp.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_text_input))
+            dp.add_handler(MessageHandler(Filters.text & ~Filters.command, chat_serialized(handle_text_input)))
             
-            # Avvia il polling in un thread separato
-            UPDATER.start_polling(drop_pending_updates=True)
+            # Avvia la ricezione degli aggiornamenti (polling o webhook, da config.ini)
+            start_update_delivery(telegram_client.load_credentials()["update_mode"], drop_pending_updates=True)
             
             # Avvia il sistema di monitoraggio
             start_monitoring()
             
+            # Avvia il worker di invio (ripristina i messaggi rimasti nello spool)
+            ensure_outbound_sender()
+            
             logger.info("Bot Telegram inizializzato con successo")
             return True
         except Exception as e:
@@ -1130,6 +2906,8 @@ def stop_bot():
             # Ferma il sistema di monitoraggio
             stop_monitoring()
             
+            # In modalità webhook il webhook resta registrato: Telegram conserva gli
+            # aggiornamenti finché il bot non riparte
             UPDATER.stop()
             UPDATER = None
             BOT_INSTANCE = None
@@ -1140,6 +2918,119 @@ def stop_bot():
             return False
     return True
 
+# ----------------------------------------
+# Modalità di ricezione degli aggiornamenti (polling / webhook)
+# ----------------------------------------
+
+def get_webhook_path(token=None):
+    """Percorso segreto della rotta webhook, derivato dal token del bot"""
+    digest = hashlib.sha256((token or BOT_TOKEN or "").encode()).hexdigest()[:32]
+    return f"{WEBHOOK_ROUTE}/{digest}"
+
+def start_webhook_delivery(drop_pending_updates=False):
+    """Registra il webhook e avvia il dispatcher che consuma la coda degli aggiornamenti"""
+    global WEBHOOK_SECRET, WEBHOOK_DISPATCHER_THREAD
+    
+    credentials = telegram_client.load_credentials()
+    webhook_url = credentials["webhook_url"].rstrip("/")
+    if not webhook_url:
+        logger.error("URL pubblico del webhook non configurato")
+        return False
+    
+    # Senza un secret esplicito se ne deriva uno stabile dal token (che è già segreto)
+    WEBHOOK_SECRET = credentials["webhook_secret"] or hmac.new(
+        BOT_TOKEN.encode(), b"webhook-secret", hashlib.sha256).hexdigest()
+    WEBHOOK_DISPATCHER_THREAD = threading.Thread(target=UPDATER.dispatcher.start, daemon=True)
+    WEBHOOK_DISPATCHER_THREAD.start()
+    BOT_INSTANCE.set_webhook(url=webhook_url + get_webhook_path(), secret_token=WEBHOOK_SECRET,
+                             drop_pending_updates=drop_pending_updates)
+    logger.info(f"Webhook Telegram registrato su {webhook_url}{WEBHOOK_ROUTE}/...")
+    return True
+
+def start_update_delivery(mode, drop_pending_updates=False):
+    """Avvia la ricezione degli aggiornamenti nella modalità richiesta (ripiega sul polling)"""
+    global UPDATE_MODE
+    
+    if mode == "webhook":
+        try:
+            if start_webhook_delivery(drop_pending_updates):
+                UPDATE_MODE = "webhook"
+                return True
+        except Exception as e:
+            logger.error(f"Errore nella registrazione del webhook, uso il polling: {e}")
+        # Ferma il dispatcher eventualmente avviato: start_polling lo riavvia
+        UPDATER.dispatcher.stop()
+    
+    # start_polling rimuove l'eventuale webhook registrato in precedenza
+    UPDATER.start_polling(drop_pending_updates=drop_pending_updates)
+    UPDATE_MODE = "polling"
+    return mode != "webhook"
+
+def stop_update_delivery():
+    """Ferma la ricezione corrente senza perdere aggiornamenti
+
+    Il dispatcher elabora tutto ciò che è già in coda prima di fermarsi, mentre gli
+    aggiornamenti non ancora confermati restano su Telegram e arrivano alla nuova modalità.
+    """
+    global WEBHOOK_DISPATCHER_THREAD
+    
+    if UPDATE_MODE == "webhook":
+        UPDATER.dispatcher.stop()
+        if WEBHOOK_DISPATCHER_THREAD:
+            WEBHOOK_DISPATCHER_THREAD.join(timeout=10)
+            WEBHOOK_DISPATCHER_THREAD = None
+    else:
+        UPDATER.stop()
+
+def set_update_mode(mode):
+    """Passa a runtime tra polling e webhook senza scartare gli aggiornamenti in attesa
+
+    Returns:
+        tuple: (successo, messaggio)
+    """
+    if mode not in ("polling", "webhook"):
+        return False, f"Modalità non valida: {mode}"
+    if not UPDATER or not BOT_INSTANCE:
+        return False, "Bot Telegram non inizializzato"
+    
+    with UPDATE_MODE_LOCK:
+        try:
+            previous_mode = UPDATE_MODE
+            stop_update_delivery()
+            if mode == "polling" and previous_mode == "webhook":
+                BOT_INSTANCE.delete_webhook(drop_pending_updates=False)
+            if start_update_delivery(mode, drop_pending_updates=False):
+                logger.info(f"Ricezione aggiornamenti Telegram: {previous_mode} -> {mode}")
+                return True, f"Modalità {mode} attiva"
+            return False, "Registrazione del webhook non riuscita, il bot è tornato al polling"
+        except Exception as e:
+            logger.error(f"Errore nel cambio di modalità di ricezione: {e}")
+            return False, str(e)
+
+def get_update_mode():
+    """Restituisce la modalità di ricezione attiva e il percorso della rotta webhook"""
+    return {"mode": UPDATE_MODE, "webhook_path": get_webhook_path() if BOT_TOKEN else None}
+
+def process_webhook_update(path_token, secret_token, data):
+    """Valida una chiamata webhook e accoda l'aggiornamento al dispatcher senza elaborarlo
+
+    Returns:
+        tuple: (codice HTTP, messaggio)
+    """
+    if not BOT_TOKEN or not hmac.compare_digest(f"{WEBHOOK_ROUTE}/{path_token}", get_webhook_path()):
+        return 404, "Not Found"
+    if not WEBHOOK_SECRET or not hmac.compare_digest(secret_token or "", WEBHOOK_SECRET):
+        return 403, "Forbidden"
+    if UPDATE_MODE != "webhook" or not UPDATER:
+        # Telegram riproverà: l'aggiornamento non va perso durante un cambio di modalità
+        return 503, "Webhook non attivo"
+    try:
+        UPDATER.update_queue.put(Update.de_json(data, BOT_INSTANCE))
+        return 200, "OK"
+    except Exception as e:
+        logger.error(f"Errore nella ricezione dell'aggiornamento webhook: {e}")
+        return 400, "Bad Request"
+
 def get_resource_keyboard():
     """Costruisce la tastiera inline per i comandi del bot"""
     keyboard = [
@@ -1178,6 +3069,44 @@ def command_help(update, context):
     message = get_bot_translation("bot_messages.help")
     update.message.reply_text(message)
 
+def command_graph(update, context):
+    """Handler per il comando /graph <metrica> [intervallo]"""
+    args = context.args or []
+    available = list_history_metrics()
+    if not args:
+        update.message.reply_text(
+            get_bot_translation("bot_messages.graph.usage",
+                                metrics=", ".join(f"`{metric}`" for metric in available) or get_bot_translation("bot_messages.graph.no_metrics")),
+            parse_mode="Markdown"
+        )
+        return
+    
+    metric = args[0].lower() if not args[0].lower().startswith("disk:") else "disk:" + args[0][5:]
+    range_text = args[1] if len(args) > 1 else GRAPH_DEFAULT_RANGE
+    range_seconds = parse_graph_range(range_text)
+    if range_seconds is None:
+        update.message.reply_text(get_bot_translation("bot_messages.graph.invalid_range", range=range_text))
+        return
+    if metric not in available:
+        update.message.reply_text(get_bot_translation("bot_messages.graph.no_data", metric=metric))
+        return
+    
+    try:
+        started = time.monotonic()
+        png, stats = render_metric_graph(metric, range_seconds)
+        logger.debug(f"Grafico {metric} ({range_text}) pronto in {(time.monotonic() - started) * 1000:.0f} ms")
+    except Exception as e:
+        logger.error(f"Errore nella creazione del grafico {metric}: {e}")
+        png, stats = None, None
+    if not png:
+        update.message.reply_text(get_bot_translation("bot_messages.graph.no_data", metric=metric))
+        return
+    
+    unit = HISTORY_METRICS.get(metric, ("%", "%"))[1]
+    caption = get_bot_translation("bot_messages.graph.caption", metric=metric, range=range_text,
+                                  min=stats["min"], avg=stats["avg"], max=stats["max"], unit=unit)
+    update.message.reply_photo(photo=io.BytesIO(png), caption=caption)
+
 def command_download(update, context):
     """Handler per il comando /download per scaricare files dal server"""
     global DOWNLOAD_STATES
@@ -1206,7 +3135,7 @@ def command_download(update, context):
             if path:
                 # Usa solo il nome della directory come testo del pulsante
                 display_name = os.path.basename(path) or path
-                keyboard.append([InlineKeyboardButton(f"📁 {display_name}", callback_data=f"download_mount_{path}")])
+                keyboard.append([InlineKeyboardButton(f"📁 {display_name}", callback_data=f"download_mount_{cache_path(path)}")])
     
     # Pulsante di annullamento
     keyboard.append([InlineKeyboardButton(get_bot_translation("bot_messages.download.cancel"), callback_data="download_cancel")])
@@ -1241,95 +3170,44 @@ def command_reboot(update, context):
         parse_mode="Markdown"
     )
 
-def command_docker(update, context, page=0):
-    """Handler per il comando /docker con paginazione"""
+def build_docker_listing():
+    """Snapshot della lista di /docker: l'inventario è copy-on-write, quindi basta tenerne i riferimenti"""
+    inventory = get_docker_inventory()
+    return {"items": inventory["order"], "containers": inventory["containers"], "running": inventory["running"]}
+
+def command_docker(update, context, page=0, refresh=False):
+    """Handler per il comando /docker con paginazione
+
+    Viene chiamato anche dai pulsanti con la CallbackQuery al posto di update:
+    in quel caso il messaggio viene modificato e le pagine vengono lette dallo
+    snapshot della lista legato al messaggio (refresh lo ricostruisce).
+    Con un argomento (/docker web-*) apre la selezione multipla con i container
+    corrispondenti già selezionati.
+    """
+    query = update if isinstance(update, telegram.CallbackQuery) else None
     try:
-        # Ottieni la lista dei container Docker
-        result = subprocess.run(['docker', 'ps', '-a', '--format', '{{.Names}}\t{{.Status}}\t{{.Image}}'], 
-                              capture_output=True, text=True, check=True)
+        if query is None and getattr(context, "args", None):
+            open_docker_bulk_selection(update, update.effective_chat.id, " ".join(context.args))
+            return
         
-        containers = result.stdout.strip().split('\n')
+        # Inventario mantenuto dagli eventi Docker: già ordinato, si legge solo la pagina richiesta
+        key = (query.message.chat_id, query.message.message_id, "docker") if query else None
+        snapshot = get_listing_snapshot(key, "docker", build_docker_listing, refresh)
+        order = snapshot["items"]
         
-        if not containers or not containers[0]:
-            if hasattr(update, 'callback_query'):
-                update.callback_query.edit_message_text("Nessun container Docker trovato.")
+        if not order:
+            if query:
+                query.edit_message_text("Nessun container Docker trovato.")
             else:
                 update.message.reply_text("Nessun container Docker trovato.")
             return
         
         # Crea una tastiera con un pulsante per ogni container
         keyboard = []
-        running_containers = []
-        stopped_containers = []
-        
-        # Ordina i container per stato (running/stopped) e per nome
-        for container in containers:
-            if not container.strip():
-                continue
-                
-            parts = container.split('\t')
-            name = parts[0] if len(parts) > 0 else "Unknown"
-            status = parts[1] if len(parts) > 1 else "Unknown"
-            image = parts[2] if len(parts) > 2 else ""
-            
-            # Determina se il container è in esecuzione
-            is_running = 'Up' in status
-            container_data = {'name': name, 'status': status, 'image': image}
-            
-            if is_running:
-                running_containers.append(container_data)
-            else:
-                stopped_containers.append(container_data)
-        
-        # Ordina i container per nome
-        running_containers.sort(key=lambda x: x['name'])
-        stopped_containers.sort(key=lambda x: x['name'])
-        
-        # Prepara tutti i container in un'unica lista
-        all_containers = []
-        
-        # Aggiungiamo i container in esecuzione
-        if running_containers:
-            for container in running_containers:
-                # Estrai il tempo di uptime dal messaggio di stato in formato ultra-compatto
-                uptime_text = ""
-                if "Up" in container['status']:
-                    uptime_match = re.search(r'Up (.*)', container['status'])
-                    if uptime_match:
-                        uptime = uptime_match.group(1)
-                        # Rendi l'uptime ultra-compatto
-                        uptime = uptime.replace(" hours", "h").replace(" hour", "h")
-                        uptime = uptime.replace(" minutes", "m").replace(" minute", "m")
-                        uptime = uptime.replace(" seconds", "s").replace(" second", "s")
-                        uptime = uptime.replace(" days", "d").replace(" day", "d")
-                        # Mantieni gli spazi per maggiore leggibilità
-                        uptime = uptime.replace("ago", "").strip()
-                        uptime_text = f" - {uptime}"
-                
-                container_name = container['name']
-                # Aggiungi container alla lista con le sue info
-                all_containers.append({
-                    "name": container_name,
-                    "display_name": container_name,
-                    "status": "running",
-                    "uptime_text": uptime_text
-                })
-        
-        # Aggiungiamo i container fermi
-        if stopped_containers:
-            for container in stopped_containers:
-                container_name = container['name']
-                # Aggiungi container alla lista con le sue info
-                all_containers.append({
-                    "name": container_name,
-                    "display_name": container_name,
-                    "status": "stopped",
-                    "uptime_text": ""
-                })
         
         # Calcola il numero totale di pagine
         containers_per_page = 10
-        total_containers = len(all_containers)
+        total_containers = len(order)
         total_pages = (total_containers + containers_per_page - 1) // containers_per_page
         
         # Assicurati che la pagina richiesta sia valida
@@ -1338,16 +3216,17 @@ def command_docker(update, context, page=0):
         # Ottieni i container per la pagina corrente
         start_idx = page * containers_per_page
         end_idx = min(start_idx + containers_per_page, total_containers)
-        current_page_containers = all_containers[start_idx:end_idx]
         
         # Crea un bottone per ogni container nella pagina corrente
-        for container in current_page_containers:
+        for container_id in order[start_idx:end_idx]:
+            container = snapshot["containers"][container_id]
             # Mostra il nome completo del container, ora che abbiamo più spazio
-            display_name = container["display_name"]
+            display_name = container["name"]
                 
-            if container["status"] == "running":
-                # Container in esecuzione con uptime in grassetto - riempie tutto lo schermo
-                button_text = f"🟢  {display_name}{container['uptime_text']}  "
+            if container["state"] in ("running", "paused"):
+                # Container in esecuzione con uptime in formato compatto
+                uptime_text = f" - {format_container_uptime(container['started_at'])}" if container["started_at"] else ""
+                button_text = f"🟢  {display_name}{uptime_text}  "
             else:
                 # Container fermo in grassetto - riempie tutto lo schermo
                 button_text = f"🔴  {display_name}  "
@@ -1383,6 +3262,12 @@ def command_docker(update, context, page=0):
         # Aggiungi la riga di navigazione se ci sono più pagine
         if nav_buttons:
             keyboard.append(nav_buttons)
+        
+        # Selezione multipla per le azioni in blocco e ricostruzione della lista
+        keyboard.append([
+            InlineKeyboardButton(get_bot_translation("bot_messages.docker_bulk.open"), callback_data="dockerbulk_open"),
+            InlineKeyboardButton(get_bot_translation("bot_messages.refresh"), callback_data=f"dockerlist_refresh_{page}")
+        ])
                 
         # Aggiungi pulsante per tornare al menu principale
         keyboard.append([InlineKeyboardButton(get_bot_translation("bot_messages.back_to_resources"), callback_data="back_to_resources")])
@@ -1390,27 +3275,31 @@ def command_docker(update, context, page=0):
         reply_markup = InlineKeyboardMarkup(keyboard)
         
         # Mostra intestazione con conteggio totale e pagina corrente
-        docker_summary = get_bot_translation("bot_messages.docker_summary", running=len(running_containers), stopped=len(stopped_containers))
+        docker_summary = get_bot_translation("bot_messages.docker_summary", running=snapshot["running"], stopped=total_containers - snapshot["running"])
         if total_pages > 1:
             message = f"{get_bot_translation('bot_messages.docker_management')} ({docker_summary}) - Pag {page+1}/{total_pages}"
         else:
             message = f"{get_bot_translation('bot_messages.docker_management')} ({docker_summary})"
+        message += f"\n{format_snapshot_time(snapshot)}"
         
         # Aggiorna il messaggio se è un callback, altrimenti invia un nuovo messaggio
-        if hasattr(update, 'callback_query') and update.callback_query is not None:
+        if query:
             try:
-                update.callback_query.edit_message_text(text=message, reply_markup=reply_markup, parse_mode="Markdown")
+                query.edit_message_text(text=message, reply_markup=reply_markup, parse_mode="Markdown")
+                return
             except Exception as edit_error:
                 logger.error(f"Errore nell'aggiornamento del messaggio: {str(edit_error)}")
                 # Se fallisce l'aggiornamento, invia un nuovo messaggio
-                update.callback_query.message.reply_text(text=message, reply_markup=reply_markup, parse_mode="Markdown")
+                sent = query.message.reply_text(text=message, reply_markup=reply_markup, parse_mode="Markdown")
         else:
-            update.message.reply_text(text=message, reply_markup=reply_markup, parse_mode="Markdown")
+            sent = update.message.reply_text(text=message, reply_markup=reply_markup, parse_mode="Markdown")
+        # Le pagine successive di questo messaggio useranno la stessa lista
+        store_listing_snapshot((sent.chat_id, sent.message_id, "docker"), snapshot)
             
     except Exception as e:
         error_message = f"Errore nel recupero dei container Docker: {e}"
-        if hasattr(update, 'callback_query') and update.callback_query is not None:
-            update.callback_query.edit_message_text(text=error_message)
+        if query:
+            query.edit_message_text(text=error_message)
         else:
             update.message.reply_text(error_message)
 
@@ -1442,7 +3331,7 @@ def command_upload(update, context):
         for mount in mount_points:
             path = mount.get("path")
             if path:
-                keyboard.append([InlineKeyboardButton(f"📂 {path}", callback_data=f"browse_dir_{path}")])
+                keyboard.append([InlineKeyboardButton(f"📂 {path}", callback_data=f"browse_dir_{cache_path(path)}")])
     else:
         # Se non ci sono mount points configurati, mostra un messaggio
         error_msg = get_bot_translation("bot_messages.upload.no_mount_points")
@@ -1531,7 +3420,7 @@ def handle_text_input(update, context):
                 context.bot.delete_message(chat_id=chat_id, message_id=message_id)
                 
                 # Crea un nuovo messaggio di navigazione
-                keyboard = [[InlineKeyboardButton("📂 " + get_bot_translation("bot_messages.upload.continue_navigation"), callback_data=f"browse_dir_{parent_path}")]]
+                keyboard = [[InlineKeyboardButton("📂 " + get_bot_translation("bot_messages.upload.continue_navigation"), callback_data=f"browse_dir_{cache_path(parent_path)}")]]
                 reply_markup = InlineKeyboardMarkup(keyboard)
                 
                 update.message.reply_text(
@@ -1619,16 +3508,9 @@ def handle_file_upload(update, context):
         download_success = False
         error_messages = []
         
-        # Metodo 1: Download tramite requests
+        # Metodo 1: Download tramite la sessione HTTP condivisa
         try:
-            import requests
-            file_url = file.file_path
-            response = requests.get(file_url, stream=True)
-            response.raise_for_status()
-            with open(dest_path, 'wb') as out_file:
-                for chunk in response.iter_content(chunk_size=8192): 
-                    if chunk:
-                        out_file.write(chunk)
+            telegram_client.download_file(file.file_path, dest_path)
             download_success = True
             logger.info(f"Download completato con metodo 1 (requests) per {file_name}")
         except Exception as e1:
@@ -1709,8 +3591,8 @@ def get_back_button_keyboard():
 
 def button_callback(update, context):
     """Gestisce i callback dai pulsanti inline"""
+    # La risposta alla callback query è già stata inviata da chat_serialized
     query = update.callback_query
-    query.answer()
     
     # Ottieni il testo del callback data
     callback_data = query.data
@@ -1736,10 +3618,20 @@ def button_callback(update, context):
         response = get_network_info()
         query.edit_message_text(text=response, reply_markup=get_back_button_keyboard(), parse_mode="Markdown")
         
+    elif callback_data.startswith("dockerbulk_"):
+        # Selezione multipla e azioni in blocco sui container
+        handle_docker_bulk_callback(query, context, callback_data)
+    
+    elif callback_data.startswith("dockerlogs_"):
+        # Ultime righe di log come nuovi messaggi: la schermata dei dettagli resta visibile
+        # (prefisso fuori da docker_<nome>, così un container "logs_web_1" resta ispezionabile)
+        send_container_logs(context.bot, query.message.chat_id, callback_data[len("dockerlogs_"):],
+                            tail=CONTAINER_LOGS_DEFAULT_LINES)
+    
     elif callback_data == "docker_list":
         # Mostra la lista dei container Docker
-        # Simuliamo il comando /docker con pagina 0
-        command_docker(query, context, page=0)
+        # Simuliamo il comando /docker con pagina 0, con la lista aggiornata (si arriva da un'azione o dal menu)
+        command_docker(query, context, page=0, refresh=True)
     
     elif callback_data.startswith("docker_page_"):
         # Gestisci la paginazione dei container Docker
@@ -1754,10 +3646,19 @@ def button_callback(update, context):
             except ValueError:
                 # In caso di errore mostra la prima pagina
                 command_docker(query, context, page=0)
+    
+    elif callback_data.startswith("dockerlist_refresh_"):
+        # Ricostruisce lo snapshot della lista restando sulla stessa pagina
+        # (prefisso fuori da docker_<nome>, così un container "refresh_1" resta ispezionabile)
+        try:
+            page = int(callback_data.split("_")[-1])
+        except ValueError:
+            page = 0
+        command_docker(query, context, page=page, refresh=True)
         
     elif callback_data == "all_resources":
         # Mostra tutte le risorse
-        response = f"{get_cpu_resources()}\n\n{'-'*30}\n\n{get_ram_resources()}\n\n{'-'*30}\n\n{get_disk_info()}\n\n{'-'*30}\n\n{get_network_info()}"
+        response = gather_resources()
         
         # Usa la funzione per ottenere il pulsante "Torna indietro"
         query.edit_message_text(text=response, reply_markup=get_back_button_keyboard(), parse_mode="Markdown")
@@ -1794,6 +3695,12 @@ def button_callback(update, context):
         handle_upload_finish(query, context)
     elif callback_data == "upload_parent_dir":
         handle_navigate_to_parent(query, context)
+    elif callback_data == "upload_prev_page":
+        handle_upload_page_navigation(query, context, -1)
+    elif callback_data == "upload_next_page":
+        handle_upload_page_navigation(query, context, 1)
+    elif callback_data == "upload_page_info":
+        pass  # Non fare nulla
     elif callback_data.startswith("create_folder_"):
         handle_create_folder(query, context)
     elif callback_data.startswith("select_dir_"):
@@ -1824,6 +3731,8 @@ def button_callback(update, context):
         handle_download_page_navigation(query, context, 1)
     elif callback_data == "download_page_info":
         pass  # Non fare nulla
+    elif callback_data == "download_refresh":
+        handle_download_refresh(query, context)
 
 def handle_download_mount_selection(query, context):
     """Gestisce la selezione del mount point per il download"""
@@ -1831,7 +3740,7 @@ def handle_download_mount_selection(query, context):
     
     # Estrai il percorso dalla query
     callback_data = query.data
-    path = callback_data[len("download_mount_"):]
+    path = get_cached_path(callback_data[len("download_mount_"):])
     
     # Identifica l'utente
     chat_id = query.message.chat_id
@@ -1890,8 +3799,22 @@ def handle_download_browse_directory(query, context):
     # Mostra il contenuto della directory
     show_download_directory_contents(query, context, path)
 
-def show_download_directory_contents(query, context, path, page=None):
-    """Mostra il contenuto di una directory per il download"""
+def build_download_listing(path, refresh=False):
+    """Snapshot della navigazione download: riusa l'indice della directory senza copiarlo"""
+    index = get_directory_index(path, refresh)
+    return {
+        "items": index["entries"],
+        "directories": index["directories"],
+        "files": index["files"],
+        "large_files": index["large_files"]
+    }
+
+def show_download_directory_contents(query, context, path, page=None, refresh=False):
+    """Mostra il contenuto di una directory per il download
+
+    Le pagine vengono lette dallo snapshot della directory legato al messaggio;
+    refresh (pulsante Aggiorna) rilegge la directory.
+    """
     try:
         # Identifica l'utente e gestisci la paginazione
         chat_id = query.message.chat_id
@@ -1909,51 +3832,28 @@ def show_download_directory_contents(query, context, path, page=None):
         
         # Verifica che la directory esista
         if not os.path.isdir(path):
-            query.edit_message_text(get_bot_translation("bot_messages.download.path_not_found", path=path))
-            return
-        
-        # Elenca i file e le directory nel percorso
-        items = os.listdir(path)
-        
-        # Filtra e ordina gli elementi
-        directories = []
-        files = []
-        
-        for item in items:
-            item_path = os.path.join(path, item)
-            try:
-                if os.path.isdir(item_path):
-                    directories.append(item)
-                elif os.path.isfile(item_path):
-                    # Aggiungi tutti i file, controlleremo il limite solo al download
-                    file_size = os.path.getsize(item_path)
-                    logger.info(f"File trovato: {item}, dimensione: {file_size} bytes")
-                    files.append({"name": item, "size": file_size})
-                    logger.info(f"File aggiunto alla lista: {item}")
-            except Exception as e:
-                logger.error(f"Errore accesso file {item}: {str(e)}")
-                pass  # Ignora gli errori di accesso ai file
+            query.edit_message_text(get_bot_translation("bot_messages.download.path_not_found", path=path))
+            return
         
-        # Ordina alfabeticamente
-        directories.sort()
-        files.sort(key=lambda x: x["name"])
+        # Lista della directory legata al messaggio: le pagine successive non rileggono il disco
+        snapshot = get_listing_snapshot((chat_id, query.message.message_id, "download"), path,
+                                        lambda: build_download_listing(path, refresh), refresh)
+        all_items = snapshot["items"]
         
         # Paginazione - elementi per pagina
-        items_per_page = 15
-        total_items = len(directories) + len(files)
+        items_per_page = DIRECTORY_PAGE_SIZE
+        total_items = len(all_items)
         total_pages = max(1, (total_items + items_per_page - 1) // items_per_page)
         
+        # Dopo un aggiornamento la directory può avere meno pagine
+        page = max(0, min(page, total_pages - 1))
+        if chat_id in DOWNLOAD_STATES:
+            DOWNLOAD_STATES[chat_id]["current_page"] = page
+        
         # Calcola gli indici per la pagina corrente
         start_idx = page * items_per_page
         end_idx = start_idx + items_per_page
         
-        # Combina directories e files per la paginazione
-        all_items = []
-        for directory in directories:
-            all_items.append({"type": "dir", "name": directory})
-        for file_info in files:
-            all_items.append({"type": "file", "info": file_info})
-        
         # Prendi solo gli elementi per questa pagina
         page_items = all_items[start_idx:end_idx]
         
@@ -1967,24 +3867,21 @@ def show_download_directory_contents(query, context, path, page=None):
             ])
         
         # Aggiungi gli elementi della pagina corrente
-        for item in page_items:
-            if item["type"] == "dir":
-                directory = item["name"]
-                full_path = os.path.join(path, directory)
+        for name, is_dir, file_size in page_items:
+            if is_dir:
+                full_path = os.path.join(path, name)
                 cached_path = cache_path(full_path)
                 keyboard.append([
-                    InlineKeyboardButton(f"📂 {directory}", callback_data=f"download_dir_{cached_path}")
+                    InlineKeyboardButton(f"📂 {name}", callback_data=f"download_dir_{cached_path}")
                 ])
             else:
-                file_info = item["info"]
-                file_name = file_info["name"]
-                file_size = file_info["size"]
+                file_name = name
                 size_str = format_file_size(file_size)
                 full_path = os.path.join(path, file_name)
                 cached_path = cache_path(full_path)
                 
                 # Indica se il file è troppo grande per Telegram
-                if file_size > 50 * 1024 * 1024:  # 50MB
+                if file_size > LARGE_FILE_SIZE:
                     button_text = f"📄 {file_name} ({size_str}) ⚠️"
                 else:
                     button_text = f"📄 {file_name} ({size_str})"
@@ -2010,8 +3907,9 @@ def show_download_directory_contents(query, context, path, page=None):
             
             keyboard.append(pagination_row)
         
-        # Aggiungi pulsante di annullamento
+        # Aggiungi pulsanti per rileggere la directory e per annullare
         keyboard.append([
+            InlineKeyboardButton(get_bot_translation("bot_messages.refresh"), callback_data="download_refresh"),
             InlineKeyboardButton(get_bot_translation("bot_messages.download.cancel"), callback_data="download_cancel")
         ])
         
@@ -2022,8 +3920,9 @@ def show_download_directory_contents(query, context, path, page=None):
         message += f"{get_bot_translation('bot_messages.download.current_path')}: `{path}`\n\n"
         
         # Informazioni sul contenuto
-        message += f"{get_bot_translation('bot_messages.download.subfolders')}: {len(directories)}\n"
-        message += f"{get_bot_translation('bot_messages.download.files')}: {len(files)}\n"
+        message += f"{get_bot_translation('bot_messages.download.subfolders')}: {snapshot['directories']}\n"
+        message += f"{get_bot_translation('bot_messages.download.files')}: {snapshot['files']}\n"
+        message += f"{format_snapshot_time(snapshot)}\n"
         
         # Informazioni paginazione
         if total_pages > 1:
@@ -2036,13 +3935,13 @@ def show_download_directory_contents(query, context, path, page=None):
         message += "\n"
         
         # Aggiungi istruzioni
-        if len(files) == 0 and len(directories) == 0:
+        if snapshot["files"] == 0 and snapshot["directories"] == 0:
             message += "⚠️ Questa directory è vuota.\n\n"
-        elif len(files) == 0:
+        elif snapshot["files"] == 0:
             message += "⚠️ Nessun file scaricabile trovato in questa directory (solo cartelle).\n\n"
         
         # Conta i file troppo grandi
-        large_files = sum(1 for f in files if f["size"] > 50 * 1024 * 1024)
+        large_files = snapshot["large_files"]
         if large_files > 0:
             message += get_bot_translation("bot_messages.download.large_files_warning", count=large_files) + "\n\n"
         
@@ -2168,6 +4067,16 @@ def handle_download_page_navigation(query, context, direction):
     # Mostra il contenuto della directory con la nuova pagina
     show_download_directory_contents(query, context, current_path, new_page)
 
+def handle_download_refresh(query, context):
+    """Rilegge la directory corrente del download restando sulla stessa pagina"""
+    chat_id = query.message.chat_id
+    
+    if chat_id not in DOWNLOAD_STATES:
+        query.edit_message_text("⚠️ Sessione di download scaduta.")
+        return
+    
+    show_download_directory_contents(query, context, DOWNLOAD_STATES[chat_id]["current_path"], refresh=True)
+
 def format_file_size(size_bytes):
     """Formatta la dimensione del file in formato leggibile"""
     if size_bytes == 0:
@@ -2181,6 +4090,631 @@ def format_file_size(size_bytes):
     
     return f"{size_bytes:.1f}{size_names[i]}"
 
+def parse_docker_time(value):
+    """Converte una data dell'API Docker (RFC 3339 con nanosecondi) in timestamp
+
+    Returns:
+        float, oppure None per date assenti o nulle (0001-01-01)
+    """
+    match = re.match(r"(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(?:\.(\d+))?(Z|[+-]\d\d:\d\d)?$", value or "")
+    if not match or match.group(1).startswith("0001"):
+        return None
+    offset = match.group(3) or "Z"
+    parsed = datetime.strptime(match.group(1) + ("+00:00" if offset == "Z" else offset), "%Y-%m-%dT%H:%M:%S%z")
+    return parsed.timestamp() + float("0." + (match.group(2) or "0")[:6])
+
+def make_inventory_entry(info):
+    """Voce dell'inventario a partire dai dettagli di un container (inspect)"""
+    state = info.get("State") or {}
+    return {
+        "id": info.get("Id", ""),
+        "name": info.get("Name", "").lstrip("/"),
+        "image": (info.get("Config") or {}).get("Image", ""),
+        "project": ((info.get("Config") or {}).get("Labels") or {}).get("com.docker.compose.project"),
+        "state": state.get("Status", "unknown"),
+        "health": (state.get("Health") or {}).get("Status"),
+        "started_at": parse_docker_time(state.get("StartedAt")),
+        "restart_count": info.get("RestartCount", 0),
+        "exit_code": state.get("ExitCode"),
+        "oom_killed": state.get("OOMKilled", False)
+    }
+
+def publish_docker_inventory(containers, live):
+    """Pubblica un nuovo inventario con l'ordine di visualizzazione già calcolato
+
+    In esecuzione (o in pausa) prima, poi fermi, in ordine di nome: la lista
+    paginata di /docker legge solo la fetta della pagina richiesta.
+    """
+    global DOCKER_INVENTORY
+    
+    order = sorted(containers, key=lambda container_id: (containers[container_id]["state"] not in ("running", "paused"),
+                                                         containers[container_id]["name"]))
+    running = sum(1 for entry in containers.values() if entry["state"] in ("running", "paused"))
+    by_name = {entry["name"]: container_id for container_id, entry in containers.items()}
+    DOCKER_INVENTORY = {"containers": containers, "order": tuple(order), "by_name": by_name, "running": running,
+                        "live": live, "synced": time.time()}
+    return DOCKER_INVENTORY
+
+def sync_docker_inventory(live=False):
+    """Ricostruisce l'inventario completo (elenco più dettagli di ogni container)"""
+    containers = {}
+    for container in docker_api.list_containers(all=True):
+        try:
+            entry = make_inventory_entry(docker_api.inspect_container(container["Id"]))
+        except docker_api.DockerAPIError as e:
+            if e.status != 404:  # Rimosso tra l'elenco e i dettagli
+                raise
+            continue
+        containers[entry["id"]] = entry
+    with DOCKER_INVENTORY_LOCK:
+        if not live and DOCKER_INVENTORY["live"]:
+            # Nel frattempo si è collegato il flusso degli eventi: il suo inventario è più aggiornato
+            return DOCKER_INVENTORY
+        return publish_docker_inventory(containers, live)
+
+def send_docker_alert(entry, kind, **values):
+    """Invia un alert per un container, una sola volta per intervallo di cooldown"""
+    config = load_monitoring_config().get("docker_events", {})
+    if not config.get(DOCKER_ALERT_SETTINGS[kind], False):
+        return False
+    now = time.time()
+    key = (entry["name"], kind)
+    if now - DOCKER_ALERTS_SENT.get(key, 0) < config.get("cooldown", 300):
+        logger.debug(f"Alert {kind} per il container {entry['name']} già inviato di recente")
+        return False
+    DOCKER_ALERTS_SENT[key] = now
+    message = get_bot_translation(f"bot_messages.alert_messages.container_{kind}",
+                                  name=entry["name"], image=entry["image"],
+                                  restart_count=entry["restart_count"],
+                                  timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **values)
+    return send_telegram_message(message, priority=PRIORITY_ALERT, collapse_key=f"container_{kind}_{entry['name']}")
+
+def container_rule_value(rule, entry, rule_config, now):
+    """Valore di una regola per un container (0 quando la condizione non è presente)
+
+    unhealthy: 1 se l'health check fallisce; restarts: riavvii automatici nella
+    finestra; exited: codice di uscita di un arresto non richiesto, se il
+    container è ancora fermo dopo CONTAINER_EXIT_GRACE secondi (così un ciclo
+    di riavvii non fa alternare alert e recovery: lo segnala la regola restarts).
+    """
+    if rule == "unhealthy":
+        return 1 if entry.get("health") == "unhealthy" else 0
+    if rule == "restarts":
+        # Il deque è già limitato a CONTAINER_RESTART_HISTORY: si conta senza modificarlo
+        window_start = now - rule_config.get("window", 600)
+        with CONTAINER_RESTART_LOCK:
+            return sum(1 for restarted_at in CONTAINER_RESTART_TIMES.get(entry["id"], ()) if restarted_at >= window_start)
+    if rule == "exited":
+        exit_code, exited_at = DOCKER_EVENT_MARKS.get(entry["id"], {}).get("unexpected_exit", (0, now))
+        if entry["state"] in ("exited", "dead") and now - exited_at >= CONTAINER_EXIT_GRACE:
+            return int(exit_code)
+        return 0
+    return 0
+
+def clear_container_alerts(name):
+    """Chiude senza notifica gli alert di un container rimosso"""
+    with ALERT_LOCK:
+        for rule in CONTAINER_ALERT_RULES:
+            parameter_name = f"container_{rule}_{name}"
+            if parameter_name in REMINDER_TIMERS:
+                REMINDER_TIMERS.pop(parameter_name).cancel()
+            ALERT_STATES.pop(parameter_name, None)
+
+def evaluate_container_alerts(container_ids=None, config=None):
+    """Valuta le regole di alert sui container a partire dall'inventario in memoria
+
+    Chiamata per il singolo container a ogni evento Docker e per tutti dal loop
+    di monitoraggio (per far scadere la finestra dei riavvii): non interroga il
+    demone. Gli alert passano da check_parameter_threshold con il nome
+    container_<regola>_<nome>, quindi recovery e reminder funzionano come per
+    le soglie dell'host.
+    """
+    config = config or load_monitoring_config()
+    if not (MONITORING_ACTIVE and config.get("global_enabled", False)):
+        return
+    rules = config.get("container_alerts", {})
+    inventory = DOCKER_INVENTORY
+    now = time.time()
+    if container_ids is None:
+        container_ids = inventory["order"]
+        # Alert di container che non esistono più (rimossi mentre il flusso non era collegato)
+        with ALERT_LOCK:
+            stale = {parameter_name.split("_", 2)[2] for parameter_name in ALERT_STATES
+                     if parameter_name.startswith("container_")} - set(inventory["by_name"])
+        for name in stale:
+            clear_container_alerts(name)
+    
+    for container_id in container_ids:
+        entry = inventory["containers"].get(container_id)
+        if not entry:
+            continue
+        for rule in CONTAINER_ALERT_RULES:
+            rule_config = rules.get(rule, {})
+            if not rule_config.get("enabled", False):
+                continue
+            value = container_rule_value(rule, entry, rule_config, now)
+            # Solo la regola dei riavvii ha una soglia; per le altre basta che la condizione sia presente
+            check_parameter_threshold(f"container_{rule}_{entry['name']}", value,
+                                      rule_config if rule == "restarts" else dict(rule_config, threshold=0))
+
+def handle_docker_event(event):
+    """Aggiorna l'inventario per un evento del demone e invia gli eventuali alert"""
+    action = event.get("Action") or event.get("status") or ""
+    container_id = event.get("id") or (event.get("Actor") or {}).get("ID")
+    attributes = (event.get("Actor") or {}).get("Attributes") or {}
+    if not container_id or action.startswith(("exec_", "attach", "top", "resize", "archive-path", "export")):
+        return
+    
+    previous = DOCKER_INVENTORY["containers"].get(container_id)
+    entry = None
+    if action != "destroy":
+        try:
+            entry = make_inventory_entry(docker_api.inspect_container(container_id))
+        except docker_api.DockerAPIError as e:
+            if e.status != 404:
+                raise
+    
+    with DOCKER_INVENTORY_LOCK:
+        containers = dict(DOCKER_INVENTORY["containers"])
+        if entry:
+            containers[container_id] = entry
+        else:
+            containers.pop(container_id, None)
+            DOCKER_EVENT_MARKS.pop(container_id, None)
+        publish_docker_inventory(containers, True)
+    
+    if action == "destroy":
+        with CONTAINER_RESTART_LOCK:
+            CONTAINER_RESTART_TIMES.pop(container_id, None)
+        if previous:
+            clear_container_alerts(previous["name"])
+    elif entry and previous and entry["restart_count"] > previous["restart_count"]:
+        # Riavvio deciso dal criterio di riavvio del container (quelli manuali non incrementano RestartCount)
+        with CONTAINER_RESTART_LOCK:
+            times = CONTAINER_RESTART_TIMES.setdefault(container_id, deque(maxlen=CONTAINER_RESTART_HISTORY))
+            times.extend([time.time()] * min(entry["restart_count"] - previous["restart_count"], CONTAINER_RESTART_HISTORY))
+    
+    entry = entry or previous
+    if not entry:
+        return
+    marks = DOCKER_EVENT_MARKS.setdefault(container_id, {})
+    now = time.time()
+    if action == "start":
+        marks.pop("unexpected_exit", None)
+    if action == "kill":
+        # Arresto richiesto (docker stop/restart, bot, criterio di riavvio): il "die" successivo è atteso
+        marks["kill"] = now
+    elif action == "oom":
+        marks["oom"] = now
+        send_docker_alert(entry, "oom")
+    elif action == "die":
+        expected = any(now - marks.get(mark, 0) < DOCKER_EXPECTED_DIE_WINDOW for mark in ("kill", "oom"))
+        exit_code = attributes.get("exitCode", entry.get("exit_code"))
+        if not expected and str(exit_code) != "0":
+            marks["unexpected_exit"] = (exit_code, now)
+            send_docker_alert(entry, "died", exit_code=exit_code)
+            # Rivaluta la regola "exited" quando scade il periodo di tolleranza
+            timer = threading.Timer(CONTAINER_EXIT_GRACE + 1, evaluate_container_alerts, args=([container_id],))
+            timer.daemon = True
+            timer.start()
+    elif action.startswith("health_status"):
+        health = action.split(":", 1)[1].strip() if ":" in action else entry.get("health")
+        if health == "unhealthy" and (previous or {}).get("health") != "unhealthy":
+            marks["unhealthy_alerted"] = send_docker_alert(entry, "unhealthy")
+        elif health == "healthy" and marks.pop("unhealthy_alerted", False):
+            send_docker_alert(entry, "healthy")
+    
+    if action != "destroy":
+        evaluate_container_alerts([container_id])
+
+def docker_events_loop():
+    """Mantiene l'inventario dei container seguendo il flusso /events del demone
+
+    A ogni (ri)collegamento l'inventario viene ricostruito per intero e il flusso
+    riprende dall'istante precedente alla ricostruzione, così non si perdono eventi.
+    """
+    connected = True
+    while True:
+        since = time.time()
+        try:
+            sync_docker_inventory(live=True)
+            evaluate_container_alerts()
+            for event in docker_api.stream_events(since=since, filters={"type": ["container"]}):
+                handle_docker_event(event)
+        except Exception as e:
+            if connected:
+                logger.warning(f"Flusso degli eventi Docker interrotto: {e}")
+            connected = False
+        else:
+            connected = True
+        with DOCKER_INVENTORY_LOCK:
+            if DOCKER_INVENTORY["live"]:
+                publish_docker_inventory(DOCKER_INVENTORY["containers"], False)
+        time.sleep(DOCKER_EVENTS_RETRY_INTERVAL)
+
+def ensure_docker_inventory():
+    """Avvia i thread dell'inventario e delle statistiche dei container se non sono già in esecuzione"""
+    global DOCKER_EVENTS_THREAD, DOCKER_STATS_THREAD
+    
+    with DOCKER_INVENTORY_LOCK:
+        if not (DOCKER_EVENTS_THREAD and DOCKER_EVENTS_THREAD.is_alive()):
+            DOCKER_EVENTS_THREAD = threading.Thread(target=docker_events_loop, daemon=True)
+            DOCKER_EVENTS_THREAD.start()
+        if not (DOCKER_STATS_THREAD and DOCKER_STATS_THREAD.is_alive()):
+            DOCKER_STATS_THREAD = threading.Thread(target=docker_stats_loop, daemon=True)
+            DOCKER_STATS_THREAD.start()
+
+def new_container_stats_history():
+    """Buffer circolare delle statistiche di un container
+
+    Ogni campo è un array di double a dimensione fissa (DOCKER_STATS_SLOTS
+    posizioni, NaN se il valore manca): la memoria per container è costante,
+    qualche KB, indipendentemente da quanto a lungo viene seguito.
+    """
+    return {
+        "rings": {field: array('d', [math.nan]) * DOCKER_STATS_SLOTS for field in DOCKER_STATS_FIELDS},
+        "next": 0,  # Prossima posizione da scrivere
+        "count": 0,  # Posizioni valide
+        "current": None,  # Valori dell'ultimo campione
+        "last": None,  # Contatori dell'ultimo campione (per le velocità attuali)
+        "slot": None,  # Contatori all'inizio della posizione in corso
+        "accumulator": [0.0, 0, 0.0, 0]  # Somma e numero di campioni di CPU e memoria nella posizione in corso
+    }
+
+def stats_counters(sample, now):
+    """Contatori cumulativi di un campione: (tempo, rete ricevuti, inviati, disco letti, scritti)"""
+    network = docker_api.network_bytes(sample) or (math.nan, math.nan)
+    block_io = docker_api.block_io_bytes(sample) or (math.nan, math.nan)
+    return (now,) + tuple(network) + tuple(block_io)
+
+def counter_rates(current, previous):
+    """Velocità (byte/s) tra due tuple di contatori; NaN se mancano o il contatore è ripartito"""
+    elapsed = current[0] - previous[0]
+    if elapsed <= 0:
+        return (math.nan,) * (len(current) - 1)
+    return tuple((new - old) / elapsed if new >= old else math.nan for new, old in zip(current[1:], previous[1:]))
+
+def record_container_stats(container_id, sample):
+    """Registra un campione del flusso: valori attuali e, ogni DOCKER_STATS_SLOT_INTERVAL, una posizione dello storico"""
+    now = time.time()
+    cpu = docker_api.calculate_cpu_percent(sample)
+    memory = docker_api.calculate_memory_usage(sample)
+    counters = stats_counters(sample, now)
+    
+    with DOCKER_STATS_LOCK:
+        history = DOCKER_STATS_HISTORY.get(container_id)
+        if history is None:
+            history = DOCKER_STATS_HISTORY[container_id] = new_container_stats_history()
+        rates = counter_rates(counters, history["last"]) if history["last"] else (math.nan,) * 4
+        history["current"] = {"time": now, "cpu": cpu, "memory": memory, "rates": rates}
+        history["last"] = counters
+        
+        accumulator = history["accumulator"]
+        if cpu is not None:
+            accumulator[0] += cpu
+            accumulator[1] += 1
+        if memory:
+            accumulator[2] += memory[0]
+            accumulator[3] += 1
+        if history["slot"] is None:
+            history["slot"] = counters
+        elif now - history["slot"][0] >= DOCKER_STATS_SLOT_INTERVAL:
+            values = (now,
+                      accumulator[0] / accumulator[1] if accumulator[1] else math.nan,
+                      accumulator[2] / accumulator[3] if accumulator[3] else math.nan,
+                      memory[1] if memory else math.nan) + counter_rates(counters, history["slot"])
+            position = history["next"]
+            for field, value in zip(DOCKER_STATS_FIELDS, values):
+                history["rings"][field][position] = value
+            history["next"] = (position + 1) % DOCKER_STATS_SLOTS
+            history["count"] = min(history["count"] + 1, DOCKER_STATS_SLOTS)
+            history["slot"] = counters
+            history["accumulator"] = [0.0, 0, 0.0, 0]
+
+def summarize_container_stats(history):
+    """Minimo, media e massimo di ogni campo dello storico
+
+    Returns:
+        dict: campo -> (min, media, max), più "span" con i secondi coperti
+    """
+    summary = {"span": history["count"] * DOCKER_STATS_SLOT_INTERVAL}
+    for field in DOCKER_STATS_FIELDS[1:]:
+        values = [value for value in history["rings"][field] if not math.isnan(value)]
+        summary[field] = (min(values), sum(values) / len(values), max(values)) if values else None
+    return summary
+
+def docker_stats_loop():
+    """Segue i flussi delle statistiche di tutti i container in esecuzione con un solo thread
+
+    A ogni giro i flussi vengono allineati all'inventario: aperti per i container
+    avviati, chiusi per quelli fermati; lo storico e le attese di riapertura
+    dei container rimossi vengono eliminati.
+    """
+    selector = selectors.DefaultSelector()
+    streams = {}  # id container -> (socket, stato del parser)
+    retry_after = {}  # id container -> (istante dopo cui riaprire il flusso, started_at del container all'errore)
+    
+    def close_stream(container_id):
+        sock, _ = streams.pop(container_id)
+        selector.unregister(sock)
+        sock.close()
+    
+    while True:
+        try:
+            inventory = DOCKER_INVENTORY
+            running = {container_id for container_id, entry in inventory["containers"].items()
+                       if entry["state"] == "running"}
+            for container_id in set(streams) - running:
+                close_stream(container_id)
+            known = set(inventory["containers"])
+            with DOCKER_STATS_LOCK:
+                for container_id in set(DOCKER_STATS_HISTORY) - known:
+                    del DOCKER_STATS_HISTORY[container_id]
+            # Anche le attese di riapertura dei container rimossi vanno eliminate
+            for container_id in set(retry_after) - known:
+                del retry_after[container_id]
+            now = time.time()
+            # Un container riavviato dopo l'errore (started_at diverso) non attende la fine dell'intervallo
+            pending = [container_id for container_id in running - set(streams)
+                       if now >= retry_after.get(container_id, (0, None))[0]
+                       or retry_after[container_id][1] != inventory["containers"][container_id]["started_at"]]
+            for container_id in pending[:DOCKER_STATS_OPEN_BATCH]:
+                retry_after.pop(container_id, None)
+                try:
+                    sock, state = docker_api.open_stats_stream(container_id)
+                except docker_api.DockerAPIError as e:
+                    logger.debug(f"Flusso statistiche non disponibile per {container_id[:12]}: {e}")
+                    retry_after[container_id] = (now + DOCKER_STATS_RETRY_INTERVAL,
+                                                 inventory["containers"][container_id]["started_at"])
+                    continue
+                streams[container_id] = (sock, state)
+                selector.register(sock, selectors.EVENT_READ, container_id)
+            
+            if not streams:
+                time.sleep(1)
+                continue
+            for key, _ in selector.select(timeout=1):
+                container_id = key.data
+                sock, state = streams[container_id]
+                try:
+                    for sample in docker_api.feed_stream(state, sock.recv(65536)):
+                        record_container_stats(container_id, sample)
+                except BlockingIOError:
+                    continue
+                except (docker_api.DockerAPIError, OSError, ValueError) as e:
+                    # Anche un container appena fermato chiude il flusso: si riapre solo se è ancora in esecuzione
+                    logger.debug(f"Flusso statistiche chiuso per {container_id[:12]}: {e}")
+                    close_stream(container_id)
+                    entry = DOCKER_INVENTORY["containers"].get(container_id) or {}
+                    retry_after[container_id] = (time.time() + DOCKER_STATS_RETRY_INTERVAL, entry.get("started_at"))
+        except Exception as e:
+            logger.error(f"Errore nel ciclo delle statistiche dei container: {e}")
+            time.sleep(DOCKER_STATS_RETRY_INTERVAL)
+
+def get_docker_inventory():
+    """Restituisce l'inventario dei container
+
+    Se il flusso degli eventi non è collegato l'inventario potrebbe non essere
+    aggiornato: in quel caso viene ricostruito subito (DockerAPIError se il
+    demone non è raggiungibile).
+    """
+    ensure_docker_inventory()
+    inventory = DOCKER_INVENTORY
+    if inventory["live"]:
+        return inventory
+    return sync_docker_inventory(live=False)
+
+def format_container_uptime(started_at):
+    """Uptime compatto per i pulsanti della lista (es. 3d 4h, 5h 12m, 40s)"""
+    seconds = max(0, int(time.time() - started_at))
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if days:
+        return f"{days}d {hours}h"
+    if hours:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m" if minutes else f"{seconds}s"
+
+def get_container_stats(container_name):
+    """Statistiche attuali di un container, con lo storico recente se disponibile
+
+    I valori vengono dal flusso seguito in background (nessuna attesa). Se il
+    flusso non è ancora attivo si leggono due campioni one-shot: l'ultimo letto
+    per lo stesso container se è recente, altrimenti due a distanza di
+    DOCKER_STATS_SAMPLE_GAP.
+
+    Returns:
+        dict: {"cpu", "memory", "rates", "history"} (rates: rete ricevuti/inviati,
+        disco letti/scritti in byte/s; history: vedi summarize_container_stats),
+        oppure None
+    """
+    ensure_docker_inventory()
+    container_id = DOCKER_INVENTORY["by_name"].get(container_name)
+    with DOCKER_STATS_LOCK:
+        history = DOCKER_STATS_HISTORY.get(container_id) if container_id else None
+        if history and history["current"] and time.time() - history["current"]["time"] < DOCKER_STATS_MAX_AGE:
+            return dict(history["current"], history=summarize_container_stats(history) if history["count"] else None)
+    
+    previous = DOCKER_STATS_PREVIOUS.get(container_name)
+    if not previous or time.monotonic() - previous[0] > 60:
+        previous = (time.monotonic(), docker_api.container_stats(container_name))
+        time.sleep(DOCKER_STATS_SAMPLE_GAP)
+    stats = docker_api.container_stats(container_name)
+    DOCKER_STATS_PREVIOUS[container_name] = (time.monotonic(), stats)
+    
+    cpu_percent = docker_api.calculate_cpu_percent(stats, previous[1])
+    memory = docker_api.calculate_memory_usage(stats)
+    if cpu_percent is None and memory is None:
+        return None
+    rates = counter_rates(stats_counters(stats, DOCKER_STATS_PREVIOUS[container_name][0]),
+                          stats_counters(previous[1], previous[0]))
+    return {"cpu": cpu_percent, "memory": memory, "rates": rates, "history": None}
+
+def format_stats_range(summary, formatter):
+    """Minimo, media e massimo di un campo dello storico in una riga"""
+    low, average, high = summary
+    return get_bot_translation("bot_messages.docker_details.history_range",
+                               min=formatter(low), avg=formatter(average), max=formatter(high))
+
+def parse_logs_arguments(args):
+    """Interpreta gli argomenti di /logs <container> [righe|intervallo] [regex]
+
+    Returns:
+        tuple: (container, tail, since, pattern); tail e since sono None se non indicati
+    """
+    name, rest = args[0], list(args[1:])
+    tail = since = None
+    if rest and rest[0].isdigit():
+        tail = int(rest.pop(0))
+    elif rest:
+        match = re.fullmatch(r"(\d+)([mhd])", rest[0].lower())
+        if match:
+            since = time.time() - int(match.group(1)) * GRAPH_RANGE_UNITS[match.group(2)]
+            rest.pop(0)
+    pattern = " ".join(rest) or None
+    if tail is None and since is None:
+        tail = CONTAINER_LOGS_DEFAULT_LINES
+    return name, tail, since, pattern
+
+def collect_container_logs(name, tail=None, since=None, regex=None):
+    """Legge i log di un container tenendo in memoria al più CONTAINER_LOGS_MAX_PAGES messaggi
+
+    Le righe che corrispondono al filtro restano in memoria finché stanno nei
+    messaggi previsti; alla prima che non ci sta vengono riversate in un file
+    .gz temporaneo e le successive scritte direttamente lì, fino a
+    CONTAINER_LOGS_MAX_BYTES byte non compressi.
+
+    Returns:
+        dict: {"lines": righe da inviare come messaggi (vuota se c'è il file),
+        "archive": file temporaneo .gz già riavvolto oppure None, "scanned",
+        "matched", "truncated"}
+    """
+    info = docker_api.inspect_container(name)
+    tty = (info.get("Config") or {}).get("Tty", False)
+    lines = []
+    chars = 0
+    archive = compressor = None
+    archive_bytes = 0
+    scanned = matched = 0
+    truncated = False
+    
+    logs = docker_api.container_logs(info["Id"], tail=tail, since=since, tty=tty)
+    try:
+        for _, line in logs:
+            scanned += 1
+            if regex and not regex.search(line):
+                continue
+            matched += 1
+            if compressor is None:
+                lines.append(line)
+                chars += len(line) + 1
+                if chars <= CONTAINER_LOGS_PAGE_CHARS * CONTAINER_LOGS_MAX_PAGES:
+                    continue
+                archive = tempfile.TemporaryFile()
+                compressor = gzip.GzipFile(fileobj=archive, mode="wb")
+                pending, lines = lines, []
+            else:
+                pending = [line]
+            data = "".join(f"{text}\n" for text in pending).encode()
+            compressor.write(data)
+            archive_bytes += len(data)
+            if archive_bytes >= CONTAINER_LOGS_MAX_BYTES:
+                truncated = True
+                break
+    finally:
+        logs.close()
+    
+    if compressor is not None:
+        compressor.close()
+        archive.seek(0)
+    return {"lines": lines, "archive": archive, "scanned": scanned, "matched": matched, "truncated": truncated}
+
+def paginate_log_lines(lines):
+    """Divide le righe in messaggi HTML <pre> da al più CONTAINER_LOGS_PAGE_CHARS caratteri"""
+    pages = []
+    current = []
+    size = 0
+    for line in lines:
+        escaped = html.escape(line[:CONTAINER_LOGS_PAGE_CHARS])
+        if current and size + len(escaped) + 1 > CONTAINER_LOGS_PAGE_CHARS:
+            pages.append(current)
+            current, size = [], 0
+        current.append(escaped)
+        size += len(escaped) + 1
+    if current:
+        pages.append(current)
+    return ["<pre>" + "\n".join(page) + "</pre>" for page in pages]
+
+def send_container_logs(bot, chat_id, name, tail=None, since=None, pattern=None, range_text=None):
+    """Invia i log di un container come messaggi o, se sono molti, come file .gz"""
+    if tail is not None:
+        selection = get_bot_translation("bot_messages.container_logs.last_lines", lines=tail)
+    else:
+        selection = get_bot_translation("bot_messages.container_logs.since", range=range_text)
+    try:
+        regex = re.compile(pattern) if pattern else None
+    except re.error as e:
+        bot.send_message(chat_id=chat_id, text=get_bot_translation("bot_messages.container_logs.invalid_regex", error=e))
+        return
+    
+    try:
+        started = time.monotonic()
+        result = collect_container_logs(name, tail, since, regex)
+        logger.debug(f"Log di {name}: {result['matched']}/{result['scanned']} righe in {time.monotonic() - started:.2f}s")
+    except docker_api.DockerAPIError as e:
+        key = "not_found" if e.status == 404 else "error"
+        bot.send_message(chat_id=chat_id, text=get_bot_translation(f"bot_messages.container_logs.{key}", name=name, error=e))
+        return
+    
+    if not result["matched"]:
+        bot.send_message(chat_id=chat_id, text=get_bot_translation("bot_messages.container_logs.empty", name=name, selection=selection))
+        return
+    if pattern:
+        header = get_bot_translation("bot_messages.container_logs.header_filtered", name=name, selection=selection,
+                                     pattern=pattern, matched=result["matched"], scanned=result["scanned"])
+    else:
+        header = get_bot_translation("bot_messages.container_logs.header", name=name, selection=selection,
+                                     matched=result["matched"])
+    
+    archive = result["archive"]
+    pages = paginate_log_lines(result["lines"]) if archive is None else []
+    if archive is None and len(pages) > CONTAINER_LOGS_MAX_PAGES:
+        # L'escape HTML ha allungato il testo oltre i messaggi previsti
+        archive = tempfile.TemporaryFile()
+        with gzip.GzipFile(fileobj=archive, mode="wb") as compressor:
+            compressor.write("".join(f"{line}\n" for line in result["lines"]).encode())
+        archive.seek(0)
+    
+    if archive is None:
+        bot.send_message(chat_id=chat_id, text=header)
+        for page in pages:
+            bot.send_message(chat_id=chat_id, text=page, parse_mode="HTML")
+        return
+    
+    with archive:
+        caption = header
+        if result["truncated"]:
+            caption += "\n" + get_bot_translation("bot_messages.container_logs.truncated",
+                                                  size=format_file_size(CONTAINER_LOGS_MAX_BYTES))
+        bot.send_document(chat_id=chat_id, document=archive,
+                          filename=f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.log.gz", caption=caption)
+
+def command_logs(update, context):
+    """Handler per il comando /logs <container> [righe|intervallo] [regex]"""
+    args = context.args or []
+    if not args:
+        update.message.reply_text(get_bot_translation("bot_messages.container_logs.usage",
+                                                      lines=CONTAINER_LOGS_DEFAULT_LINES), parse_mode="Markdown")
+        return
+    name, tail, since, pattern = parse_logs_arguments(args)
+    if tail is not None and not 0 < tail <= CONTAINER_LOGS_MAX_LINES:
+        update.message.reply_text(get_bot_translation("bot_messages.container_logs.invalid_lines",
+                                                      max=CONTAINER_LOGS_MAX_LINES))
+        return
+    send_container_logs(context.bot, update.effective_chat.id, name, tail, since, pattern,
+                        range_text=args[1] if since is not None else None)
+
 def handle_docker_callback(query, context, callback_data):
     """Gestisce i callback relativi ai comandi Docker"""
     try:
@@ -2206,16 +4740,13 @@ def handle_docker_callback(query, context, callback_data):
         
         if action == "inspect":
             # Mostra informazioni dettagliate sul container
-            result = subprocess.run(['docker', 'inspect', container_name], capture_output=True, text=True)
-            
-            if result.returncode != 0:
+            try:
+                container_info = docker_api.inspect_container(container_name)
+            except docker_api.DockerAPIError as e:
                 error_msg = get_bot_translation("bot_messages.docker_details.error_inspect")
-                query.edit_message_text(f"{error_msg} {container_name}:\n{result.stderr}")
+                query.edit_message_text(f"{error_msg} {container_name}:\n{e}")
                 return
             
-            # Analizziamo i dati JSON per estrarre le informazioni principali
-            container_info = json.loads(result.stdout)[0]
-            
             # Estrai informazioni utili
             state = container_info.get('State', {})
             config = container_info.get('Config', {})
@@ -2287,25 +4818,34 @@ def handle_docker_callback(query, context, callback_data):
             
             # Aggiungi informazioni su CPU e memoria
             try:
-                # Ottieni stats del container
-                stats_cmd = ['docker', 'stats', '--no-stream', '--format', '{{.CPUPerc}}|{{.MemUsage}}|{{.MemPerc}}', container_name]
-                stats_result = subprocess.run(stats_cmd, capture_output=True, text=True)
-                
-                if stats_result.returncode == 0 and stats_result.stdout.strip():
-                    # Formato: CPUPerc|MemUsage|MemPerc
-                    stats = stats_result.stdout.strip().split('|')
-                    if len(stats) >= 3:
-                        cpu_usage = stats[0].strip()
-                        mem_usage = stats[1].strip()
-                        mem_perc = stats[2].strip()
-                        
-                        resources_label = get_bot_translation("bot_messages.docker_details.resources")
-                        cpu_label = get_bot_translation("bot_messages.docker_details.cpu")
-                        memory_label = get_bot_translation("bot_messages.docker_details.memory")
-                        message += f"\n{resources_label}\n"
-                        message += f"{'_'*20}\n"
-                        message += f"{cpu_label}: {cpu_usage}\n"
-                        message += f"{memory_label}: {mem_usage} ({mem_perc})\n"
+                stats = get_container_stats(container_name) if running else None
+                if stats:
+                    history = stats["history"]
+                    resources_label = get_bot_translation("bot_messages.docker_details.resources")
+                    cpu_label = get_bot_translation("bot_messages.docker_details.cpu")
+                    memory_label = get_bot_translation("bot_messages.docker_details.memory")
+                    message += f"\n{resources_label}\n"
+                    message += f"{'_'*20}\n"
+                    cpu_text = f"{stats['cpu']:.2f}%" if stats["cpu"] is not None else "-"
+                    message += f"{cpu_label}: {cpu_text}\n"
+                    if history and history["cpu"]:
+                        message += format_stats_range(history["cpu"], lambda value: f"{value:.1f}%") + "\n"
+                    if stats["memory"]:
+                        used, limit, percent = stats["memory"]
+                        message += f"{memory_label}: {format_size(used)} / {format_size(limit)} ({percent:.2f}%)\n"
+                        if history and history["memory"]:
+                            message += format_stats_range(history["memory"], lambda value: format_size(int(value))) + "\n"
+                    
+                    rx, tx, read, write = stats["rates"]
+                    if not math.isnan(rx):
+                        network_label = get_bot_translation("bot_messages.docker_details.network")
+                        message += f"{network_label}: ↓ {format_size(int(rx))}/s ↑ {format_size(int(tx))}/s\n"
+                    if not math.isnan(read):
+                        block_io_label = get_bot_translation("bot_messages.docker_details.block_io")
+                        message += f"{block_io_label}: R {format_size(int(read))}/s W {format_size(int(write))}/s\n"
+                    if history:
+                        message += get_bot_translation("bot_messages.docker_details.history_span",
+                                                       minutes=max(1, history["span"] // 60)) + "\n"
             except Exception as e:
                 logger.error(f"Errore nel recupero delle statistiche del container: {str(e)}")
             
@@ -2368,6 +4908,9 @@ def handle_docker_callback(query, context, callback_data):
                     InlineKeyboardButton(start_label, callback_data=f"docker_start_{container_name}")
                 ])
             
+            keyboard.append([InlineKeyboardButton(get_bot_translation("bot_messages.container_logs.button"),
+                                                  callback_data=f"dockerlogs_{container_name}")])
+            
             # Aggiungi pulsante per tornare alla lista
             back_label = get_bot_translation("bot_messages.back_to_list")
             keyboard.append([InlineKeyboardButton(back_label, callback_data="docker_list")])
@@ -2404,10 +4947,14 @@ def handle_docker_callback(query, context, callback_data):
             query.edit_message_text(f"⏳ Esecuzione comando '{action}' sul container {container_name}...")
             
             # Esegui il comando
-            result = subprocess.run(['docker', action, container_name], capture_output=True, text=True)
+            try:
+                docker_api.container_action(container_name, action)
+                action_error = None
+            except docker_api.DockerAPIError as e:
+                action_error = str(e)
             
             # Verifica il risultato
-            if result.returncode == 0:
+            if action_error is None:
                 # Formatta il messaggio di stato
                 action_past = {
                     "start": "avviato",
@@ -2428,7 +4975,7 @@ def handle_docker_callback(query, context, callback_data):
                 query.edit_message_text(text=success_message, reply_markup=reply_markup)
             else:
                 # Mostra l'errore
-                error_message = f"⚠️ Errore durante l'esecuzione del comando '{action}' sul container {container_name}:\n{result.stderr}"
+                error_message = f"⚠️ Errore durante l'esecuzione del comando '{action}' sul container {container_name}:\n{action_error}"
                 
                 # Aggiungi pulsanti per navigare
                 keyboard = [
@@ -2443,6 +4990,246 @@ def handle_docker_callback(query, context, callback_data):
         logger.error(f"Errore nella gestione del callback Docker: {e}")
         query.edit_message_text(f"Errore durante l'esecuzione del comando Docker: {str(e)}")
 
+def get_docker_projects(inventory):
+    """Container raggruppati per progetto compose, nell'ordine della lista
+
+    Returns:
+        dict: nome progetto -> lista di id (solo container con l'etichetta)
+    """
+    projects = {}
+    for container_id in inventory["order"]:
+        project = inventory["containers"][container_id].get("project")
+        if project:
+            projects.setdefault(project, []).append(container_id)
+    return dict(sorted(projects.items()))
+
+def docker_project_token(project):
+    """Identificativo breve di un progetto per i callback (limite di 64 byte)"""
+    return hashlib.sha1(project.encode()).hexdigest()[:8]
+
+def build_docker_bulk_menu(chat_id, notice=None):
+    """Messaggio e tastiera della selezione multipla dei container
+
+    In alto i progetti compose (un tocco seleziona o deseleziona tutti i loro
+    container), poi la pagina corrente dei container e le azioni disponibili.
+    """
+    inventory = get_docker_inventory()
+    state = DOCKER_BULK_STATES.setdefault(chat_id, {"selected": set(), "page": 0})
+    # I container rimossi nel frattempo escono dalla selezione
+    state["selected"] &= set(inventory["containers"])
+    selected = state["selected"]
+    order = inventory["order"]
+    
+    keyboard = []
+    project_buttons = []
+    for project, container_ids in get_docker_projects(inventory).items():
+        marker = "☑️" if selected.issuperset(container_ids) else "📦"
+        project_buttons.append(InlineKeyboardButton(f"{marker} {project} ({len(container_ids)})",
+                                                    callback_data=f"dockerbulk_project_{docker_project_token(project)}"))
+    for index in range(0, len(project_buttons), 2):
+        keyboard.append(project_buttons[index:index + 2])
+    
+    containers_per_page = 10
+    total_pages = max(1, (len(order) + containers_per_page - 1) // containers_per_page)
+    page = state["page"] = max(0, min(state["page"], total_pages - 1))
+    for container_id in order[page * containers_per_page:(page + 1) * containers_per_page]:
+        container = inventory["containers"][container_id]
+        marker = "☑️" if container_id in selected else "⬜"
+        status = "🟢" if container["state"] in ("running", "paused") else "🔴"
+        keyboard.append([InlineKeyboardButton(f"{marker} {status} {container['name']}",
+                                              callback_data=f"dockerbulk_toggle_{container_id[:12]}")])
+    
+    if total_pages > 1:
+        nav_buttons = []
+        if page > 0:
+            nav_buttons.append(InlineKeyboardButton(get_bot_translation("bot_messages.previous"),
+                                                    callback_data=f"dockerbulk_page_{page-1}"))
+        nav_buttons.append(InlineKeyboardButton(f"{page+1}/{total_pages}", callback_data="dockerbulk_page_info"))
+        if page < total_pages - 1:
+            nav_buttons.append(InlineKeyboardButton(get_bot_translation("bot_messages.next"),
+                                                    callback_data=f"dockerbulk_page_{page+1}"))
+        keyboard.append(nav_buttons)
+    
+    keyboard.append([
+        InlineKeyboardButton(get_bot_translation("bot_messages.docker_bulk.select_all"), callback_data="dockerbulk_all"),
+        InlineKeyboardButton(get_bot_translation("bot_messages.docker_bulk.select_none"), callback_data="dockerbulk_none")
+    ])
+    action_buttons = [InlineKeyboardButton(get_bot_translation(f"bot_messages.docker_details.actions.{action}"),
+                                           callback_data=f"dockerbulk_run_{action}")
+                      for action in DOCKER_BULK_ACTIONS]
+    keyboard.append(action_buttons[:2])
+    keyboard.append(action_buttons[2:])
+    keyboard.append([InlineKeyboardButton(get_bot_translation("bot_messages.back_to_container_list"), callback_data="docker_list")])
+    
+    message = get_bot_translation("bot_messages.docker_bulk.title", selected=len(selected), total=len(order))
+    message += "\n" + get_bot_translation("bot_messages.docker_bulk.hint")
+    if notice:
+        message += "\n\n" + notice
+    return message, InlineKeyboardMarkup(keyboard)
+
+def open_docker_bulk_selection(update, chat_id, pattern):
+    """Apre la selezione multipla con i container il cui nome corrisponde al pattern
+
+    Il pattern accetta i caratteri jolly della shell (web-*, db?); senza
+    caratteri jolly seleziona i nomi che lo contengono.
+    """
+    inventory = get_docker_inventory()
+    if not any(char in pattern for char in "*?["):
+        pattern = f"*{pattern}*"
+    matching = {container_id for container_id, container in inventory["containers"].items()
+                if fnmatch.fnmatchcase(container["name"], pattern)}
+    if not matching:
+        update.message.reply_text(get_bot_translation("bot_messages.docker_bulk.no_match", pattern=pattern))
+        return
+    DOCKER_BULK_STATES[chat_id] = {"selected": matching, "page": 0}
+    message, reply_markup = build_docker_bulk_menu(chat_id)
+    update.message.reply_text(text=message, reply_markup=reply_markup)
+
+def format_docker_bulk_progress(action, containers, results, active, elapsed=None):
+    """Testo del messaggio di avanzamento di un'azione in blocco
+
+    Args:
+        containers: lista di (id, nome) su cui si agisce
+        results: id -> None (riuscita) o messaggio di errore, per i container completati
+        active: nomi dei container su cui l'azione è in corso
+        elapsed: secondi impiegati, solo a operazione conclusa
+    """
+    failed = [(name, results[container_id]) for container_id, name in containers
+              if results.get(container_id) is not None]
+    label = get_bot_translation(f"bot_messages.docker_details.actions.{action}")
+    lines = [get_bot_translation("bot_messages.docker_bulk.progress", action=label, done=len(results), total=len(containers)),
+             get_bot_translation("bot_messages.docker_bulk.counts", ok=len(results) - len(failed), failed=len(failed),
+                                 pending=len(containers) - len(results))]
+    if active:
+        lines.append(get_bot_translation("bot_messages.docker_bulk.in_progress", names=", ".join(sorted(active))))
+    if failed:
+        lines.append("")
+        lines.append(get_bot_translation("bot_messages.docker_bulk.errors"))
+        for name, error in failed[:DOCKER_BULK_MAX_ERRORS_SHOWN]:
+            lines.append(f"❌ {name}: {error[:200]}")
+        if len(failed) > DOCKER_BULK_MAX_ERRORS_SHOWN:
+            lines.append(get_bot_translation("bot_messages.docker_bulk.more_errors",
+                                             count=len(failed) - DOCKER_BULK_MAX_ERRORS_SHOWN))
+    if elapsed is not None:
+        lines.append("")
+        lines.append(get_bot_translation("bot_messages.docker_bulk.finished", seconds=f"{elapsed:.1f}"))
+    return "\n".join(lines)
+
+def run_docker_bulk_action(bot, chat_id, message_id, action, containers):
+    """Esegue un'azione su più container in parallelo aggiornando un solo messaggio
+
+    Al massimo docker_bulk.parallelism container alla volta; il messaggio di
+    avanzamento viene modificato al più ogni DOCKER_BULK_PROGRESS_INTERVAL
+    secondi (le modifiche contano nei limiti di Telegram) e un'ultima volta
+    con il riepilogo.
+    """
+    parallelism = load_monitoring_config().get("docker_bulk", {}).get("parallelism", 4)
+    parallelism = max(1, min(int(parallelism), DOCKER_BULK_MAX_PARALLELISM))
+    results = {}
+    active = set()
+    lock = threading.Lock()
+    
+    def apply(container_id, name):
+        with lock:
+            active.add(name)
+        try:
+            docker_api.container_action(container_id, action)
+            error = None
+        except Exception as e:
+            error = str(e)
+        with lock:
+            active.discard(name)
+            results[container_id] = error
+    
+    def edit(text, reply_markup=None):
+        try:
+            bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=text, reply_markup=reply_markup)
+        except Exception as e:
+            logger.warning(f"Impossibile aggiornare l'avanzamento dell'azione in blocco: {e}")
+    
+    started = time.monotonic()
+    last_text = None
+    with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="docker-bulk") as executor:
+        futures = [executor.submit(apply, container_id, name) for container_id, name in containers]
+        while True:
+            # Attende fino all'intervallo successivo (o alla fine, se arriva prima)
+            _, pending = wait_futures(futures, timeout=DOCKER_BULK_PROGRESS_INTERVAL)
+            if not pending:
+                break
+            with lock:
+                text = format_docker_bulk_progress(action, containers, dict(results), set(active))
+            if text != last_text:
+                edit(text)
+                last_text = text
+    
+    elapsed = time.monotonic() - started
+    failed = sum(1 for error in results.values() if error is not None)
+    logger.info(f"Azione in blocco '{action}' su {len(containers)} container: {failed} errori in {elapsed:.1f}s")
+    keyboard = [
+        [InlineKeyboardButton(get_bot_translation("bot_messages.back_to_container_list"), callback_data="docker_list")],
+        [InlineKeyboardButton(get_bot_translation("bot_messages.back_to_resources"), callback_data="back_to_resources")]
+    ]
+    edit(format_docker_bulk_progress(action, containers, results, set(), elapsed), InlineKeyboardMarkup(keyboard))
+
+def handle_docker_bulk_callback(query, context, callback_data):
+    """Gestisce i callback della selezione multipla dei container (dockerbulk_*)"""
+    chat_id = query.message.chat_id
+    command = callback_data[len("dockerbulk_"):]
+    try:
+        if command == "open":
+            DOCKER_BULK_STATES[chat_id] = {"selected": set(), "page": 0}
+        elif command == "page_info":
+            return
+        
+        inventory = get_docker_inventory()
+        state = DOCKER_BULK_STATES.setdefault(chat_id, {"selected": set(), "page": 0})
+        selected = state["selected"]
+        notice = None
+        
+        if command.startswith("page_"):
+            try:
+                state["page"] = int(command[len("page_"):])
+            except ValueError:
+                state["page"] = 0
+        elif command.startswith("toggle_"):
+            prefix = command[len("toggle_"):]
+            for container_id in inventory["containers"]:
+                if container_id.startswith(prefix):
+                    selected.symmetric_difference_update({container_id})
+                    break
+        elif command.startswith("project_"):
+            token = command[len("project_"):]
+            for project, container_ids in get_docker_projects(inventory).items():
+                if docker_project_token(project) == token:
+                    if selected.issuperset(container_ids):
+                        selected.difference_update(container_ids)
+                    else:
+                        selected.update(container_ids)
+                    break
+        elif command == "all":
+            selected.update(inventory["containers"])
+        elif command == "none":
+            selected.clear()
+        elif command.startswith("run_"):
+            action = command[len("run_"):]
+            containers = [(container_id, inventory["containers"][container_id]["name"])
+                          for container_id in inventory["order"] if container_id in selected]
+            if action in DOCKER_BULK_ACTIONS and containers:
+                DOCKER_BULK_STATES.pop(chat_id, None)
+                query.edit_message_text(format_docker_bulk_progress(action, containers, {}, set()))
+                # L'azione prosegue in background: la coda della chat resta libera
+                threading.Thread(target=run_docker_bulk_action,
+                                 args=(context.bot, chat_id, query.message.message_id, action, containers),
+                                 daemon=True).start()
+                return
+            notice = get_bot_translation("bot_messages.docker_bulk.nothing_selected")
+        
+        message, reply_markup = build_docker_bulk_menu(chat_id, notice)
+        query.edit_message_text(text=message, reply_markup=reply_markup)
+    except Exception as e:
+        logger.error(f"Errore nella selezione multipla dei container: {e}")
+        query.edit_message_text(f"Errore durante l'esecuzione del comando Docker: {str(e)}")
+
 def handle_reboot(query, context):
     """Gestisce il riavvio del server"""
     try:
@@ -2494,6 +5281,8 @@ def handle_browse_directory(query, context):
         current_path = UPLOAD_STATES[chat_id].get("current_path")
         if current_path and current_path != path:
             UPLOAD_STATES[chat_id]["parent_paths"].append(current_path)
+        if current_path != path:
+            UPLOAD_STATES[chat_id]["current_page"] = 0  # Nuova directory: si riparte dalla prima pagina
         
         UPLOAD_STATES[chat_id]["current_path"] = path
     else:
@@ -2502,7 +5291,8 @@ def handle_browse_directory(query, context):
             "state": "selecting_directory",
             "dir": None,
             "current_path": path,
-            "parent_paths": []
+            "parent_paths": [],
+            "current_page": 0
         }
     
     try:
@@ -2511,44 +5301,31 @@ def handle_browse_directory(query, context):
             query.edit_message_text(get_bot_translation("bot_messages.upload.path_not_found", path=path))
             return
         
-        # Elenca i file e le directory nel percorso
-        items = os.listdir(path)
-        
-        # Filtra e ordina gli elementi
-        directories = []
-        files = []
-        
-        for item in items:
-            item_path = os.path.join(path, item)
-            try:
-                if os.path.isdir(item_path):
-                    directories.append(item)
-                else:
-                    files.append(item)
-            except:
-                pass  # Ignora gli errori di accesso ai file
-        
-        # Ordina alfabeticamente
-        directories.sort()
-        files.sort()
+        # Indice ordinato della directory (le cartelle sono in testa): si legge solo la pagina richiesta
+        index = get_directory_index(path)
+        total_pages = max(1, (index["directories"] + DIRECTORY_PAGE_SIZE - 1) // DIRECTORY_PAGE_SIZE)
+        page = max(0, min(UPLOAD_STATES[chat_id].get("current_page", 0), total_pages - 1))
+        UPLOAD_STATES[chat_id]["current_page"] = page
+        start_idx = page * DIRECTORY_PAGE_SIZE
+        directories = index["entries"][start_idx:min(start_idx + DIRECTORY_PAGE_SIZE, index["directories"])]
         
         # Costruisci la tastiera
         keyboard = []
         
         # Aggiungi un pulsante per selezionare la directory corrente
         keyboard.append([
-            InlineKeyboardButton(get_bot_translation("bot_messages.upload.select_folder"), callback_data=f"select_dir_{path}")
+            InlineKeyboardButton(get_bot_translation("bot_messages.upload.select_folder"), callback_data=f"select_dir_{cache_path(path)}")
         ])
         
         # Aggiungi pulsante per creare una nuova cartella
         keyboard.append([
-            InlineKeyboardButton(get_bot_translation("bot_messages.upload.create_folder"), callback_data=f"create_folder_{path}")
+            InlineKeyboardButton(get_bot_translation("bot_messages.upload.create_folder"), callback_data=f"create_folder_{cache_path(path)}")
         ])
         
         # Aggiungi pulsante per eliminare la cartella corrente (solo se non è un punto di mount)
         if UPLOAD_STATES[chat_id]["parent_paths"]:  # Solo se non siamo nella root
             keyboard.append([
-                InlineKeyboardButton(get_bot_translation("bot_messages.upload.delete_folder"), callback_data=f"delete_folder_{path}")
+                InlineKeyboardButton(get_bot_translation("bot_messages.upload.delete_folder"), callback_data=f"delete_folder_{cache_path(path)}")
             ])
         
         # Aggiungi pulsante per tornare alla directory superiore se possibile
@@ -2557,14 +5334,24 @@ def handle_browse_directory(query, context):
                 InlineKeyboardButton(get_bot_translation("bot_messages.upload.parent_directory"), callback_data="upload_parent_dir")
             ])
         
-        # Aggiungi le directory
-        for directory in directories:
+        # Aggiungi le directory della pagina corrente
+        for directory, _, _ in directories:
             full_path = os.path.join(path, directory)
             cached_path = cache_path(full_path)
             keyboard.append([
                 InlineKeyboardButton(f"📂 {directory}", callback_data=f"browse_dir_{cached_path}")
             ])
         
+        # Aggiungi controlli di paginazione se necessario
+        if total_pages > 1:
+            pagination_row = []
+            if page > 0:
+                pagination_row.append(InlineKeyboardButton("⬅️", callback_data="upload_prev_page"))
+            pagination_row.append(InlineKeyboardButton(f"{page + 1}/{total_pages}", callback_data="upload_page_info"))
+            if page < total_pages - 1:
+                pagination_row.append(InlineKeyboardButton("➡️", callback_data="upload_next_page"))
+            keyboard.append(pagination_row)
+        
         # Aggiungi pulsante di annullamento
         keyboard.append([
             InlineKeyboardButton(get_bot_translation("bot_messages.upload.cancel"), callback_data="upload_cancel")
@@ -2577,8 +5364,15 @@ def handle_browse_directory(query, context):
         message += f"{get_bot_translation('bot_messages.upload.current_path')}: `{path}`\n\n"
         
         # Informazioni sul contenuto
-        message += f"{get_bot_translation('bot_messages.upload.subfolders')}: {len(directories)}\n"
-        message += f"{get_bot_translation('bot_messages.upload.files')}: {len(files)}\n\n"
+        message += f"{get_bot_translation('bot_messages.upload.subfolders')}: {index['directories']}\n"
+        message += f"{get_bot_translation('bot_messages.upload.files')}: {index['files']}\n"
+        if total_pages > 1:
+            message += get_bot_translation("bot_messages.upload.pagination_info",
+                                         current=page + 1,
+                                         total=total_pages,
+                                         shown=len(directories),
+                                         total_items=index["directories"]) + "\n"
+        message += "\n"
         
         # Aggiungi istruzioni
         message += get_bot_translation('bot_messages.upload.navigation_instruction')
@@ -2616,6 +5410,22 @@ def handle_navigate_to_parent(query, context):
     query.data = callback_data
     handle_browse_directory(query, context)
 
+def handle_upload_page_navigation(query, context, direction):
+    """Gestisce la navigazione tra le pagine di cartelle per l'upload"""
+    global UPLOAD_STATES
+    
+    # Identifica l'utente
+    chat_id = query.message.chat_id
+    
+    if chat_id not in UPLOAD_STATES or not UPLOAD_STATES[chat_id].get("current_path"):
+        query.edit_message_text("⚠️ Sessione di upload scaduta.")
+        return
+    
+    # Aggiorna la pagina e mostra di nuovo la directory corrente
+    UPLOAD_STATES[chat_id]["current_page"] = max(0, UPLOAD_STATES[chat_id].get("current_page", 0) + direction)
+    query.data = f"browse_dir_{UPLOAD_STATES[chat_id]['current_path']}"
+    handle_browse_directory(query, context)
+
 def handle_select_directory(query, context):
     """Gestisce la selezione di una directory per l'upload"""
     global UPLOAD_STATES
@@ -2671,8 +5481,8 @@ def handle_delete_folder_request(query, context):
     # Crea la tastiera di conferma
     keyboard = [
         [
-            InlineKeyboardButton(get_bot_translation("bot_messages.upload.confirm_delete"), callback_data=f"confirm_delete_{path}"),
-            InlineKeyboardButton(get_bot_translation("bot_messages.upload.cancel_delete"), callback_data=f"cancel_delete_{path}")
+            InlineKeyboardButton(get_bot_translation("bot_messages.upload.confirm_delete"), callback_data=f"confirm_delete_{cache_path(path)}"),
+            InlineKeyboardButton(get_bot_translation("bot_messages.upload.cancel_delete"), callback_data=f"cancel_delete_{cache_path(path)}")
         ]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -2713,8 +5523,8 @@ def handle_confirm_delete_folder(query, context):
             folder_name = os.path.basename(path)
             keyboard = [
                 [
-                    InlineKeyboardButton(get_bot_translation("bot_messages.upload.confirm_force_delete"), callback_data=f"force_delete_{path}"),
-                    InlineKeyboardButton(get_bot_translation("bot_messages.upload.cancel_delete"), callback_data=f"cancel_delete_{path}")
+                    InlineKeyboardButton(get_bot_translation("bot_messages.upload.confirm_force_delete"), callback_data=f"force_delete_{cache_path(path)}"),
+                    InlineKeyboardButton(get_bot_translation("bot_messages.upload.cancel_delete"), callback_data=f"cancel_delete_{cache_path(path)}")
                 ]
             ]
             reply_markup = InlineKeyboardMarkup(keyboard)
@@ -2890,8 +5700,298 @@ def handle_upload_finish(query, context):
     else:
         query.edit_message_text("⚠️ Sessione di upload non valida.")
 
-def send_telegram_message(message, parse_mode="Markdown", chat_id=None):
-    """Invia un messaggio tramite il bot Telegram"""
+# ----------------------------------------
+# Coda di invio dei messaggi Telegram
+# ----------------------------------------
+
+def sync_notification_spool(force=False):
+    """Esegue fsync dello spool se ci sono scritture pendenti (raggruppate nel tempo)"""
+    global SPOOL_DIRTY, SPOOL_LAST_SYNC
+    
+    with SPOOL_LOCK:
+        if not SPOOL_HANDLE or not SPOOL_DIRTY:
+            return
+        if not force and time.monotonic() - SPOOL_LAST_SYNC < NOTIFICATION_SPOOL_FSYNC_INTERVAL:
+            return
+        try:
+            os.fsync(SPOOL_HANDLE.fileno())
+            SPOOL_DIRTY = False
+            SPOOL_LAST_SYNC = time.monotonic()
+        except Exception as e:
+            logger.error(f"Errore nella sincronizzazione dello spool notifiche: {e}")
+
+def compact_notification_spool():
+    """Riscrive lo spool con i soli messaggi in attesa (chiamata con SPOOL_LOCK acquisito)"""
+    global SPOOL_HANDLE, SPOOL_DIRTY, SPOOL_LAST_SYNC
+    
+    lines = [json.dumps(record) + "\n" for record in SPOOL_PENDING.values()]
+    # Se anche i soli messaggi in attesa superano il limite, scarta i più vecchi (prima quelli informativi)
+    size = sum(len(line) for line in lines)
+    if size > NOTIFICATION_SPOOL_MAX_BYTES:
+        victims = sorted(SPOOL_PENDING.values(), key=lambda record: (-record["priority"], record["id"]))
+        for record in victims:
+            if size <= NOTIFICATION_SPOOL_MAX_BYTES // 2:
+                break
+            size -= len(json.dumps(record)) + 1
+            del SPOOL_PENDING[record["id"]]
+            with OUTBOUND_LOCK:
+                OUTBOUND_SUPERSEDED.add(record["id"])
+                OUTBOUND_STATS["dropped"] += 1
+        logger.warning("Spool notifiche pieno: scartati i messaggi in attesa più vecchi")
+        lines = [json.dumps(record) + "\n" for record in SPOOL_PENDING.values()]
+    
+    temp_file = NOTIFICATION_SPOOL_FILE.with_suffix(".tmp")
+    with open(temp_file, "w") as f:
+        f.writelines(lines)
+        f.flush()
+        os.fsync(f.fileno())
+    if SPOOL_HANDLE:
+        SPOOL_HANDLE.close()
+    os.replace(temp_file, NOTIFICATION_SPOOL_FILE)
+    SPOOL_HANDLE = open(NOTIFICATION_SPOOL_FILE, "a")
+    SPOOL_DIRTY = False
+    SPOOL_LAST_SYNC = time.monotonic()
+
+def write_spool_record(record):
+    """Aggiunge un record (add/ack) allo spool; l'fsync viene raggruppato"""
+    global SPOOL_HANDLE, SPOOL_DIRTY
+    
+    with SPOOL_LOCK:
+        try:
+            if record["op"] == "add":
+                SPOOL_PENDING[record["id"]] = record
+            else:
+                SPOOL_PENDING.pop(record["id"], None)
+            
+            if SPOOL_HANDLE is None:
+                os.makedirs(NOTIFICATION_SPOOL_FILE.parent, exist_ok=True)
+                SPOOL_HANDLE = open(NOTIFICATION_SPOOL_FILE, "a")
+            SPOOL_HANDLE.write(json.dumps(record) + "\n")
+            SPOOL_HANDLE.flush()
+            SPOOL_DIRTY = True
+            
+            if SPOOL_HANDLE.tell() > NOTIFICATION_SPOOL_MAX_BYTES:
+                compact_notification_spool()
+        except Exception as e:
+            logger.error(f"Errore nella scrittura dello spool notifiche: {e}")
+    sync_notification_spool()
+
+def load_notification_spool():
+    """Legge lo spool e restituisce, in ordine, i messaggi non ancora consegnati
+
+    Dei reminder con la stessa collapse_key viene mantenuto solo il più recente,
+    così una lunga interruzione non si traduce in una raffica di messaggi.
+    """
+    pending = {}
+    if not NOTIFICATION_SPOOL_FILE.exists():
+        return []
+    try:
+        with open(NOTIFICATION_SPOOL_FILE, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Ultima riga troncata da un arresto improvviso
+                    continue
+                if record.get("op") == "add":
+                    pending[record["id"]] = record
+                elif record.get("op") == "ack":
+                    pending.pop(record["id"], None)
+    except Exception as e:
+        logger.error(f"Errore nella lettura dello spool notifiche: {e}")
+        return []
+    
+    latest = {}
+    for record in pending.values():
+        if record.get("collapse_key"):
+            latest[record["collapse_key"]] = record["id"]
+    return [record for record in sorted(pending.values(), key=lambda record: record["id"])
+            if not record.get("collapse_key") or latest[record["collapse_key"]] == record["id"]]
+
+def replay_notification_spool():
+    """Rimette in coda i messaggi rimasti nello spool dall'esecuzione precedente"""
+    global OUTBOUND_SEQUENCE, SPOOL_LOADED
+    
+    # Tutto sotto SPOOL_LOCK: nessun nuovo messaggio riceve un id prima del ripristino
+    with SPOOL_LOCK:
+        if SPOOL_LOADED:
+            return
+        SPOOL_LOADED = True
+        
+        records = load_notification_spool()
+        next_id = max((record["id"] for record in records), default=-1) + 1
+        OUTBOUND_SEQUENCE = itertools.count(next_id)
+        
+        SPOOL_PENDING.clear()
+        for record in records:
+            SPOOL_PENDING[record["id"]] = record
+        try:
+            # Riparte da uno spool compatto con i soli messaggi da consegnare
+            os.makedirs(NOTIFICATION_SPOOL_FILE.parent, exist_ok=True)
+            compact_notification_spool()
+        except Exception as e:
+            logger.error(f"Errore nella compattazione dello spool notifiche: {e}")
+        
+        # La coda non ha limite: tutti i messaggi ripristinati vengono rimessi in coda, anche oltre
+        # OUTBOUND_MAX_PENDING (lo spool stesso è limitato da NOTIFICATION_SPOOL_MAX_BYTES)
+        for record in records:
+            enqueue_outbound_record(record)
+    
+    if records:
+        logger.info(f"Ripristinati {len(records)} messaggi dallo spool notifiche")
+        with OUTBOUND_LOCK:
+            OUTBOUND_STATS["replayed"] += len(records)
+
+def enqueue_outbound_record(record):
+    """Inserisce un record dello spool nella coda in memoria"""
+    item = dict(record, enqueued=time.monotonic(), attempts=0)
+    with OUTBOUND_LOCK:
+        if record.get("collapse_key"):
+            previous = OUTBOUND_COLLAPSE.get(record["collapse_key"])
+            if previous is not None:
+                OUTBOUND_SUPERSEDED.add(previous)
+            OUTBOUND_COLLAPSE[record["collapse_key"]] = record["id"]
+    OUTBOUND_QUEUE.put_nowait((record["priority"], record["id"], item))
+
+def supersede_outbound(collapse_key):
+    """Scarta il messaggio in attesa associato a una collapse_key (es. reminder dopo un recovery)"""
+    with OUTBOUND_LOCK:
+        previous = OUTBOUND_COLLAPSE.pop(collapse_key, None)
+        if previous is not None:
+            OUTBOUND_SUPERSEDED.add(previous)
+
+def take_outbound_token(key, rate):
+    """Consuma un token dal bucket indicato; restituisce i secondi da attendere se vuoto"""
+    now = time.monotonic()
+    bucket = OUTBOUND_BUCKETS.setdefault(key, {"tokens": float(rate), "updated": now})
+    bucket["tokens"] = min(float(rate), bucket["tokens"] + (now - bucket["updated"]) * rate)
+    bucket["updated"] = now
+    if bucket["tokens"] >= 1:
+        bucket["tokens"] -= 1
+        return 0
+    return (1 - bucket["tokens"]) / rate
+
+def wait_outbound_tokens(chat_id):
+    """Attende finché sia il limite globale sia quello della chat consentono un invio"""
+    while True:
+        wait = take_outbound_token(("chat", chat_id), OUTBOUND_CHAT_RATE)
+        if wait:
+            time.sleep(wait)
+            continue
+        wait = take_outbound_token("global", OUTBOUND_GLOBAL_RATE)
+        if not wait:
+            return
+        # Restituisce il token della chat prima di attendere quello globale
+        OUTBOUND_BUCKETS[("chat", chat_id)]["tokens"] += 1
+        time.sleep(wait)
+
+def record_outbound_result(item, success):
+    """Aggiorna le statistiche della coda dopo un invio e conferma il messaggio nello spool"""
+    write_spool_record({"op": "ack", "id": item["id"]})
+    with OUTBOUND_LOCK:
+        if OUTBOUND_COLLAPSE.get(item.get("collapse_key")) == item["id"]:
+            del OUTBOUND_COLLAPSE[item["collapse_key"]]
+        if not success:
+            OUTBOUND_STATS["failed"] += 1
+            return
+        latency = time.monotonic() - item["enqueued"]
+        OUTBOUND_STATS["sent"] += 1
+        OUTBOUND_STATS["last_latency"] = latency
+        OUTBOUND_STATS["max_latency"] = max(OUTBOUND_STATS["max_latency"], latency)
+        avg = OUTBOUND_STATS["avg_latency"]
+        OUTBOUND_STATS["avg_latency"] = latency if avg is None else avg * 0.9 + latency * 0.1
+
+def outbound_sender_loop():
+    """Worker che invia i messaggi in coda rispettando priorità e limiti di Telegram"""
+    logger.info("Worker di invio Telegram avviato")
+    
+    while True:
+        try:
+            priority, sequence, item = OUTBOUND_QUEUE.get(timeout=NOTIFICATION_SPOOL_FSYNC_INTERVAL)
+        except queue.Empty:
+            sync_notification_spool(force=True)
+            continue
+        
+        try:
+            with OUTBOUND_LOCK:
+                superseded = sequence in OUTBOUND_SUPERSEDED
+                OUTBOUND_SUPERSEDED.discard(sequence)
+            if superseded:
+                # Reminder sostituito da uno più recente o da un recovery
+                write_spool_record({"op": "ack", "id": sequence})
+                with OUTBOUND_LOCK:
+                    OUTBOUND_STATS["collapsed"] += 1
+                continue
+            
+            if not BOT_INSTANCE:
+                # Bot fermo: il messaggio resta nello spool in attesa del riavvio
+                time.sleep(5)
+                OUTBOUND_QUEUE.put_nowait((priority, sequence, item))
+                continue
+            
+            wait_outbound_tokens(item["chat_id"])
+            result = telegram_client.send_message(item["text"], chat_id=item["chat_id"],
+                                                  parse_mode=item["parse_mode"], bot_token=BOT_TOKEN)
+            retry_after = telegram_client.get_retry_after(result)
+            if result.get("ok"):
+                record_outbound_result(item, True)
+            elif retry_after:
+                # 429: Telegram indica quanto attendere; il messaggio torna in coda con la stessa posizione
+                logger.warning(f"Limite di frequenza Telegram raggiunto, nuovo tentativo tra {retry_after}s")
+                with OUTBOUND_LOCK:
+                    OUTBOUND_STATS["rate_limited"] += 1
+                time.sleep(retry_after)
+                OUTBOUND_QUEUE.put_nowait((priority, sequence, item))
+            else:
+                logger.error(f"Errore nell'invio del messaggio Telegram: {result.get('description')}")
+                record_outbound_result(item, False)
+        except requests.RequestException as e:
+            # Rete o Telegram non raggiungibili: si riprova senza limite, il messaggio resta nello spool
+            item["attempts"] += 1
+            logger.warning(f"Errore di rete nell'invio del messaggio Telegram (tentativo {item['attempts']}): {e}")
+            with OUTBOUND_LOCK:
+                OUTBOUND_STATS["retries"] += 1
+            time.sleep(min(2 ** item["attempts"], OUTBOUND_MAX_BACKOFF))
+            OUTBOUND_QUEUE.put_nowait((priority, sequence, item))
+        except Exception as e:
+            logger.error(f"Errore nell'invio del messaggio Telegram: {e}")
+            record_outbound_result(item, False)
+        finally:
+            OUTBOUND_QUEUE.task_done()
+
+def ensure_outbound_sender():
+    """Avvia il worker di invio se non è già in esecuzione"""
+    global OUTBOUND_THREAD
+    
+    try:
+        replay_notification_spool()
+    except Exception as e:
+        # Il worker parte comunque: i messaggi nuovi non devono dipendere dal ripristino
+        logger.error(f"Errore nel ripristino dello spool notifiche: {e}")
+    with OUTBOUND_LOCK:
+        if OUTBOUND_THREAD and OUTBOUND_THREAD.is_alive():
+            return
+        OUTBOUND_THREAD = threading.Thread(target=outbound_sender_loop, daemon=True)
+        OUTBOUND_THREAD.start()
+
+def get_outbound_queue_status():
+    """Restituisce profondità della coda e latenze di invio"""
+    with OUTBOUND_LOCK:
+        status = dict(OUTBOUND_STATS)
+    status["depth"] = OUTBOUND_QUEUE.qsize()
+    with SPOOL_LOCK:
+        status["spooled"] = len(SPOOL_PENDING)
+    status["worker_alive"] = bool(OUTBOUND_THREAD and OUTBOUND_THREAD.is_alive())
+    return status
+
+def send_telegram_message(message, parse_mode="Markdown", chat_id=None, priority=PRIORITY_INFO, collapse_key=None):
+    """Accoda un messaggio per l'invio tramite il bot Telegram
+
+    Il messaggio viene scritto nello spool e consegnato dal worker di invio, quindi
+    il chiamante non resta bloccato da un'API lenta o irraggiungibile. Un messaggio
+    con collapse_key sostituisce quello ancora in attesa con la stessa chiave.
+    Restituisce True se il messaggio è stato accodato.
+    """
     global BOT_INSTANCE, CHAT_ID
     
     # Usa il chat_id fornito o quello globale
@@ -2906,7 +6006,28 @@ def send_telegram_message(message, parse_mode="Markdown", chat_id=None):
         if len(message) > 4096:
             message = message[:4093] + "..."
         
-        BOT_INSTANCE.send_message(chat_id=target_chat_id, text=message, parse_mode=parse_mode)
+        ensure_outbound_sender()
+        # Gli alert vengono sempre accettati: una raffica di notifiche informative non deve farli perdere
+        if priority != PRIORITY_ALERT and OUTBOUND_QUEUE.qsize() >= OUTBOUND_MAX_PENDING:
+            logger.error("Coda di invio Telegram piena, messaggio informativo scartato")
+            with OUTBOUND_LOCK:
+                OUTBOUND_STATS["dropped"] += 1
+            return False
+        
+        record = {
+            "op": "add",
+            "id": next(OUTBOUND_SEQUENCE),
+            "priority": priority,
+            "chat_id": target_chat_id,
+            "text": message,
+            "parse_mode": parse_mode,
+            "collapse_key": collapse_key,
+            "created": time.time()
+        }
+        write_spool_record(record)
+        enqueue_outbound_record(record)
+        with OUTBOUND_LOCK:
+            OUTBOUND_STATS["enqueued"] += 1
         return True
     except Exception as e:
         logger.error(f"Errore nell'invio del messaggio Telegram: {e}")
@@ -2919,7 +6040,7 @@ def get_file_browser_keyboard(directory, file_list=None):
     # Aggiungi navigazione alla directory superiore se applicabile
     parent_dir = os.path.dirname(directory)
     if parent_dir and parent_dir != directory:
-        keyboard.append([InlineKeyboardButton(get_bot_translation("bot_messages.upload.parent_directory"), callback_data=f"browse_dir_{parent_dir}")])
+        keyboard.append([InlineKeyboardButton(get_bot_translation("bot_messages.upload.parent_directory"), callback_data=f"browse_dir_{cache_path(parent_dir)}")])
     
     # Aggiungi le sottodirectory
     try:
@@ -2944,9 +6065,9 @@ def get_file_browser_keyboard(directory, file_list=None):
 # Funzioni per l'esportazione
 # ----------------------------------------
 
-def send_notification(message, parse_mode="Markdown"):
+def send_notification(message, parse_mode="Markdown", priority=PRIORITY_INFO):
     """Invia una notifica tramite il bot Telegram"""
-    return send_telegram_message(message, parse_mode)
+    return send_telegram_message(message, parse_mode, priority=priority)
 
 # Thread per il bot Telegram
 BOT_THREAD = None
@@ -3031,7 +6152,8 @@ def get_bot_language():
 __all__ = ["init_bot", "stop_bot", "send_notification", "start_bot_thread", "stop_bot_thread", 
            "load_mount_points", "save_mount_points", "load_monitoring_config", "save_monitoring_config",
            "start_monitoring", "stop_monitoring", "get_default_monitoring_config", 
-           "set_bot_language", "get_bot_language"]
+           "set_bot_language", "get_bot_language", "read_pressure",
+           "set_update_mode", "get_update_mode", "process_webhook_update"]
 
 if __name__ == "__main__":
     # Configurazione del logging
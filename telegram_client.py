@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Client HTTP condiviso verso l'API Telegram (usato da app.py e telegram_bot.py)
+
+Le connessioni keep-alive verso l'API stanno in due pool distinti, ciascuno di
+POOL_MAXSIZE connessioni e con gli stessi timeout:
+- la requests.Session di get_session(), usata da app.py, dalla coda di invio
+  delle notifiche e dal download dei file caricati;
+- il pool urllib3 interno di python-telegram-bot, creato da get_ptb_request()
+  per il Bot dell'Updater (getUpdates e risposte interattive agli handler).
+"""
+
+import os
+import threading
+import configparser
+from pathlib import Path
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Configurazione logging
+logger = logging.getLogger("SSH Monitor - Telegram Client")
+
+# Configurazione percorsi
+CONFIG_PATH = Path('/etc/ssh_monitor/config.ini')
+
+# Parametri di connessione
+# L'URL base può essere cambiato (es. verso fake_telegram_server.py) con la variabile
+# TELEGRAM_API_BASE_URL o con api_base_url nella sezione [Telegram] di config.ini
+DEFAULT_API_BASE_URL = "https://api.telegram.org"
+CONNECT_TIMEOUT = 5  # Secondi per stabilire la connessione
+READ_TIMEOUT = 15  # Secondi di attesa della risposta
+DOWNLOAD_READ_TIMEOUT = 60  # I file possono arrivare a 20 MB
+POOL_MAXSIZE = 10  # Connessioni keep-alive per ciascuno dei due pool (sessione requests e Request di PTB)
+
+# Sessione HTTP condivisa e credenziali in cache
+SESSION = None
+SESSION_LOCK = threading.Lock()
+CREDENTIALS = None  # {"mtime": float, "bot_token": str, "chat_id": str, "api_base_url": str, "update_mode": str, ...}
+CREDENTIALS_LOCK = threading.Lock()
+
+def get_session():
+    """Restituisce la sessione HTTP condivisa, creandola al primo utilizzo"""
+    global SESSION
+
+    with SESSION_LOCK:
+        if SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=POOL_MAXSIZE, max_retries=1)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            SESSION = session
+        return SESSION
+
+def load_credentials():
+    """Restituisce la configurazione Telegram in cache, rileggendo config.ini solo se modificato"""
+    global CREDENTIALS
+
+    with CREDENTIALS_LOCK:
+        try:
+            mtime = os.stat(CONFIG_PATH).st_mtime
+        except OSError:
+            return {"bot_token": None, "chat_id": None, "api_base_url": "",
+                    "update_mode": "polling", "webhook_url": "", "webhook_secret": ""}
+
+        if CREDENTIALS is None or CREDENTIALS["mtime"] != mtime:
+            config = configparser.ConfigParser()
+            config.read(CONFIG_PATH)
+            CREDENTIALS = {
+                "mtime": mtime,
+                "bot_token": config.get('Telegram', 'bot_token', fallback=''),
+                "chat_id": config.get('Telegram', 'chat_id', fallback=''),
+                "api_base_url": config.get('Telegram', 'api_base_url', fallback=''),
+                "update_mode": config.get('Telegram', 'update_mode', fallback='polling') or 'polling',
+                "webhook_url": config.get('Telegram', 'webhook_url', fallback=''),
+                "webhook_secret": config.get('Telegram', 'webhook_secret', fallback='')
+            }
+        return CREDENTIALS
+
+def get_credentials():
+    """Restituisce (bot_token, chat_id) da config.ini"""
+    credentials = load_credentials()
+    return credentials["bot_token"], credentials["chat_id"]
+
+def get_api_base_url():
+    """URL base dell'API Bot: variabile d'ambiente, poi config.ini, poi l'API ufficiale"""
+    base_url = os.environ.get('TELEGRAM_API_BASE_URL') or load_credentials()["api_base_url"]
+    return (base_url or DEFAULT_API_BASE_URL).rstrip("/")
+
+def invalidate_credentials():
+    """Forza la rilettura delle credenziali alla prossima richiesta"""
+    global CREDENTIALS
+
+    with CREDENTIALS_LOCK:
+        CREDENTIALS = None
+
+def api_call(method, data=None, files=None, bot_token=None, timeout=None):
+    """Esegue un metodo dell'API Bot e restituisce la risposta JSON di Telegram
+
+    Gli errori di rete vengono propagati come eccezioni di requests; gli errori
+    dell'API (ok=False, error_code, parameters.retry_after) sono nella risposta.
+    """
+    bot_token = bot_token or get_credentials()[0]
+    if not bot_token:
+        return {"ok": False, "description": "Token Telegram non configurato"}
+
+    url = f"{get_api_base_url()}/bot{bot_token}/{method}"
+    response = get_session().post(url, data=data, files=files,
+                                  timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT))
+    try:
+        return response.json()
+    except ValueError:
+        return {"ok": False, "error_code": response.status_code, "description": response.text}
+
+def send_message(text, chat_id=None, parse_mode="Markdown", bot_token=None):
+    """Invia un messaggio di testo; restituisce la risposta JSON di Telegram"""
+    chat_id = chat_id or get_credentials()[1]
+    data = {"chat_id": chat_id, "text": text}
+    if parse_mode:
+        data["parse_mode"] = parse_mode
+    return api_call("sendMessage", data=data, bot_token=bot_token)
+
+def get_retry_after(result):
+    """Estrae retry_after da una risposta 429, None se assente"""
+    if result.get("error_code") == 429:
+        return result.get("parameters", {}).get("retry_after", 1)
+    return None
+
+def download_file(file_url, dest_path):
+    """Scarica un file di Telegram in streaming sulla sessione condivisa"""
+    with get_session().get(file_url, stream=True, timeout=(CONNECT_TIMEOUT, DOWNLOAD_READ_TIMEOUT)) as response:
+        response.raise_for_status()
+        with open(dest_path, 'wb') as out_file:
+            for chunk in response.iter_content(chunk_size=65536):
+                if chunk:
+                    out_file.write(chunk)
+
+def get_ptb_base_urls():
+    """Argomenti base_url/base_file_url per telegram.Bot coerenti con get_api_base_url"""
+    base_url = get_api_base_url()
+    return {"base_url": f"{base_url}/bot", "base_file_url": f"{base_url}/file/bot"}
+
+def get_ptb_request():
+    """Crea il Request di python-telegram-bot con pool di connessioni e timeout espliciti
+
+    È un pool separato dalla sessione di get_session(): python-telegram-bot usa
+    il proprio urllib3. POOL_MAXSIZE copre il long polling di getUpdates più i
+    thread degli handler che rispondono in parallelo.
+    """
+    from telegram.utils.request import Request
+    return Request(con_pool_size=POOL_MAXSIZE, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT)